@@ -6,6 +6,12 @@ import sys
 from git.exc import InvalidGitRepositoryError, GitCommandError
 import argparse
 from collections import defaultdict
+import heapq
+import re
+import bisect
+
+class ReportError(Exception):
+    """报告生成失败（库接口抛出该异常，命令行入口输出错误信息后退出）"""
 
 def get_date_range(date_shortcut):
     """根据快捷方式获取日期范围"""
@@ -37,9 +43,670 @@ def get_date_range(date_shortcut):
     
     return start_date, end_date
 
+# 日期快捷方式对应的自然周期，用于环比
+DATE_SHORTCUT_PERIODS = {
+    'today': 'day', 'yesterday': 'day',
+    'thisweek': 'week', 'lastweek': 'week',
+    'thismonth': 'month', 'lastmonth': 'month',
+}
+
+def get_previous_date_range(date_shortcut, start_date, end_date):
+    """获取环比的上一周期：日期快捷方式取上一个完整的自然周期，其余情况取紧邻的等长时间段"""
+    previous_end = start_date - timedelta(seconds=1)
+    period = DATE_SHORTCUT_PERIODS.get(date_shortcut)
+    if period == 'day':
+        previous_start = start_date - timedelta(days=1)
+    elif period == 'week':
+        previous_start = start_date - timedelta(days=7)
+    elif period == 'month':
+        previous_start = previous_end.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    else:
+        previous_start = start_date - (end_date - start_date)
+    return previous_start, previous_end
+
+# 合并提交策略对应的 git 遍历参数
+MERGE_POLICY_OPTIONS = {
+    'include': {},                      # 包含合并提交（与第一个父提交比较）
+    'skip': {'no_merges': True},        # 跳过合并提交，不计算其差异
+    'first-parent': {'first_parent': True},  # 只沿主线遍历，合并提交代表整个特性分支
+    'only': {'merges': True},           # 只统计合并提交，按合并汇总变更
+}
+
+# 默认排除规则：构建产物、依赖目录和锁文件（--default-excludes 启用）
+DEFAULT_EXCLUDES = [
+    'target/', 'node_modules/', 'dist/', 'build/', 'vendor/', '.idea/',
+    '*.min.js', '*.min.css', 'package-lock.json', 'yarn.lock', 'pnpm-lock.yaml', 'go.sum',
+]
+
+def to_glob_pathspec(pattern, exclude=False):
+    """将 gitignore 风格的模式转换为 git pathspec（目录以 / 结尾，无 / 的模式匹配任意层级）"""
+    pattern = pattern.strip()
+    if pattern.endswith('/'):
+        pattern += '**'
+    if '/' not in pattern.rstrip('*').rstrip('/') and not pattern.startswith('**/'):
+        pattern = '**/' + pattern
+    magic = 'exclude,glob' if exclude else 'glob'
+    return f":({magic}){pattern}"
+
+def build_pathspecs(includes=None, excludes=None):
+    """根据包含/排除模式生成 git pathspec 列表，没有任何模式时返回空列表"""
+    if not includes and not excludes:
+        return []
+    pathspecs = [to_glob_pathspec(pattern) for pattern in includes] if includes else ['.']
+    pathspecs += [to_glob_pathspec(pattern, exclude=True) for pattern in excludes or []]
+    return pathspecs
+
+def parse_numstat(output):
+    """解析 git --numstat 输出，返回与 GitPython commit.stats 相同结构的 (total, files)"""
+    total = {'insertions': 0, 'deletions': 0, 'lines': 0, 'files': 0}
+    files = {}
+    for line in output.splitlines():
+        parts = line.split('\t')
+        if len(parts) != 3:
+            continue
+        # 二进制文件的行数为 '-'
+        insertions = int(parts[0]) if parts[0].isdigit() else 0
+        deletions = int(parts[1]) if parts[1].isdigit() else 0
+        files[parts[2]] = {'insertions': insertions, 'deletions': deletions, 'lines': insertions + deletions}
+        total['insertions'] += insertions
+        total['deletions'] += deletions
+        total['lines'] += insertions + deletions
+        total['files'] += 1
+    return total, files
+
+# 遍历时使用 commit-graph 及其变更路径 Bloom 过滤器（可由 prepare 子命令生成）
+GIT_CONFIG_OPTIONS = ['core.commitGraph=true', 'commitGraph.readChangedPaths=true']
+
+def options_to_args(options):
+    """将 GitPython 风格的关键字参数（since=..., no_merges=True）转换为 git 命令行参数"""
+    arguments = []
+    for key, value in options.items():
+        if value is None or value is False:
+            continue
+        flag = '--' + key.replace('_', '-')
+        if isinstance(value, (list, tuple)):
+            arguments.extend(f"{flag}={item}" for item in value)
+        else:
+            arguments.append(flag if value is True else f"{flag}={value}")
+    return arguments
+
+def ticket_to_pattern(ticket):
+    """将工单号（如 PROJ-123）或项目前缀（如 PROJ）转换为 git --grep 使用的扩展正则"""
+    ticket = ticket.strip().upper()
+    if re.fullmatch(r'[A-Z][A-Z0-9]*', ticket):
+        return f"(^|[^A-Za-z0-9]){ticket}-[0-9]+"
+    return f"(^|[^A-Za-z0-9]){re.escape(ticket)}([^0-9]|$)"
+
+def compile_grep_patterns(patterns, ignore_case=True):
+    """将多个 --grep 模式合并为一个正则（任一匹配即可，与 git log 多个 --grep 的语义一致）"""
+    # git 支持而 Python 不支持的正则语法（如 [[:digit:]]）只交给 git 过滤
+    if not patterns or any('[:' in pattern for pattern in patterns):
+        return None
+    flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+    try:
+        return re.compile('|'.join(f"(?:{pattern})" for pattern in patterns), flags)
+    except re.error:
+        return None
+
+class GitBackend:
+    """Git 访问后端接口：遍历提交并返回统一结构的提交记录
+
+    提交记录为字典：hash、parents、author_name、author_email、committed_date（Unix 时间戳）、
+    message、stats、files；with_stats=False 时 stats 和 files 为 None。renames=True 时统计启用重命名检测，
+    被重命名的文件以 numstat 的 `旧 => 新` 路径出现（合并提交同样与第一个父提交比较）。
+    """
+    name = None
+
+    def __init__(self, repo, pathspecs=None):
+        self.repo = repo
+        self.pathspecs = pathspecs or []
+
+    def iter_commits(self, rev=None, with_stats=True, renames=False, **options):
+        """按 git log 的顺序遍历提交，options 为 since/until/no_merges 等遍历参数"""
+        raise NotImplementedError
+
+    def get_commits(self, shas, with_stats=True, renames=False):
+        """按给定顺序读取一组提交"""
+        raise NotImplementedError
+
+    def close(self):
+        """释放后端持有的进程或句柄"""
+
+class GitPythonBackend(GitBackend):
+    """基于 GitPython 的后端：每个提交单独计算 diff 统计"""
+    name = 'gitpython'
+
+    def iter_commits(self, rev=None, with_stats=True, renames=False, **options):
+        for commit in self.repo.iter_commits(rev, self.pathspecs, **options):
+            yield self._to_record(commit, with_stats, renames)
+
+    def get_commits(self, shas, with_stats=True, renames=False):
+        for sha in shas:
+            yield self._to_record(self.repo.commit(sha), with_stats, renames)
+
+    def _to_record(self, commit, with_stats, renames=False):
+        total, files = self._compute_stats(commit, renames) if with_stats else (None, None)
+        return {
+            'hash': commit.hexsha,
+            'parents': [parent.hexsha for parent in commit.parents],
+            'author_name': commit.author.name,
+            'author_email': commit.author.email,
+            'committed_date': commit.committed_date,
+            'message': commit.message,
+            'stats': total,
+            'files': files
+        }
+
+    def _compute_stats(self, commit, renames=False):
+        """计算提交的行数统计；指定了路径过滤时只对匹配的路径做 diff"""
+        if not self.pathspecs and not renames:
+            stats = commit.stats
+            return parse_numstat_stats(stats)
+        rename_option = '-M' if renames else '--no-renames'
+        if commit.parents:
+            output = self.repo.git.diff(commit.parents[0].hexsha, commit.hexsha, '--numstat', rename_option,
+                                        '--', *self.pathspecs)
+        else:
+            output = self.repo.git.diff_tree(commit.hexsha, '--root', '-r', '--no-commit-id', '--numstat',
+                                             rename_option, '--', *self.pathspecs)
+        return parse_numstat(output)
+
+def parse_numstat_stats(stats):
+    """将 GitPython 的 Stats 对象整理为 (total, files)，只保留报告使用的字段"""
+    files = {path: {'insertions': file_stats['insertions'], 'deletions': file_stats['deletions'],
+                    'lines': file_stats['lines']}
+             for path, file_stats in stats.files.items()}
+    return dict(stats.total), files
+
+# 批量后端的 git log 输出格式：记录以 \x1e 开头，字段以 \x1f 分隔，提交信息以 \x1d 结束，之后是 numstat
+BATCH_LOG_FORMAT = '%x1e%H%x1f%P%x1f%an%x1f%ae%x1f%ct%x1f%B%x1d'
+
+class CatFileBatch:
+    """常驻的 git cat-file --batch 进程，按 SHA 读取对象内容"""
+
+    def __init__(self, repo_path, config=None):
+        import subprocess
+        command = ['git']
+        for option in config or []:
+            command += ['-c', option]
+        command += ['cat-file', '--batch']
+        self.process = subprocess.Popen(command, cwd=repo_path, stdin=subprocess.PIPE,
+                                        stdout=subprocess.PIPE)
+
+    def read(self, sha):
+        """读取对象，返回 (类型, 内容字节)；对象不存在时抛出 KeyError"""
+        self.process.stdin.write(sha.encode('ascii') + b'\n')
+        self.process.stdin.flush()
+        header = self.process.stdout.readline().decode('ascii').split()
+        if len(header) != 3:
+            raise KeyError(sha)
+        _, obj_type, size = header
+        data = self.process.stdout.read(int(size))
+        self.process.stdout.read(1)  # 内容之后的换行符
+        return obj_type, data
+
+    def close(self):
+        if self.process.poll() is None:
+            self.process.stdin.close()
+            self.process.wait()
+
+class DiffTreeBatch:
+    """常驻的 git diff-tree --stdin 进程，按需计算提交与指定父提交之间的 numstat"""
+    # diff-tree 会原样输出并刷新不是对象 ID 的输入行，用作每次请求的结束标记
+    SENTINEL = '\x1e'
+
+    def __init__(self, repo_path, config=None, pathspecs=None, renames=False):
+        import subprocess
+        import tempfile
+        command = ['git']
+        for option in config or []:
+            command += ['-c', option]
+        command += ['diff-tree', '--stdin', '-r', '--numstat', '-M' if renames else '--no-renames', '--no-commit-id',
+                    '--', *(pathspecs or [])]
+        self.command = command
+        # stderr 写入临时文件，进程异常退出时随 GitCommandError 一起报告
+        self.stderr_file = tempfile.TemporaryFile()
+        self.process = subprocess.Popen(command, cwd=repo_path, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        stderr=self.stderr_file, encoding='utf-8', errors='replace')
+
+    def _failed(self):
+        """进程已退出（或即将退出）时构造包含 stderr 的 GitCommandError"""
+        self.process.wait()
+        self.stderr_file.seek(0)
+        stderr = self.stderr_file.read().decode('utf-8', errors='replace')
+        return GitCommandError(self.command, self.process.returncode, stderr)
+
+    def numstat(self, sha, parent):
+        """返回 (total, files)；进程已退出或在结束标记之前关闭输出时抛出 GitCommandError"""
+        if self.process.poll() is not None:
+            raise self._failed()
+        try:
+            self.process.stdin.write(f"{sha} {parent}\n{self.SENTINEL}\n")
+            self.process.stdin.flush()
+        except OSError:
+            raise self._failed()
+        lines = []
+        for line in iter(self.process.stdout.readline, ''):
+            if line.rstrip('\n') == self.SENTINEL:
+                break
+            lines.append(line)
+        else:
+            raise self._failed()
+        return parse_numstat(''.join(lines))
+
+    def close(self):
+        if self.process.poll() is None:
+            self.process.stdin.close()
+            self.process.wait()
+        self.stderr_file.close()
+
+def parse_commit_object(sha, data):
+    """解析 cat-file 读取的原始提交对象，返回不含统计的提交记录"""
+    header, _, message = data.partition(b'\n\n')
+    encoding = 'utf-8'
+    parents = []
+    author = committer = b''
+    for line in header.split(b'\n'):
+        key, _, value = line.partition(b' ')
+        if key == b'parent':
+            parents.append(value.decode('ascii'))
+        elif key == b'author':
+            author = value
+        elif key == b'committer':
+            committer = value
+        elif key == b'encoding':
+            encoding = value.decode('ascii')
+    # 签名格式：姓名 <邮箱> 时间戳 时区
+    name, _, rest = author.partition(b' <')
+    email = rest.split(b'>', 1)[0]
+    committed_date = int(committer.rsplit(b' ', 2)[-2])
+    decode = lambda value: value.decode(encoding, errors='replace')
+    return {
+        'hash': sha,
+        'parents': parents,
+        'author_name': decode(name),
+        'author_email': decode(email),
+        'committed_date': committed_date,
+        'message': decode(message),
+        'stats': None,
+        'files': None
+    }
+
+class BatchBackend(GitBackend):
+    """批量子进程后端：一个 git log 流同时输出提交元数据和 numstat，合并提交的统计和按 SHA 读取分别使用
+    常驻的 diff-tree / cat-file 进程"""
+    name = 'batch'
+
+    def __init__(self, repo, pathspecs=None):
+        super().__init__(repo, pathspecs)
+        self.repo_path = repo.working_tree_dir or repo.git_dir
+        self._cat_file = None
+        self._diff_trees = {}           # 是否检测重命名 → 常驻的 diff-tree 进程
+
+    def _log_command(self, arguments, with_stats, renames=False):
+        command = ['git']
+        for option in GIT_CONFIG_OPTIONS:
+            command += ['-c', option]
+        command += ['log', f"--format={BATCH_LOG_FORMAT}"]
+        if with_stats:
+            # git log 不输出合并提交的差异（用 --diff-merges 会改变路径过滤时的历史简化），合并提交单独计算
+            command += ['--numstat', '-M' if renames else '--no-renames', '--root']
+        return command + arguments + ['--', *self.pathspecs]
+
+    def _stream(self, command, stdin_data=None, with_stats=True, renames=False):
+        """运行 git log 并逐条解析输出，不在内存中保留完整输出"""
+        import subprocess
+        import tempfile
+        import threading
+        # stderr 写入临时文件、stdin 在线程中写入，避免任一管道写满时与读取 stdout 互相等待
+        stderr_file = tempfile.TemporaryFile()
+        process = subprocess.Popen(command, cwd=self.repo_path, stdout=subprocess.PIPE, stderr=stderr_file,
+                                   stdin=subprocess.PIPE if stdin_data is not None else subprocess.DEVNULL,
+                                   encoding='utf-8', errors='replace')
+        try:
+            if stdin_data is not None:
+                def feed():
+                    try:
+                        process.stdin.write(stdin_data)
+                        process.stdin.close()
+                    except OSError:
+                        pass
+                threading.Thread(target=feed, daemon=True).start()
+            buffer = ''
+            for chunk in iter(lambda: process.stdout.read(65536), ''):
+                buffer += chunk
+                records = buffer.split('\x1e')
+                # 最后一段可能还不完整，留到下一次读取
+                buffer = records.pop()
+                for record in records:
+                    if record:
+                        yield self._parse_record(record, with_stats, renames)
+            if buffer:
+                yield self._parse_record(buffer, with_stats, renames)
+            if process.wait() != 0:
+                stderr_file.seek(0)
+                stderr = stderr_file.read().decode('utf-8', errors='replace')
+                raise GitCommandError(command, process.returncode, stderr)
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            stderr_file.close()
+
+    def _parse_record(self, record, with_stats, renames=False):
+        header, _, numstat = record.partition('\x1d')
+        sha, parents, name, email, committed_date, message = header.split('\x1f', 5)
+        parents = parents.split()
+        if not with_stats:
+            total, files = None, None
+        elif len(parents) > 1:
+            total, files = self.merge_stats(sha, parents[0], renames)
+        else:
+            total, files = parse_numstat(numstat)
+        return {
+            'hash': sha,
+            'parents': parents,
+            'author_name': name,
+            'author_email': email,
+            'committed_date': int(committed_date),
+            'message': message,
+            'stats': total,
+            'files': files
+        }
+
+    def iter_commits(self, rev=None, with_stats=True, renames=False, **options):
+        arguments = options_to_args(options) + ([rev] if rev else [])
+        yield from self._stream(self._log_command(arguments, with_stats, renames), with_stats=with_stats,
+                                renames=renames)
+
+    def get_commits(self, shas, with_stats=True, renames=False):
+        shas = list(shas)
+        if not with_stats:
+            for sha in shas:
+                yield self.read_commit(sha)
+            return
+        if not shas:
+            return
+        # 一次 git log --no-walk 读取所有提交，SHA 通过标准输入传入，避免命令行过长
+        command = self._log_command(['--no-walk=unsorted', '--stdin'], with_stats, renames)
+        yield from self._stream(command, '\n'.join(shas) + '\n', with_stats, renames)
+
+    def merge_stats(self, sha, parent, renames=False):
+        """合并提交与第一个父提交比较，与 GitPython 的 commit.stats 一致"""
+        if renames not in self._diff_trees:
+            self._diff_trees[renames] = DiffTreeBatch(self.repo_path, GIT_CONFIG_OPTIONS, self.pathspecs, renames)
+        return self._diff_trees[renames].numstat(sha, parent)
+
+    def read_commit(self, sha):
+        """通过常驻的 cat-file 进程读取单个提交的元数据"""
+        if self._cat_file is None:
+            self._cat_file = CatFileBatch(self.repo_path, GIT_CONFIG_OPTIONS)
+        obj_type, data = self._cat_file.read(sha)
+        if obj_type != 'commit':
+            raise KeyError(sha)
+        return parse_commit_object(sha, data)
+
+    def close(self):
+        for pipe in [self._cat_file, *self._diff_trees.values()]:
+            if pipe is not None:
+                pipe.close()
+        self._cat_file = None
+        self._diff_trees = {}
+
+def glob_pathspec_matcher(pathspecs):
+    """将 build_pathspecs 生成的 pathspec 转换为 Python 路径匹配函数（供不支持 pathspec 的后端使用）"""
+    if not pathspecs:
+        return None
+
+    def to_regex(pattern):
+        # ** 匹配任意层级目录，* 和 ? 不跨越目录
+        regex = ''
+        i = 0
+        while i < len(pattern):
+            if pattern.startswith('**/', i):
+                regex += '(?:.*/)?'
+                i += 3
+            elif pattern.startswith('**', i):
+                regex += '.*'
+                i += 2
+            elif pattern[i] == '*':
+                regex += '[^/]*'
+                i += 1
+            elif pattern[i] == '?':
+                regex += '[^/]'
+                i += 1
+            else:
+                regex += re.escape(pattern[i])
+                i += 1
+        return re.compile(regex + r'\Z')
+
+    includes, excludes = [], []
+    for pathspec in pathspecs:
+        if pathspec == '.':
+            includes.append(re.compile(r'.*'))
+            continue
+        magic, _, pattern = pathspec[2:].partition(')')
+        (excludes if 'exclude' in magic.split(',') else includes).append(to_regex(pattern))
+
+    def matches(path):
+        return (any(regex.match(path) for regex in includes)
+                and not any(regex.match(path) for regex in excludes))
+    return matches
+
+class Pygit2Backend(GitBackend):
+    """基于 pygit2（libgit2）的后端：在进程内遍历提交并计算 diff，不启动 git 子进程
+
+    libgit2 不支持 pathspec 的历史简化：设置了路径过滤时，这里按与第一个父提交的差异逐个过滤提交，
+    而 git log 会跳过与某个父提交相同（TREESAME）的合并提交及只经由这些合并引入的侧分支提交，
+    因此在有合并的仓库中使用 --include/--exclude 时提交列表可能与 git 后端不同。
+    """
+    name = 'pygit2'
+
+    def __init__(self, repo, pathspecs=None):
+        import pygit2
+        super().__init__(repo, pathspecs)
+        self.pygit2 = pygit2
+        self.native = pygit2.Repository(repo.git_dir)
+        self.path_matcher = glob_pathspec_matcher(self.pathspecs)
+
+    def iter_commits(self, rev=None, with_stats=True, renames=False, since=None, until=None, no_merges=False,
+                     first_parent=False, merges=False, grep=None, regexp_ignore_case=False, extended_regexp=False):
+        pygit2 = self.pygit2
+        message_regex = compile_grep_patterns(grep, regexp_ignore_case)
+        since = int(datetime.fromisoformat(since).timestamp()) if since else None
+        until = int(datetime.fromisoformat(until).timestamp()) if until else None
+        hidden = None
+        if rev and '..' in rev:
+            hidden, _, rev = rev.partition('..')
+        target = self.native.revparse_single(rev).id if rev else self.native.head.target
+        walker = self.native.walk(target, pygit2.GIT_SORT_TIME)
+        if hidden:
+            walker.hide(self.native.revparse_single(hidden).id)
+        if first_parent:
+            walker.simplify_first_parent()
+        for commit in walker:
+            if since is not None and commit.commit_time < since:
+                # 按时间排序遍历，早于起始时间即可停止（与 git log --since 相同）
+                break
+            if until is not None and commit.commit_time > until:
+                continue
+            if no_merges and len(commit.parent_ids) > 1:
+                continue
+            if merges and len(commit.parent_ids) < 2:
+                continue
+            if message_regex and not message_regex.search(commit.message):
+                continue
+            record = self._to_record(commit, with_stats or self.path_matcher is not None, renames)
+            if self.path_matcher is not None and not record['files']:
+                continue
+            if not with_stats:
+                record['stats'] = record['files'] = None
+            yield record
+
+    def get_commits(self, shas, with_stats=True, renames=False):
+        for sha in shas:
+            yield self._to_record(self.native[sha], with_stats, renames)
+
+    def _to_record(self, commit, with_stats, renames=False):
+        total, files = self._compute_stats(commit, renames) if with_stats else (None, None)
+        return {
+            'hash': str(commit.id),
+            'parents': [str(parent_id) for parent_id in commit.parent_ids],
+            'author_name': commit.author.name,
+            'author_email': commit.author.email,
+            'committed_date': commit.commit_time,
+            'message': commit.message,
+            'stats': total,
+            'files': files
+        }
+
+    def _compute_stats(self, commit, renames=False):
+        """与第一个父提交比较（根提交与空树比较），统计每个文件的增删行数"""
+        if commit.parents:
+            diff = self.native.diff(commit.parents[0], commit)
+        else:
+            diff = commit.tree.diff_to_tree(swap=True)
+        if renames:
+            diff.find_similar()
+        total = {'insertions': 0, 'deletions': 0, 'lines': 0, 'files': 0}
+        files = {}
+        for patch in diff:
+            path = patch.delta.new_file.path or patch.delta.old_file.path
+            if self.path_matcher is not None and not self.path_matcher(path):
+                continue
+            if patch.delta.status == self.pygit2.GIT_DELTA_RENAMED:
+                path = f"{patch.delta.old_file.path} => {patch.delta.new_file.path}"
+            # 二进制文件不计行数，与 git --numstat 的 '-' 一致
+            _, insertions, deletions = (0, 0, 0) if patch.delta.is_binary else patch.line_stats
+            files[path] = {'insertions': insertions, 'deletions': deletions, 'lines': insertions + deletions}
+            total['insertions'] += insertions
+            total['deletions'] += deletions
+            total['lines'] += insertions + deletions
+            total['files'] += 1
+        return total, files
+
+GIT_BACKENDS = {
+    'gitpython': GitPythonBackend,
+    'batch': BatchBackend,
+    'pygit2': Pygit2Backend,
+}
+
+def commit_fingerprint(commit):
+    """提取提交字典中用于后端比对的字段"""
+    return (commit['hash'], commit['author'], commit['email'], commit['date'], commit['message'],
+            commit['stats']['insertions'], commit['stats']['deletions'], commit['stats']['files'],
+            sorted((path, stats['insertions'], stats['deletions']) for path, stats in commit['files'].items()))
+
+def check_backends(generator, names, start_date=None, end_date=None, authors=None):
+    """依次使用各后端读取提交并与第一个后端的结果比对，返回是否全部一致"""
+    if generator.pathspecs and 'pygit2' in names:
+        print("提示: pygit2 不支持 pathspec 的历史简化，有合并提交时与 git 后端的差异可能来自路径过滤")
+    results = {}
+    for name in names:
+        backend = create_backend(name, generator.repo, generator.pathspecs)
+        if backend.name != name:
+            print(f"跳过后端 {name}（不可用）")
+            continue
+        generator.backend = backend
+        print(f"\n使用后端 {name} 读取提交...")
+        results[name] = [commit_fingerprint(commit)
+                         for commit in generator.get_commits_in_range(start_date, end_date, authors)]
+        backend.close()
+
+    if len(results) < 2:
+        print("⚠️ 可用的后端少于两个，无法比对")
+        return False
+
+    reference_name, reference = next(iter(results.items()))
+    consistent = True
+    print("\n后端比对结果:")
+    for name, fingerprints in results.items():
+        if name == reference_name:
+            continue
+        mismatched = [left[0] for left, right in zip(reference, fingerprints) if left != right]
+        if len(reference) != len(fingerprints) or mismatched:
+            consistent = False
+            print(f"✗ {name} 与 {reference_name} 不一致: 提交数 {len(fingerprints)} / {len(reference)}，"
+                  f"不同的提交 {len(mismatched)} 个")
+            for sha in mismatched[:10]:
+                print(f"  {sha}")
+        else:
+            print(f"✓ {name} 与 {reference_name} 一致（{len(fingerprints)} 个提交）")
+    return consistent
+
+def create_backend(name, repo, pathspecs=None):
+    """创建指定的 Git 后端，pygit2 未安装时回退到 GitPython"""
+    try:
+        return GIT_BACKENDS[name](repo, pathspecs)
+    except ImportError:
+        print("警告: 未安装 pygit2，将使用 GitPython 后端。可以使用 pip install pygit2 安装")
+        return GitPythonBackend(repo, pathspecs)
+
+class PipelineQueue:
+    """流水线阶段之间的有界队列：队列满时生产者阻塞，可直接作为迭代器消费，生产端的异常在消费端重新抛出
+
+    消费端出错提前退出时调用 cancel()，之后生产端的 put/close 直接返回，不会因队列已满而永远阻塞。
+    """
+    _END = object()
+
+    def __init__(self, maxsize=256):
+        import queue
+        import threading
+        self.queue = queue.Queue(maxsize)
+        self.cancelled = threading.Event()
+
+    def put(self, item):
+        import queue
+        while not self.cancelled.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def close(self, error=None):
+        """结束队列；error 不为空时消费端会收到该异常"""
+        self.put(error if error is not None else self._END)
+
+    def cancel(self):
+        """消费端不再读取队列"""
+        self.cancelled.set()
+
+    def __iter__(self):
+        while True:
+            item = self.queue.get()
+            if item is self._END:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+def run_in_thread(source, maxsize=256):
+    """在后台线程中迭代 source，返回可供消费的有界队列"""
+    import threading
+    pipe = PipelineQueue(maxsize)
+
+    def produce():
+        try:
+            for item in source:
+                pipe.put(item)
+        except Exception as e:
+            pipe.close(e)
+        else:
+            pipe.close()
+
+    threading.Thread(target=produce, daemon=True).start()
+    return pipe
+
 class GitReportGenerator:
-    def __init__(self, repo_path, branch=None):
+    def __init__(self, repo_path, branch=None, cache_dir=None, use_mailmap=True, merge_policy='include',
+                 pathspecs=None, backend='gitpython'):
         self.repo_path = os.path.abspath(repo_path)
+        self.cache_dir = cache_dir
+        self.merge_policy = merge_policy
+        self.pathspecs = pathspecs or []
+        self.use_mailmap = use_mailmap
+        self.backend_name = backend
         try:
             self.repo = Repo(repo_path)
             # 获取仓库名称
@@ -53,16 +720,25 @@ class GitReportGenerator:
                     self.repo.git.checkout(branch)
                     print(f"已切换到分支: {branch}")
                 except GitCommandError as e:
-                    print(f"错误: 切换到分支 '{branch}' 失败: {str(e)}")
-                    sys.exit(1)
+                    raise ReportError(f"切换到分支 '{branch}' 失败: {str(e)}") from e
             
-            # 获取当前分支
-            self.current_branch = self.repo.active_branch.name
+            # 获取当前分支（子模块通常处于分离头指针状态）
+            self.current_branch = 'HEAD' if self.repo.head.is_detached else self.repo.active_branch.name
             
-        except InvalidGitRepositoryError:
-            print(f"错误: '{repo_path}' 不是一个有效的 Git 仓库")
-            print("请确保指定的路径是一个 Git 仓库")
-            sys.exit(1)
+            self.repo.git.set_persistent_git_options(c=GIT_CONFIG_OPTIONS)
+            
+            # 提交遍历与统计使用的后端
+            self.backend = create_backend(backend, self.repo, self.pathspecs)
+            
+            # 作者身份索引（支持 .mailmap）
+            self.identities = IdentityIndex.from_repo(self.repo, use_mailmap)
+            
+        except InvalidGitRepositoryError as e:
+            raise ReportError(f"'{repo_path}' 不是一个有效的 Git 仓库，请确保指定的路径是一个 Git 仓库") from e
+    
+    def _traversal_options(self):
+        """将合并提交策略转换为 git 遍历参数，由 git 自身跳过不需要的合并提交"""
+        return MERGE_POLICY_OPTIONS.get(self.merge_policy, {})
     
     def get_branches(self):
         """获取仓库的所有分支"""
@@ -78,8 +754,16 @@ class GitReportGenerator:
             print(f"获取分支列表时出错: {str(e)}")
             return []
     
-    def get_commits_in_range(self, start_date=None, end_date=None, authors=None):
-        """获取指定日期范围内的提交"""
+    def get_commits_in_range(self, start_date=None, end_date=None, authors=None, churn_tracker=None, path_aliases=None,
+                             pipeline=None, sinks=None, with_stats=True, grep=None, candidates=None):
+        """获取指定日期范围内的提交
+
+        pipeline 为队列长度时，git 读取在后台线程中进行；sinks 中的队列会依次收到每个转换后的提交。
+        with_stats=False 时只读取提交元数据，提交的 stats 和 files 为 None。
+        grep 为提交说明的扩展正则（任一匹配即可，不区分大小写），交给 git log --grep 过滤；
+        candidates 为提交说明索引查到的候选 SHA 集合，此时不遍历历史，只读取候选提交。
+        path_aliases 为 PathAliasTable 时，读取统计时启用重命名检测，别名表随读取的提交流增量构建。
+        """
         if not start_date:
             start_date = datetime.now(pytz.utc) - timedelta(days=7)
         if not end_date:
@@ -87,58 +771,114 @@ class GitReportGenerator:
             
         commits = []
         try:
-            # 如果指定了作者，先获取完整的作者信息
-            author_info = set()
-            if authors:
-                all_authors = self.get_authors()
-                print("\n匹配作者信息:")
-                
-                for full_author in all_authors:
-                    name_email = full_author.lower()
-                    for search_author in authors:
-                        if search_author.lower() in name_email:
-                            author_name = full_author.split(' <')[0]
-                            author_info.add(author_name)
-                            print(f"✓ 找到匹配: {search_author} -> {author_name}")
-                
-                if not author_info:
-                    print("⚠️ 警告: 未找到匹配的作者")
+            # 作者筛选：所有条件编译为一个正则，按身份 ID 缓存匹配结果
+            author_regex = self.identities.compile_patterns(authors)
+            matched_identities = set()
+            message_regex = compile_grep_patterns(grep)
             
             # 获取所有提交
-            all_commits = self.repo.iter_commits()
+            renames = path_aliases is not None and with_stats
+            if candidates is not None:
+                all_commits = self._iter_candidates(candidates, start_date, end_date, with_stats, renames)
+            else:
+                # 时间范围和提交说明交给 git 过滤，配合 commit-graph 可在越过起始日期后提前停止遍历
+                grep_options = {'grep': grep, 'regexp_ignore_case': True, 'extended_regexp': True} if grep else {}
+                all_commits = self.backend.iter_commits(None, with_stats, renames, since=start_date.isoformat(),
+                                                        until=end_date.isoformat(), **grep_options,
+                                                        **self._traversal_options())
+            if pipeline:
+                # git 读取与提交转换、聚合重叠执行
+                all_commits = run_in_thread(all_commits, pipeline)
             commit_count = 0
             matched_count = 0
             
             for commit in all_commits:
                 commit_count += 1
-                commit_date = datetime.fromtimestamp(commit.committed_date, pytz.utc)
+                if renames:
+                    path_aliases.visit(commit['hash'], commit['files'])
+                commit_date = datetime.fromtimestamp(commit['committed_date'], pytz.utc)
                 # 检查日期范围
                 if start_date <= commit_date <= end_date:
-                    # 如果指定了作者，检查作者是否匹配
-                    if authors:
-                        if commit.author.name not in author_info:
+                    # 索引候选只是超集，按提交说明确认匹配
+                    if message_regex and not message_regex.search(commit['message']):
+                        continue
+                    # 如果指定了作者，检查作者身份是否匹配
+                    if author_regex:
+                        identity_id = self.identities.resolve(commit['author_name'], commit['author_email'])
+                        if not self.identities.matches(identity_id, author_regex):
                             continue
+                        matched_identities.add(identity_id)
                     matched_count += 1
-                    commits.append({
-                        'hash': commit.hexsha,
-                        'author': commit.author.name,
-                        'email': commit.author.email,
-                        'date': commit_date,
-                        'message': commit.message.strip(),
-                        'stats': commit.stats.total,
-                        'files': commit.stats.files
-                    })
+                    commit_info = self._commit_to_info(commit, commit_date)
+                    # 按重命名历史将文件统计合并到规范路径
+                    if renames:
+                        commit_info['files'], commit_info['renames'] = path_aliases.consolidate(commit_info['files'])
+                        if commit_info['renames']:
+                            commit_info['stats'] = dict(commit_info['stats'])
+                            for key in ('insertions', 'deletions', 'lines'):
+                                commit_info['stats'][key] = sum(
+                                    stats.get(key, 0) for stats in commit_info['files'].values())
+                            commit_info['stats']['files'] = len(commit_info['files'])
+                    commits.append(commit_info)
+                    # 读取过程中同步累加变更排行
+                    if churn_tracker is not None:
+                        churn_tracker.add_commit(commit_info)
+                    for sink in sinks or []:
+                        sink.put(commit_info)
+            for sink in sinks or []:
+                sink.close()
+            
+            if author_regex:
+                print("\n匹配作者信息:")
+                for identity_id in sorted(matched_identities):
+                    print(f"✓ 找到匹配: {self.identities.label(identity_id)}")
+                if not matched_identities:
+                    print("⚠️ 警告: 未找到匹配的作者")
             
             print(f"\n处理的提交总数: {commit_count}")
             print(f"时间范围内的匹配提交数: {matched_count}")
+            if renames:
+                path_aliases.flush()
+                print(f"检测到文件重命名: {len(path_aliases.renames)} 次")
             
         except Exception as e:
-            print(f"获取提交记录时出错: {str(e)}")
-            sys.exit(1)
+            for sink in sinks or []:
+                sink.close(e)
+            raise ReportError(f"获取提交记录时出错: {str(e)}") from e
         return commits
     
-    def generate_markdown_report(self, commits, start_date=None, end_date=None):
-        """生成Markdown格式的报告"""
+    def _iter_candidates(self, candidates, start_date, end_date, with_stats=True, renames=False):
+        """读取候选提交：先按元数据筛选时间范围，再按提交时间从新到旧读取完整统计"""
+        selected = []
+        for commit in self.backend.get_commits(candidates, with_stats=False):
+            commit_date = datetime.fromtimestamp(commit['committed_date'], pytz.utc)
+            if start_date <= commit_date <= end_date:
+                selected.append(commit)
+        selected.sort(key=lambda commit: commit['committed_date'], reverse=True)
+        if not with_stats:
+            return iter(selected)
+        return self.backend.get_commits([commit['hash'] for commit in selected], renames=renames)
+    
+    def _commit_to_info(self, commit, commit_date=None):
+        """将后端返回的提交记录转换为报告使用的提交字典"""
+        if commit_date is None:
+            commit_date = datetime.fromtimestamp(commit['committed_date'], pytz.utc)
+        identity_id = self.identities.resolve(commit['author_name'], commit['author_email'])
+        identity = self.identities.identities[identity_id]
+        return {
+            'hash': commit['hash'],
+            'author': identity['name'],
+            'email': identity['email'],
+            'author_id': identity_id,
+            'date': commit_date,
+            'message': commit['message'].strip(),
+            'stats': commit['stats'],
+            'files': commit['files']
+        }
+    
+    def generate_markdown_report(self, commits, start_date=None, end_date=None, include_records=True, churn=None,
+                                 compact=False):
+        """生成Markdown格式的报告（compact 时详细提交记录渲染为表格）"""
         # 报告标题和概述
         report = "# 📊 Git 提交报告\n\n"
         report += "## 📌 仓库信息\n\n"
@@ -159,67 +899,74 @@ class GitReportGenerator:
         
         # 统计摘要
         report += "## 📈 统计摘要\n\n"
+        report += f"- **总提交次数**: {len(commits)} 次\n"
+        
+        # 变更排行：优先使用读取提交时增量统计的结果，否则在此精确统计
+        if churn is None:
+            churn = ChurnTracker().add_commits(commits)
+        
+        # 仅读取元数据时只统计提交次数，不包含行数和文件相关的内容
+        if not has_line_stats(commits):
+            report += "- **统计模式**: 仅提交元数据（不含行数和文件统计）\n"
+            report += "\n## 👥 作者贡献\n\n"
+            report += "| 作者 | 邮箱 | 提交次数 |\n"
+            report += "|------|------|----------|\n"
+            for author, stats in churn.authors.top():
+                error = f" (≤{stats['error']})" if churn.authors.approximate else ""
+                report += f"| {author} | {stats['meta']} | {stats['count']}{error} |\n"
+            if include_records:
+                report += render_commit_records(commits, compact)
+            return report
+        
         total_insertions = sum(commit['stats']['insertions'] for commit in commits)
         total_deletions = sum(commit['stats']['deletions'] for commit in commits)
-        report += f"- **总提交次数**: {len(commits)} 次\n"
         report += f"- **代码变更**: +{total_insertions} 行, -{total_deletions} 行\n"
+        if churn.approximate:
+            report += f"- **排行统计**: 近似统计（每类最多保留 {churn.files.capacity} 项，计数误差上限见各表“误差”列）\n"
         
         # 作者贡献统计
-        authors_stats = defaultdict(lambda: {'commits': 0, 'insertions': 0, 'deletions': 0, 'email': ''})
-        for commit in commits:
-            author = commit['author']
-            authors_stats[author]['commits'] += 1
-            authors_stats[author]['insertions'] += commit['stats']['insertions']
-            authors_stats[author]['deletions'] += commit['stats']['deletions']
-            authors_stats[author]['email'] = commit['email']  # 保存作者邮箱
-        
         report += "\n## 👥 作者贡献\n\n"
-        report += "| 作者 | 邮箱 | 提交次数 | 添加行数 | 删���行数 |\n"
-        report += "|------|------|----------|----------|----------|\n"
-        for author, stats in authors_stats.items():
-            report += f"| {author} | {stats['email']} | {stats['commits']} | +{stats['insertions']} | -{stats['deletions']} |\n"
-        
-        # 文件变更统计
-        files_stats = defaultdict(lambda: {'changes': 0, 'insertions': 0, 'deletions': 0})
-        for commit in commits:
-            for file_path, stats in commit['files'].items():
-                files_stats[file_path]['changes'] += 1
-                files_stats[file_path]['insertions'] += stats.get('insertions', 0)
-                files_stats[file_path]['deletions'] += stats.get('deletions', 0)
+        if churn.authors.approximate:
+            report += "| 作者 | 邮箱 | 提交次数 | 添加行数 | 删除行数 | 误差 |\n"
+            report += "|------|------|----------|----------|----------|------|\n"
+            for author, stats in churn.authors.top():
+                report += f"| {author} | {stats['meta']} | {stats['count']} | +{stats['insertions']} | -{stats['deletions']} | ≤{stats['error']} |\n"
+        else:
+            report += "| 作者 | 邮箱 | 提交次数 | 添加行数 | 删���行数 |\n"
+            report += "|------|------|----------|----------|----------|\n"
+            for author, stats in churn.authors.entries.items():
+                report += f"| {author} | {stats['meta']} | {stats['count']} | +{stats['insertions']} | -{stats['deletions']} |\n"
         
+        # 文件变更统计（按变更次数排序，只显示变更最多的10个文件）
         report += "\n## 📁 文件变更统计\n\n"
-        report += "| 文件 | 变更次数 | 添加行数 | 删除行数 |\n"
-        report += "|------|----------|----------|----------|\n"
-        # 按变更次数排序
-        sorted_files = sorted(files_stats.items(), key=lambda x: x[1]['changes'], reverse=True)
-        for file_path, stats in sorted_files[:10]:  # 只显示变更最多的10个文件
-            report += f"| `{file_path}` | {stats['changes']} | +{stats['insertions']} | -{stats['deletions']} |\n"
-        
-        # 详细提交记录
-        report += "\n## 📝 详细提交记录\n\n"
-        # 按日期分组显示提交
-        commits_by_date = defaultdict(list)
-        for commit in commits:
-            date_str = commit['date'].strftime('%Y-%m-%d')
-            commits_by_date[date_str].append(commit)
+        report += self._render_churn_table(churn.files, '文件', code=True)
         
-        for date_str, day_commits in sorted(commits_by_date.items(), reverse=True):
-            report += f"### 📅 {date_str}\n\n"
-            for commit in day_commits:
-                report += f"#### ⚡ 提交 `{commit['hash'][:8]}`\n\n"
-                report += f"- **作者**: {commit['author']} <{commit['email']}>\n"
-                report += f"- **时间**: {commit['date'].strftime('%H:%M:%S')}\n"
-                report += f"- **变更**: +{commit['stats']['insertions']} 行, -{commit['stats']['deletions']} 行\n"
-                report += f"- **说明**: {commit['message']}\n\n"
-                # 显示文件变更详情
-                if commit['files']:
-                    report += "**变更文件**:\n"
-                    for file_path, stats in commit['files'].items():
-                        report += f"- `{file_path}`: +{stats.get('insertions', 0)} -{stats.get('deletions', 0)}\n"
-                report += "\n---\n\n"
+        # 目录变更统计
+        report += "\n## 📂 目录变更统计\n\n"
+        report += self._render_churn_table(churn.directories, '目录', code=True)
+        
+        # 详细提交记录（分页模式下由各分页单独渲染）
+        if include_records:
+            report += render_commit_records(commits, compact)
         
         return report
     
+    def _render_churn_table(self, hitters, label, code=False, limit=10):
+        """渲染变更排行表格，近似统计时附加误差列"""
+        if hitters.approximate:
+            table = f"| {label} | 变更次数 | 添加行数 | 删除行数 | 误差 |\n"
+            table += "|------|----------|----------|----------|------|\n"
+        else:
+            table = f"| {label} | 变更次数 | 添加行数 | 删除行数 |\n"
+            table += "|------|----------|----------|----------|\n"
+        for key, stats in hitters.top(limit):
+            name = f"`{key}`" if code else key
+            row = f"| {name} | {stats['count']} | +{stats['insertions']} | -{stats['deletions']} |"
+            if hitters.approximate:
+                row += f" ≤{stats['error']} |"
+            table += row + "\n"
+        return table
+    
     def _format_date_range(self, start_date, end_date):
         """格式化日期范围显��"""
         if start_date and end_date:
@@ -231,8 +978,12 @@ class GitReportGenerator:
         else:
             return "最近7天"
     
-    def save_report(self, report, output_dir, output_file, format='md'):
-        """保存报告到指定目录，支持md和html格式"""
+    def save_report(self, report, output_dir, output_file, format='md', flat_dir=True, compact=False, static=None):
+        """保存报告到指定目录，支持md和html格式（compact 时生成紧凑 HTML）
+
+        static 为预压缩格式列表（如 ['gz']）时使用静态发布模式：HTML 引用 write_shared_stylesheet 写入的共享样式表，
+        内容未变化的文件不重写，并为 HTML 生成预压缩的同名文件。
+        """
         try:
             print(f"\n开始保存报告: {output_file}")
             print(f"输出目录: {output_dir}")
@@ -243,51 +994,26 @@ class GitReportGenerator:
             # 根据format参数保存文件
             if format in ['md', 'both']:
                 # 确定MD文件的保存路径
-                if args.flat_dir:
-                    md_path = os.path.join(output_dir, 'md', os.path.splitext(output_file)[0] + '.md')
-                else:
-                    if output_file.startswith('summary-'):
-                        md_path = os.path.join(output_dir, 'md', 'summary', os.path.splitext(output_file)[0] + '.md')
-                    elif output_file.startswith('detail-'):
-                        md_path = os.path.join(output_dir, 'md', 'details', os.path.splitext(output_file)[0] + '.md')
-                    elif output_file.startswith('maven-'):
-                        md_path = os.path.join(output_dir, 'md', 'maven', os.path.splitext(output_file)[0] + '.md')
-                    else:
-                        md_path = os.path.join(output_dir, 'md', os.path.splitext(output_file)[0] + '.md')
-                
-                # 确保目录存在
-                os.makedirs(os.path.dirname(md_path), exist_ok=True)
+                md_path = resolve_report_path(output_dir, output_file, 'md', flat_dir)
                 
                 print(f"保存Markdown文件: {md_path}")
-                with open(md_path, 'w', encoding='utf-8') as f:
-                    f.write(report)
+                if not write_output_file(md_path, report, None if static is None else []):
+                    print("内容未变化，跳过写入")
                 generated_files.append(md_path)
             
             if format in ['html', 'both']:
                 print("开始生成HTML文件...")
-                html_content = convert_to_html(report)
+                # 确定HTML文件的保存路径
+                html_path = resolve_report_path(output_dir, output_file, 'html', flat_dir)
+                stylesheet = shared_stylesheet_link(output_dir, html_path) if static is not None else None
+                html_content = convert_to_html(report, compact, stylesheet)
                 if html_content:
-                    # 确定HTML文件的保存路径
-                    if args.flat_dir:
-                        html_path = os.path.join(output_dir, 'html', os.path.splitext(output_file)[0] + '.html')
-                    else:
-                        if output_file.startswith('summary-'):
-                            html_path = os.path.join(output_dir, 'html', 'summary', os.path.splitext(output_file)[0] + '.html')
-                        elif output_file.startswith('detail-'):
-                            html_path = os.path.join(output_dir, 'html', 'details', os.path.splitext(output_file)[0] + '.html')
-                        elif output_file.startswith('maven-'):
-                            html_path = os.path.join(output_dir, 'html', 'maven', os.path.splitext(output_file)[0] + '.html')
-                        else:
-                            html_path = os.path.join(output_dir, 'html', os.path.splitext(output_file)[0] + '.html')
-                    
-                    # 确保目录存在
-                    os.makedirs(os.path.dirname(html_path), exist_ok=True)
-                    
                     print(f"保存HTML文件: {html_path}")
                     try:
-                        with open(html_path, 'w', encoding='utf-8') as f:
-                            f.write(html_content)
-                        print("HTML文件保存成功")
+                        if write_output_file(html_path, html_content, static):
+                            print("HTML文件保存成功")
+                        else:
+                            print("内容未变化，跳过写入")
                         generated_files.append(html_path)
                     except Exception as e:
                         print(f"保存HTML文件时出错: {str(e)}")
@@ -298,34 +1024,675 @@ class GitReportGenerator:
             return generated_files
             
         except Exception as e:
-            print(f"保存报告时出错: {str(e)}")
-            print(f"完整错误信息: {e.__class__.__name__}: {str(e)}")
-            import traceback
-            print("错误堆栈:")
-            traceback.print_exc()
-            sys.exit(1)
+            raise ReportError(f"保存报告时出错: {e.__class__.__name__}: {str(e)}") from e
+    
+    def get_commits_by_refs(self, refs, start_date=None, end_date=None, authors=None, grep=None):
+        """一次遍历多个分支的历史并集，为每个提交标记可到达它的分支（位集）"""
+        if not start_date:
+            start_date = datetime.now(pytz.utc) - timedelta(days=7)
+        if not end_date:
+            end_date = datetime.now(pytz.utc)
+
+        commits = []
+        try:
+            # 分支头各占一位，按拓扑序（子提交先于父提交）将位集传播给父提交
+            reach = defaultdict(int)
+            for i, ref in enumerate(refs):
+                reach[self.repo.commit(ref).hexsha] |= 1 << i
+            # 可达性必须沿完整的提交图传播：合并提交策略不能用于这次遍历，否则位集无法经过被跳过的合并提交
+            output = self.repo.git.rev_list('--topo-order', '--parents',
+                                            f"--since={start_date.isoformat()}", *refs,
+                                            '--', *self.pathspecs)
+            # 可达性需要完整的拓扑顺序，提交说明的筛选在读取元数据时进行
+            message_regex = compile_grep_patterns(grep)
+            order = []
+            merges = set()
+            for line in output.splitlines():
+                sha, *parents = line.split()
+                order.append(sha)
+                if len(parents) > 1:
+                    merges.add(sha)
+                for parent in parents:
+                    reach[parent] |= reach[sha]
+
+            # 合并提交策略只用于选择要统计的提交
+            candidates = order
+            if self.merge_policy == 'skip':
+                candidates = [sha for sha in order if sha not in merges]
+            elif self.merge_policy == 'only':
+                candidates = [sha for sha in order if sha in merges]
+            elif self.merge_policy == 'first-parent':
+                mainline = set(self.repo.git.rev_list(f"--since={start_date.isoformat()}", *refs, '--',
+                                                      *self.pathspecs, **self._traversal_options()).split())
+                candidates = [sha for sha in order if sha in mainline]
+
+            # 先按元数据筛选日期和作者，再批量读取需要的提交统计
+            author_regex = self.identities.compile_patterns(authors)
+            selected = []
+            for commit in self.backend.get_commits(candidates, with_stats=False):
+                commit_date = datetime.fromtimestamp(commit['committed_date'], pytz.utc)
+                if not (start_date <= commit_date <= end_date):
+                    continue
+                if message_regex and not message_regex.search(commit['message']):
+                    continue
+                if author_regex:
+                    identity_id = self.identities.resolve(commit['author_name'], commit['author_email'])
+                    if not self.identities.matches(identity_id, author_regex):
+                        continue
+                selected.append(commit['hash'])
+            for commit in self.backend.get_commits(selected):
+                sha = commit['hash']
+                commit_info = self._commit_to_info(commit)
+                commit_info['ref_mask'] = reach[sha]
+                commit_info['refs'] = [ref for i, ref in enumerate(refs) if reach[sha] >> i & 1]
+                commits.append(commit_info)
+
+            print(f"\n遍历的提交总数: {len(order)}（{len(refs)} 个分支的历史并集）")
+            print(f"时间范围内的匹配提交数: {len(commits)}")
+        except (GitCommandError, ValueError) as e:
+            raise ReportError(f"获取多分支提交记录时出错: {str(e)}") from e
+        # 与单分支模式一致，按提交时间从新到旧排列
+        commits.sort(key=lambda c: c['date'], reverse=True)
+        return commits
+    
+    def sample_commits(self, start_date=None, end_date=None, authors=None, size=1000, strategy='month', seed=None,
+                       grep=None, candidates=None):
+        """抽样模式：完整读取提交元数据作为总体，只为抽中的提交计算行数统计"""
+        population = self.get_commits_in_range(start_date, end_date, authors, with_stats=False, grep=grep,
+                                               candidates=candidates)
+        strata = draw_sample(population, size, strategy, seed)
+        sample = [commit for stratum in strata.values() for commit in stratum['sample']]
+        # 样本一次批量读取统计
+        records = {record['hash']: record for record in self.backend.get_commits([c['hash'] for c in sample])}
+        for commit in sample:
+            commit['stats'] = records[commit['hash']]['stats']
+            commit['files'] = records[commit['hash']]['files']
+        sample.sort(key=lambda c: c['date'], reverse=True)
+
+        author_commits = defaultdict(int)
+        for commit in population:
+            author_commits[commit['author']] += 1
+        print(f"\n抽样完成: 总体 {len(population)} 个提交，{len(strata)} 层，样本 {len(sample)} 个")
+        return {
+            'strategy': strategy,
+            'population': len(population),
+            'requested': size,
+            'sample': sample,
+            'strata': strata,
+            'author_commits': dict(author_commits)
+        }
+    
+    def get_submodule_changes(self, revisions):
+        """读取提交中的子模块指针（gitlink）变更
+
+        revisions 为若干组 git log 参数（如时间范围或 旧..新 区间），返回 {子模块路径: [(旧指针, 新指针), ...]}，
+        新增的子模块旧指针为 None，被删除的子模块不计入。合并提交按与第一个父提交的差异读取，
+        合并进来的指针变更同样计入。
+        """
+        changes = defaultdict(list)
+        try:
+            for arguments in revisions:
+                output = self.repo.git.log('--raw', '--no-abbrev', '--no-renames', '--root', '--diff-merges=first-parent',
+                                           '--format=', *arguments)
+                for line in output.splitlines():
+                    if not line.startswith(':'):
+                        continue
+                    meta, path = line.split('\t', 1)
+                    old_mode, new_mode, old_sha, new_sha, status = meta[1:].split()
+                    if new_mode != '160000' or status == 'D':
+                        continue
+                    pointer = (None if old_mode != '160000' else old_sha, new_sha)
+                    if pointer not in changes[path]:
+                        changes[path].append(pointer)
+        except GitCommandError as e:
+            print(f"读取子模块指针变更时出错: {str(e)}")
+        # git log 从新到旧输出，按时间先后排列各次指针变更
+        return {path: pointers[::-1] for path, pointers in changes.items()}
+    
+    def get_commits_in_ranges(self, ranges, authors=None, grep=None, with_stats=True, since=None, until=None):
+        """读取若干提交区间（旧指针..新指针）的并集，区间之间重复的提交只计一次，按提交时间从新到旧排列
+
+        没有旧指针的区间（如新增的子模块）只读取 since/until 时间范围内的提交，而不是新指针的全部历史。
+        """
+        commits = []
+        try:
+            shas = []
+            seen = set()
+            window = [f"--{option}={value.isoformat()}" for option, value in (('since', since), ('until', until)) if value]
+            for old, new in ranges:
+                revisions = [new, *window] if old is None else [new, f"^{old}"]
+                for sha in self.repo.git.rev_list(*revisions, '--', *self.pathspecs,
+                                                  **self._traversal_options()).split():
+                    if sha not in seen:
+                        seen.add(sha)
+                        shas.append(sha)
+
+            # 先按元数据筛选作者和提交说明，再批量读取需要的提交统计
+            author_regex = self.identities.compile_patterns(authors)
+            message_regex = compile_grep_patterns(grep)
+            selected = []
+            for commit in self.backend.get_commits(shas, with_stats=False):
+                if message_regex and not message_regex.search(commit['message']):
+                    continue
+                if author_regex:
+                    identity_id = self.identities.resolve(commit['author_name'], commit['author_email'])
+                    if not self.identities.matches(identity_id, author_regex):
+                        continue
+                selected.append(commit if not with_stats else commit['hash'])
+            records = self.backend.get_commits(selected) if with_stats else selected
+            commits = [self._commit_to_info(commit) for commit in records]
+        except (GitCommandError, ValueError) as e:
+            # 子模块中缺少父仓库引用的提交（未 fetch）时跳过该子模块
+            print(f"⚠️ 读取 {self.repo_name} 的提交区间时出错，已跳过: {str(e)}")
+            return []
+        commits.sort(key=lambda c: c['date'], reverse=True)
+        return commits
+    
+    def get_cache_dir(self):
+        """获取缓存目录（默认位于仓库的 .git 目录下，不影响工作区）"""
+        cache_dir = self.cache_dir or os.path.join(self.repo.git_dir, 'git-report-cache')
+        os.makedirs(cache_dir, exist_ok=True)
+        return cache_dir
+    
+    def get_file_blobs(self, paths, rev='HEAD'):
+        """获取指定版本中文件的 blob SHA，不存在的文件不返回"""
+        wanted = set(paths)
+        blobs = {}
+        try:
+            output = self.repo.git.ls_tree('-r', '-z', rev)
+        except GitCommandError as e:
+            print(f"读取文件列表时出错: {str(e)}")
+            return blobs
+        for entry in output.split('\x00'):
+            if not entry:
+                continue
+            meta, path = entry.split('\t', 1)
+            _, obj_type, sha = meta.split()
+            if obj_type == 'blob' and path in wanted:
+                blobs[path] = sha
+        return blobs
+    
+    def blame_file(self, path, rev='HEAD'):
+        """使用 git blame --incremental 统计文件每一行的当前作者"""
+        owners = defaultdict(int)
+        commit_authors = {}
+        output = self.repo.git.blame('--incremental', rev, '--', path)
+        current_sha = None
+        current_lines = 0
+        for line in output.splitlines():
+            parts = line.split(' ')
+            if len(parts) == 4 and len(parts[0]) in (40, 64) and parts[3].isdigit():
+                current_sha = parts[0]
+                current_lines = int(parts[3])
+            elif line.startswith('author ') and current_sha:
+                commit_authors[current_sha] = line[len('author '):]
+            elif line.startswith('filename ') and current_sha:
+                # 每个分组以 filename 结束
+                owners[commit_authors.get(current_sha, '未知')] += current_lines
+                current_sha = None
+        return dict(owners)
+    
+    def analyze_ownership(self, commits, jobs=None, rev='HEAD'):
+        """对提交涉及的文件做并行 blame，按 (路径, blob SHA) 缓存结果"""
+        paths = {file_path for commit in commits for file_path in commit['files']}
+        blobs = self.get_file_blobs(paths, rev)
+
+        cache_path = os.path.join(self.get_cache_dir(), 'blame-cache.json')
+        cache = load_json_cache(cache_path)
+
+        ownership = {}
+        pending = []
+        for path, blob in blobs.items():
+            key = f"{path}:{blob}"
+            if key in cache:
+                ownership[path] = cache[key]
+            else:
+                pending.append((path, key))
+
+        print(f"\n开始分析代码归属: {len(blobs)} 个文件，缓存命中 {len(blobs) - len(pending)} 个，需要 blame {len(pending)} 个")
+        if pending:
+            from concurrent.futures import ThreadPoolExecutor
+            workers = jobs or os.cpu_count() or 1
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {executor.submit(self.blame_file, path, rev): (path, key) for path, key in pending}
+                for future, (path, key) in futures.items():
+                    try:
+                        owners = future.result()
+                    except GitCommandError as e:
+                        print(f"blame 文件 {path} 时出错: {str(e)}")
+                        continue
+                    ownership[path] = owners
+                    cache[key] = owners
+            # 其他进程可能同时写入了缓存，加锁后合并最新的缓存内容再保存
+            with FileLock(cache_path):
+                save_json_cache(cache_path, dict(load_json_cache(cache_path), **cache))
+
+        return {
+            'files': ownership,
+            'cache_hits': len(blobs) - len(pending),
+            'blamed': len(pending)
+        }
     
     def get_authors(self):
-        """获取仓库中所有的提交作者"""
+        """获取仓库中所有的提交作者（按 .mailmap 归并）"""
         try:
-            authors = set()
-            for commit in self.repo.iter_commits():
-                authors.add(f"{commit.author.name} <{commit.author.email}>")
-            return sorted(list(authors))
+            identity_ids = set()
+            for commit in self.backend.iter_commits('HEAD', with_stats=False):
+                identity_ids.add(self.identities.resolve(commit['author_name'], commit['author_email']))
+            return sorted(self.identities.label(identity_id) for identity_id in identity_ids)
         except Exception as e:
             print(f"获取作者列表出错: {str(e)}")
             return []
 
+def temp_output_path(path):
+    """生成与目标文件同目录的临时文件名（包含进程和线程号，并发写入互不冲突）"""
+    import threading
+    return f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+
+def atomic_write(path, data):
+    """原子写入文件：先写同目录的临时文件再重命名，读取方不会看到写了一半的文件"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temp_path = temp_output_path(path)
+    try:
+        if isinstance(data, str):
+            with open(temp_path, 'x', encoding='utf-8') as f:
+                f.write(data)
+        else:
+            with open(temp_path, 'xb') as f:
+                f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+class FileLock:
+    """基于同目录下隐藏的 .<文件名>.lock 文件的进程间建议锁（POSIX 使用 flock，Windows 使用 msvcrt），用于保护共享的缓存和产物"""
+
+    def __init__(self, path):
+        self.lock_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.lock")
+        self.file = None
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(self.lock_path) or '.', exist_ok=True)
+        self.file = open(self.lock_path, 'a+')
+        try:
+            import fcntl
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+        except ImportError:
+            import msvcrt
+            self.file.seek(0)
+            # LK_LOCK 最多重试 10 秒，继续等待直到获得锁
+            while True:
+                try:
+                    msvcrt.locking(self.file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        return self
+
+    def __exit__(self, *exc_info):
+        try:
+            import fcntl
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+        except ImportError:
+            import msvcrt
+            self.file.seek(0)
+            msvcrt.locking(self.file.fileno(), msvcrt.LK_UNLCK, 1)
+        self.file.close()
+        self.file = None
+        return False
+
+def load_json_cache(cache_path):
+    """读取 JSON 缓存文件，不存在或损坏时返回空字典"""
+    import json
+    if not os.path.exists(cache_path):
+        return {}
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"读取缓存 {cache_path} 失败，将重新生成: {str(e)}")
+        return {}
+
+def cache_file_name(prefix, branch, signature):
+    """按分支和配置签名命名缓存文件，不同配置交替运行时各自保留一份缓存"""
+    import hashlib
+    clean_branch = ''.join(c if c.isalnum() or c in '-_' else '_' for c in branch)
+    digest = hashlib.sha1('\n'.join(signature).encode('utf-8')).hexdigest()[:12]
+    return f"{prefix}-{clean_branch}-{digest}.json"
+
+def save_json_cache(cache_path, data):
+    """保存 JSON 缓存文件（原子写入，并发运行时不会读到写了一半的缓存）"""
+    import json
+    try:
+        atomic_write(cache_path, json.dumps(data, ensure_ascii=False))
+    except OSError as e:
+        print(f"保存缓存 {cache_path} 失败: {str(e)}")
+
+RENAME_PATTERN = re.compile(r'^(.*)\{(.*) => (.*)\}(.*)$')
+
+def parse_rename_path(path):
+    """解析 numstat 中的重命名路径（`dir/{old => new}/file` 或 `old => new`），返回 (旧路径, 新路径)"""
+    match = RENAME_PATTERN.match(path)
+    if match:
+        prefix, old, new, suffix = match.groups()
+        old_path = (prefix + old + suffix).replace('//', '/')
+        new_path = (prefix + new + suffix).replace('//', '/')
+        return old_path, new_path
+    if ' => ' in path:
+        old_path, new_path = path.split(' => ', 1)
+        return old_path, new_path
+    return None
+
+class PathAliasTable:
+    """基于并查集的路径别名表：将文件的历史路径合并到同一身份，根节点为最新路径
+
+    别名表在读取提交的过程中增量构建：提交按从新到旧的顺序到达，遇到 旧 => 新 的重命名时，为旧路径新建一个
+    节点并合并到新路径当前的节点，之后（更早的）提交中的旧路径都归入新路径。同一路径在不同时间可能属于不同的
+    文件（A 重命名为 B 之后新建的 A 与 B 无关），重命名之前已处理的新文件 A 仍使用原来的节点，因此不会被合并。
+    已有节点的父节点不会改变（只有新建的节点才挂到其他节点下），每次合并的代价与表的大小无关。
+    """
+
+    def __init__(self):
+        self.parent = {}                # 节点 → 父节点，节点为 (路径, 序号)
+        self.current = {}               # 路径 → 当前（正在处理的时间点）使用的节点
+        self.renames = []               # [(sha, 旧路径, 新路径)]
+        self.pending = None             # 正在处理的提交的重命名，处理下一个提交时生效
+
+    def node(self, path):
+        """路径当前使用的节点"""
+        return self.current.get(path, (path, 0))
+
+    def find_node(self, node):
+        """返回节点所在集合的根节点（带路径压缩）"""
+        root = node
+        while root in self.parent:
+            root = self.parent[root]
+        while node != root:
+            next_node = self.parent[node]
+            self.parent[node] = root
+            node = next_node
+        return root
+
+    def find(self, path):
+        """返回路径当前所属文件的规范路径（最新路径）"""
+        return self.find_node(self.node(path))[0]
+
+    def add_renames(self, sha, pairs):
+        """记录一个提交中的重命名 [(旧路径, 新路径)]；同一提交的重命名都按提交之后的路径解析"""
+        targets = [(old_path, self.node(new_path)) for old_path, new_path in pairs]
+        for (old_path, target), (_, new_path) in zip(targets, pairs):
+            old_node = (old_path, len(self.renames) + 1)
+            self.current[old_path] = old_node
+            self.parent[old_node] = target
+            self.renames.append((sha, old_path, new_path))
+
+    def history(self, path):
+        """返回与该路径（最新路径）属于同一文件的所有历史路径"""
+        self.flush()
+        root = self.find_node(self.node(path))
+        return sorted({node[0] for node in list(self.parent) if node[0] != path and self.find_node(node) == root})
+
+    def visit(self, sha, files):
+        """按从新到旧的顺序处理到该提交，从 numstat 路径（旧 => 新）中读取重命名；被筛选掉的提交同样需要调用
+
+        提交中的路径是提交之后的路径，因此本提交的重命名在处理下一个（更早的）提交时才生效。
+        """
+        self.flush()
+        pairs = [renamed for renamed in map(parse_rename_path, files or {}) if renamed]
+        self.pending = (sha, pairs) if pairs else None
+
+    def flush(self):
+        """使正在处理的提交的重命名生效"""
+        if self.pending:
+            self.add_renames(*self.pending)
+            self.pending = None
+
+    def consolidate(self, files):
+        """将最近一次 visit 的提交的文件统计按规范路径合并，返回 (合并后的文件统计, 本提交的重命名列表)"""
+        consolidated = {}
+        renames = []
+        for raw_path, stats in files.items():
+            stats = dict(stats)
+            renamed = parse_rename_path(raw_path)
+            if renamed:
+                raw_path = renamed[1]
+                renames.append({'old': renamed[0], 'new': renamed[1],
+                                'insertions': stats.get('insertions', 0),
+                                'deletions': stats.get('deletions', 0)})
+
+            canonical = self.find(raw_path)
+            if canonical in consolidated:
+                merged = consolidated[canonical]
+                for key in ('insertions', 'deletions', 'lines'):
+                    merged[key] = merged.get(key, 0) + stats.get(key, 0)
+            else:
+                consolidated[canonical] = stats
+        return consolidated, renames
+
+MAILMAP_PATTERN = re.compile(r'^\s*([^<#]*?)\s*<([^>]*)>\s*(?:([^<#]*?)\s*<([^>]*)>)?')
+
+class IdentityIndex:
+    """作者身份索引：按 .mailmap 归并同一开发者的多个名字/邮箱，并为每个身份分配整数 ID
+
+    与 git 一致，身份以 mailmap 映射后的 (名字, 邮箱) 区分，只有 mailmap 明确映射到一起的作者信息才会合并；
+    by_name 时（--no-mailmap）按作者名字归并。
+    """
+
+    def __init__(self, mailmap_text='', by_name=False):
+        self.mailmap = {}           # 提交邮箱 -> {'default': (名字, 邮箱), 'names': {提交名字: (名字, 邮箱)}}
+        self.identities = []        # ID -> {'name', 'email', 'aliases'}
+        self.by_name = by_name
+        self._by_key = {}           # 规范 (名字, 邮箱)（by_name 时为名字） -> ID
+        self._resolved = {}         # (提交名字, 提交邮箱) -> ID
+        self._matches = {}          # 身份匹配结果缓存
+        self.signature = 'names' if by_name else ''
+        if mailmap_text:
+            import hashlib
+            self.signature = hashlib.sha1(mailmap_text.encode('utf-8')).hexdigest()
+            self._parse_mailmap(mailmap_text)
+
+    @classmethod
+    def from_repo(cls, repo, use_mailmap=True):
+        """从仓库读取 .mailmap（以及 mailmap.file 配置）构建身份索引"""
+        if not use_mailmap:
+            return cls(by_name=True)
+        paths = []
+        if repo.working_tree_dir:
+            paths.append(os.path.join(repo.working_tree_dir, '.mailmap'))
+        try:
+            configured = repo.git.config('--get', 'mailmap.file')
+            if configured:
+                paths.append(os.path.expanduser(configured))
+        except GitCommandError:
+            pass
+
+        texts = []
+        for path in paths:
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                    texts.append(f.read())
+        return cls('\n'.join(texts))
+
+    def _parse_mailmap(self, text):
+        """解析 .mailmap 的四种格式"""
+        for line in text.splitlines():
+            match = MAILMAP_PATTERN.match(line)
+            if not match:
+                continue
+            name1, email1, name2, email2 = match.groups()
+            if email2 is None:
+                # Proper Name <commit@email>
+                proper, commit_email, commit_name = (name1 or None, None), email1, None
+            else:
+                # [Proper Name] <proper@email> [Commit Name] <commit@email>
+                proper, commit_email, commit_name = (name1 or None, email1), email2, name2 or None
+            entry = self.mailmap.setdefault(commit_email.lower(), {'default': None, 'names': {}})
+            if commit_name:
+                entry['names'][commit_name.lower()] = proper
+            else:
+                entry['default'] = proper
+
+    def canonical(self, name, email):
+        """返回 mailmap 归并后的 (名字, 邮箱)"""
+        entry = self.mailmap.get((email or '').lower())
+        if entry:
+            proper = entry['names'].get((name or '').lower()) or entry['default']
+            if proper:
+                return proper[0] or name, proper[1] or email
+        return name, email
+
+    def resolve(self, name, email):
+        """返回提交作者对应的身份 ID（同一作者信息只解析一次）"""
+        raw = (name, email)
+        identity_id = self._resolved.get(raw)
+        if identity_id is not None:
+            return identity_id
+
+        canonical_name, canonical_email = self.canonical(name, email)
+        key = canonical_name if self.by_name else (canonical_name, (canonical_email or '').lower())
+        identity_id = self._by_key.get(key)
+        if identity_id is None:
+            identity_id = len(self.identities)
+            self._by_key[key] = identity_id
+            self.identities.append({'name': canonical_name, 'email': canonical_email, 'aliases': set()})
+        self.identities[identity_id]['aliases'].add(f"{name} <{email}>")
+        self._resolved[raw] = identity_id
+        # 新增别名后需要重新判断匹配
+        self._matches = {k: v for k, v in self._matches.items() if k[1] != identity_id}
+        return identity_id
+
+    def compile_patterns(self, patterns):
+        """将多个作者筛选条件编译为一个不区分大小写的正则，一次扫描完成全部匹配"""
+        if not patterns:
+            return None
+        return re.compile('|'.join(re.escape(pattern) for pattern in patterns), re.IGNORECASE)
+
+    def matches(self, identity_id, regex):
+        """判断身份（规范名字/邮箱或任一别名）是否匹配筛选条件，结果按身份缓存"""
+        cache_key = (regex.pattern, identity_id)
+        matched = self._matches.get(cache_key)
+        if matched is None:
+            identity = self.identities[identity_id]
+            texts = [f"{identity['name']} <{identity['email']}>"] + sorted(identity['aliases'])
+            matched = any(regex.search(text) for text in texts)
+            self._matches[cache_key] = matched
+        return matched
+
+    def add_aliases(self, identity_id, aliases):
+        """为身份补充别名（如缓存中保存的历史提交作者信息）"""
+        identity = self.identities[identity_id]
+        if not identity['aliases'].issuperset(aliases):
+            identity['aliases'].update(aliases)
+            self._matches = {k: v for k, v in self._matches.items() if k[1] != identity_id}
+
+    def label(self, identity_id):
+        """身份的显示文本：名字 <邮箱>"""
+        identity = self.identities[identity_id]
+        return f"{identity['name']} <{identity['email']}>"
+
+def resolve_report_path(output_dir, output_file, ext, flat_dir=True):
+    """根据报告类型和目录模式确定报告文件的保存路径"""
+    file_name = os.path.splitext(output_file)[0] + '.' + ext
+    if flat_dir:
+        return os.path.join(output_dir, ext, file_name)
+    if output_file.startswith('summary-'):
+        return os.path.join(output_dir, ext, 'summary', file_name)
+    elif output_file.startswith('detail-'):
+        return os.path.join(output_dir, ext, 'details', file_name)
+    elif output_file.startswith('maven-'):
+        return os.path.join(output_dir, ext, 'maven', file_name)
+    elif output_file.startswith('ownership-'):
+        return os.path.join(output_dir, ext, 'ownership', file_name)
+    elif output_file.startswith('coupling-'):
+        return os.path.join(output_dir, ext, 'coupling', file_name)
+    return os.path.join(output_dir, ext, file_name)
+
+def has_line_stats(commits):
+    """提交是否带有行数和文件统计（仅读取元数据时为 None）"""
+    return not commits or commits[0]['stats'] is not None
+
+def render_commit_records(commits, compact=False):
+    """渲染按日期分组的详细提交记录（紧凑模式下渲染为提交表和变更文件表）"""
+    if compact:
+        return render_commit_tables(commits)
+    report = "\n## 📝 详细提交记录\n\n"
+    # 按日期分组显示提交
+    commits_by_date = defaultdict(list)
+    for commit in commits:
+        date_str = commit['date'].strftime('%Y-%m-%d')
+        commits_by_date[date_str].append(commit)
+    
+    for date_str, day_commits in sorted(commits_by_date.items(), reverse=True):
+        report += f"### 📅 {date_str}\n\n"
+        for commit in day_commits:
+            report += f"#### ⚡ 提交 `{commit['hash'][:8]}`\n\n"
+            report += f"- **作者**: {commit['author']} <{commit['email']}>\n"
+            report += f"- **时间**: {commit['date'].strftime('%H:%M:%S')}\n"
+            if commit['stats'] is not None:
+                report += f"- **变更**: +{commit['stats']['insertions']} 行, -{commit['stats']['deletions']} 行\n"
+            report += f"- **说明**: {commit['message']}\n\n"
+            # 显示文件变更详情
+            if commit['files']:
+                report += "**变更文件**:\n"
+                for file_path, stats in commit['files'].items():
+                    report += f"- `{file_path}`: +{stats.get('insertions', 0)} -{stats.get('deletions', 0)}\n"
+            if commit.get('renames'):
+                report += "\n**重命名**:\n"
+                for rename in commit['renames']:
+                    report += f"- `{rename['old']}` → `{rename['new']}`\n"
+            report += "\n---\n\n"
+    
+    return report
+
+def render_commit_tables(commits):
+    """以表格形式渲染详细提交记录：每个提交一行，变更文件和重命名各一张表，便于紧凑 HTML 虚拟化展示"""
+    report = "\n## 📝 详细提交记录\n\n"
+    metadata_only = not has_line_stats(commits)
+    if metadata_only:
+        report += "| 日期 | 时间 | 提交 | 作者 | 说明 |\n"
+        report += "|------|------|------|------|------|\n"
+    else:
+        report += "| 日期 | 时间 | 提交 | 作者 | 添加行数 | 删除行数 | 文件数 | 说明 |\n"
+        report += "|------|------|------|------|----------|----------|--------|------|\n"
+    for commit in commits:
+        message = commit['message'].split('\n')[0].replace('|', '\\|')
+        row = (f"| {commit['date'].strftime('%Y-%m-%d')} | {commit['date'].strftime('%H:%M:%S')} "
+               f"| `{commit['hash'][:8]}` | {commit['author']} ")
+        if not metadata_only:
+            row += f"| +{commit['stats']['insertions']} | -{commit['stats']['deletions']} | {len(commit['files'])} "
+        report += row + f"| {message} |\n"
+    
+    if not metadata_only:
+        report += "\n### 📄 变更文件\n\n"
+        report += "| 提交 | 文件 | 添加行数 | 删除行数 |\n"
+        report += "|------|------|----------|----------|\n"
+        for commit in commits:
+            for file_path, stats in commit['files'].items():
+                report += (f"| `{commit['hash'][:8]}` | `{file_path}` | +{stats.get('insertions', 0)} "
+                           f"| -{stats.get('deletions', 0)} |\n")
+    
+    renames = [(commit, rename) for commit in commits for rename in commit.get('renames') or []]
+    if renames:
+        report += "\n### 🔀 重命名\n\n"
+        report += "| 提交 | 原路径 | 新路径 |\n"
+        report += "|------|--------|--------|\n"
+        for commit, rename in renames:
+            report += f"| `{commit['hash'][:8]}` | `{rename['old']}` | `{rename['new']}` |\n"
+    report += "\n"
+    return report
+
 def parse_date(date_str):
     """解析日期字符串，格式: YYYY-MM-DD"""
     try:
         return datetime.strptime(date_str, '%Y-%m-%d').replace(tzinfo=pytz.utc)
-    except ValueError:
-        print(f"错误: 日期格式不正确，请使用 YYYY-MM-DD 格式")
-        sys.exit(1)
+    except ValueError as e:
+        raise ReportError(f"日期 '{date_str}' 格式不正确，请使用 YYYY-MM-DD 格式") from e
 
-def generate_output_filename(repo_name, branch=None, authors=None, start_date=None, end_date=None, date_shortcut=None):
-    """生成规范的输出文件名"""
+def generate_output_filename(repo_name, branch=None, authors=None, start_date=None, end_date=None, date_shortcut=None,
+                             timestamp=True):
+    """生成规范的输出文件名（timestamp 为 False 时不带生成时间，重复生成使用相同的文件名）"""
     current_time = datetime.now().strftime('%Y%m%d_%H%M%S')
     
     # 清理仓库名称（移除特殊字）
@@ -366,12 +1733,14 @@ def generate_output_filename(repo_name, branch=None, authors=None, start_date=No
         parts.append("last_7_days")
     
     # 添加时间戳
-    parts.append(current_time)
+    if timestamp:
+        parts.append(current_time)
     
     # 生成文件名
     return f"{'-'.join(parts)}.md"
 
-def format_search_conditions(branch=None, authors=None, start_date=None, end_date=None, date_shortcut=None):
+def format_search_conditions(branch=None, authors=None, start_date=None, end_date=None, date_shortcut=None,
+                             merge_policy='include', grep=None, tickets=None):
     """格式化显示查找条件"""
     conditions = []
     
@@ -403,10 +1772,23 @@ def format_search_conditions(branch=None, authors=None, start_date=None, end_dat
     else:
         conditions.append("时间范围: 最近7天")
     
+    if merge_policy != 'include':
+        policy_map = {'skip': '跳过', 'first-parent': '只沿主线', 'only': '只统计合并提交'}
+        conditions.append(f"合并提交: {policy_map.get(merge_policy, merge_policy)}")
+    
+    if grep:
+        conditions.append(f"提交说明: {', '.join(grep)}")
+    if tickets:
+        conditions.append(f"工单: {', '.join(tickets)}")
+    
     return " | ".join(conditions)
 
-def generate_report_directory(repo_name, branch=None, date_shortcut=None, start_date=None, end_date=None, maven_info=None):
-    """生成规范的报告目录结构"""
+def generate_report_directory(repo_name, branch=None, date_shortcut=None, start_date=None, end_date=None, maven_info=None, ownership=False,
+                              coupling=False, flat_dir=True):
+    """生成规范的报告目录结构
+
+    报告目录名以时间戳作为运行 ID，目录以排他方式创建：同一秒内启动的多个任务依次追加 -2、-3 … 后缀，互不覆盖。
+    """
     # 基础目录结构：reports/{repo_name}/{year}/{month}/{timestamp}/{format}
     current_date = datetime.now()
     timestamp = current_date.strftime('%Y%m%d_%H%M%S')
@@ -439,13 +1821,19 @@ def generate_report_directory(repo_name, branch=None, date_shortcut=None, start_
     # 将报告目录名添加到路径中
     parts.append('_'.join(report_dir_name))
     
-    # 生成完整���径
-    base_dir = os.path.join(*parts)
-    
     # 创建目录结构
     try:
-        # 创建基础目录
-        os.makedirs(base_dir, exist_ok=True)
+        # 创建基础目录（运行 ID 冲突时追加序号）
+        os.makedirs(os.path.join(*parts[:-1]), exist_ok=True)
+        base_dir = os.path.join(*parts)
+        run_number = 1
+        while True:
+            try:
+                os.mkdir(base_dir)
+                break
+            except FileExistsError:
+                run_number += 1
+                base_dir = f"{os.path.join(*parts)}-{run_number}"
         
         # 创建格式子目录
         html_dir = os.path.join(base_dir, 'html')
@@ -454,55 +1842,231 @@ def generate_report_directory(repo_name, branch=None, date_shortcut=None, start_
         os.makedirs(md_dir, exist_ok=True)
         
         # 如果不是单一目录，在格式目录下创建子目录
-        if not args.flat_dir:
+        if not flat_dir:
             for format_dir in [html_dir, md_dir]:
                 os.makedirs(os.path.join(format_dir, 'summary'), exist_ok=True)
                 os.makedirs(os.path.join(format_dir, 'details'), exist_ok=True)
                 if maven_info and maven_info.get('modules'):
                     os.makedirs(os.path.join(format_dir, 'maven'), exist_ok=True)
+                if ownership:
+                    os.makedirs(os.path.join(format_dir, 'ownership'), exist_ok=True)
+                if coupling:
+                    os.makedirs(os.path.join(format_dir, 'coupling'), exist_ok=True)
         
     except Exception as e:
-        print(f"创建目录结构时出错: {str(e)}")
-        sys.exit(1)
+        raise ReportError(f"创建目录结构时出错: {str(e)}") from e
     
     return base_dir
 
-def analyze_maven_project(repo_path):
-    """分析Maven项目的结构赖"""
-    maven_info = {
+MODULE_TYPE_LABELS = {
+    'maven': 'Maven',
+    'gradle': 'Gradle',
+    'npm': 'npm/pnpm',
+    'go': 'Go',
+    'python': 'Python'
+}
+
+def match_workspace_glob(pattern, path):
+    """按路径段匹配工作区通配符（* 匹配单段，** 匹配任意多段）"""
+    import fnmatch
+    pattern_parts = [part for part in pattern.strip('/').split('/') if part not in ('', '.')]
+    path_parts = path.split('/') if path else []
+    
+    def match(i, j):
+        if i == len(pattern_parts):
+            return j == len(path_parts)
+        if pattern_parts[i] == '**':
+            return any(match(i + 1, k) for k in range(j, len(path_parts) + 1))
+        return j < len(path_parts) and fnmatch.fnmatchcase(path_parts[j], pattern_parts[i]) and match(i + 1, j + 1)
+    
+    return match(0, 0)
+
+def detect_maven_modules(paths, read_file):
+    """Maven：每个包含 pom.xml 的目录为一个模块"""
+    return [(os.path.dirname(path), None) for path in paths if os.path.basename(path) == 'pom.xml']
+
+def detect_gradle_modules(paths, read_file):
+    """Gradle：settings.gradle[.kts] 所在目录为根项目，include 的子项目为模块（支持 projectDir 重定向）"""
+    modules = []
+    for settings_path in paths:
+        if os.path.basename(settings_path) not in ('settings.gradle', 'settings.gradle.kts'):
+            continue
+        root = os.path.dirname(settings_path)
+        content = read_file(settings_path)
+        root_name = re.search(r"rootProject\.name\s*=\s*['\"]([^'\"]+)['\"]", content)
+        modules.append((root, root_name.group(1) if root_name else None))
+        
+        project_dirs = dict(re.findall(
+            r"project\(\s*['\"]([^'\"]+)['\"]\s*\)\.projectDir\s*=\s*(?:new\s+File\s*\([^,]+,|file\s*\()\s*['\"]([^'\"]+)['\"]",
+            content))
+        for statement in re.findall(r"^\s*include\b(.*)$", content, re.MULTILINE):
+            for project in re.findall(r"['\"]([^'\"]+)['\"]", statement):
+                project_path = project_dirs.get(project, project.strip(':').replace(':', '/'))
+                module_path = os.path.normpath(os.path.join(root, project_path)).replace(os.sep, '/')
+                modules.append(('' if module_path == '.' else module_path, project.strip(':').split(':')[-1]))
+    return modules
+
+def detect_npm_modules(paths, read_file):
+    """npm/pnpm：声明了 workspaces（或有 pnpm-workspace.yaml）的 package.json 为根，匹配的包目录为模块"""
+    import json
+    package_dirs = [os.path.dirname(path) for path in paths
+                    if os.path.basename(path) == 'package.json' and 'node_modules' not in path.split('/')]
+    
+    def package_name(directory):
+        try:
+            return json.loads(read_file(os.path.join(directory, 'package.json'))).get('name')
+        except (ValueError, AttributeError):
+            return None
+    
+    modules = []
+    for root in package_dirs:
+        patterns = []
+        try:
+            workspaces = json.loads(read_file(os.path.join(root, 'package.json'))).get('workspaces')
+        except (ValueError, AttributeError):
+            workspaces = None
+        if isinstance(workspaces, dict):
+            workspaces = workspaces.get('packages')
+        if isinstance(workspaces, list):
+            patterns += [pattern for pattern in workspaces if isinstance(pattern, str)]
+        pnpm_path = os.path.join(root, 'pnpm-workspace.yaml')
+        if pnpm_path in paths:
+            in_packages = False
+            for line in read_file(pnpm_path).splitlines():
+                if re.match(r'^packages\s*:', line):
+                    in_packages = True
+                elif in_packages and re.match(r'^\s*-\s*', line):
+                    patterns.append(re.sub(r'^\s*-\s*', '', line).split('#')[0].strip().strip('\'"'))
+                elif in_packages and line.strip() and not line.startswith((' ', '#')):
+                    in_packages = False
+        if not patterns:
+            continue
+        
+        modules.append((root, package_name(root)))
+        includes = [pattern for pattern in patterns if not pattern.startswith('!')]
+        excludes = [pattern[1:] for pattern in patterns if pattern.startswith('!')]
+        for directory in package_dirs:
+            relative = os.path.relpath(directory or '.', root or '.').replace(os.sep, '/')
+            if directory == root or relative.startswith('..'):
+                continue
+            if any(match_workspace_glob(p, relative) for p in includes) and \
+                    not any(match_workspace_glob(p, relative) for p in excludes):
+                modules.append((directory, package_name(directory)))
+    return modules
+
+def detect_go_modules(paths, read_file):
+    """Go：每个 go.mod 所在目录为一个模块，模块名取 module 声明的最后一段"""
+    modules = []
+    for path in paths:
+        if os.path.basename(path) == 'go.mod':
+            declaration = re.search(r'^module\s+(\S+)', read_file(path), re.MULTILINE)
+            modules.append((os.path.dirname(path),
+                            declaration.group(1).strip('"').split('/')[-1] if declaration else None))
+    return modules
+
+def detect_python_modules(paths, read_file):
+    """Python：每个 pyproject.toml 所在目录为一个模块，模块名取 [project] 或 [tool.poetry] 的 name"""
+    modules = []
+    for path in paths:
+        if os.path.basename(path) != 'pyproject.toml':
+            continue
+        name = None
+        section = None
+        for line in read_file(path).splitlines():
+            header = re.match(r'^\s*\[([^\]]+)\]', line)
+            if header:
+                section = header.group(1).strip()
+                continue
+            value = re.match(r'^\s*name\s*=\s*[\'"]([^\'"]+)[\'"]', line)
+            if value and section in ('project', 'tool.poetry'):
+                name = value.group(1)
+                break
+        modules.append((os.path.dirname(path), name))
+    return modules
+
+MODULE_DETECTORS = {
+    'maven': detect_maven_modules,
+    'gradle': detect_gradle_modules,
+    'npm': detect_npm_modules,
+    'go': detect_go_modules,
+    'python': detect_python_modules
+}
+
+def build_module_index(repo_path, detectors=None, rev='HEAD'):
+    """由一次 git ls-tree -r 列出的文件运行各模块探测器，构建共享的 路径→模块 索引
+
+    构建清单文件通过常驻的 git cat-file --batch 读取版本树中的内容。同一目录被多个探测器识别时以
+    detectors 中靠前的为准；模块名重复时改用模块路径作为名称。
+    """
+    module_index = {
         'modules': [],
         'dependencies': defaultdict(list),
         'module_paths': {}  # 用于储路径到模块的映射
     }
+    repo_path = os.path.abspath(repo_path)
+    repo_name = os.path.basename(repo_path.rstrip(os.sep))
     
     try:
-        # 查找所有的pom.xml文件
-        for root, _, files in os.walk(repo_path):
-            if 'pom.xml' in files:
-                relative_path = os.path.relpath(root, repo_path)
-                module_name = os.path.basename(root)
-                
-                pom_path = os.path.join(root, 'pom.xml')
-                with open(pom_path, 'r', encoding='utf-8') as f:
-                    pom_content = f.read()
+        paths = set(Repo(repo_path).git.ls_tree('-r', '--name-only', '-z', rev).split('\0')) - {''}
+    except GitCommandError as e:
+        print(f"分析模块结构时出错: {str(e)}")
+        return module_index
+    
+    reader = CatFileBatch(repo_path)
+    
+    def read_file(path):
+        try:
+            return reader.read(f"{rev}:{path}")[1].decode('utf-8', errors='replace')
+        except KeyError:
+            return ''
+    
+    try:
+        # 目录集合：模块目录必须在版本树中存在
+        directories = {''}
+        for path in paths:
+            directory = os.path.dirname(path)
+            while directory not in directories:
+                directories.add(directory)
+                directory = os.path.dirname(directory)
+        
+        names = set()
+        for detector in detectors or list(MODULE_DETECTORS):
+            for module_path, name in MODULE_DETECTORS[detector](paths, read_file):
+                module_path = module_path.strip('/')
+                if module_path not in directories or module_path in module_index['module_paths']:
+                    continue
+                name = name or os.path.basename(module_path) or repo_name
+                if name in names:
+                    name = module_path or repo_name
+                names.add(name)
                 
                 module_info = {
-                    'name': module_name,
-                    'path': relative_path,
-                    'pom_path': pom_path,
-                    'base_dir': root
+                    'name': name,
+                    'path': module_path or '.',
+                    'type': detector,
+                    'base_dir': os.path.join(repo_path, module_path)
                 }
-                maven_info['modules'].append(module_info)
-                
-                # 加路径映射
-                maven_info['module_paths'][relative_path] = module_info
-                # 如果是根路径，也添加映射
-                if relative_path == '.':
-                    maven_info['module_paths'][''] = module_info
-    except Exception as e:
-        print(f"析Maven项目时出错: {str(e)}")
+                module_index['modules'].append(module_info)
+                module_index['module_paths'][module_path] = module_info
+    finally:
+        reader.close()
     
-    return maven_info
+    module_index['modules'].sort(key=lambda module: module['path'])
+    return module_index
+
+def analyze_maven_project(repo_path):
+    """分析Maven项目的模块结构"""
+    return build_module_index(repo_path, ['maven'])
+
+def format_module_count(maven_info):
+    """总结报告中的模块数（多种构建系统时按类型列出）"""
+    types = defaultdict(int)
+    for module in maven_info['modules']:
+        types[module['type']] += 1
+    if set(types) == {'maven'}:
+        return f"- Maven模块数: **{len(maven_info['modules'])}** 个\n"
+    detail = '，'.join(f"{MODULE_TYPE_LABELS[name]} {count}" for name, count in sorted(types.items()))
+    return f"- 模块数: **{len(maven_info['modules'])}** 个（{detail}）\n"
 
 def find_module_for_file(file_path, maven_info):
     """找到文件所属的模块"""
@@ -552,13 +2116,17 @@ def categorize_maven_changes(file_path):
     return '其他文件'
 
 def generate_maven_report(maven_info, commits):
-    """生成Maven项目的变更报告"""
-    report = "# Maven项目分析报告\n\n"
+    """生成Maven项目的变更报告（包含其他构建系统的模块时为模块分析报告）"""
+    types = {module['type'] for module in maven_info['modules']}
+    report = "# Maven项目分析报告\n\n" if types == {'maven'} else "# 模块分析报告\n\n"
     
     # 模块列表
     report += "## 项目结构\n\n"
     for module in maven_info['modules']:
-        report += f"- {module['name']} (`{module['path']}`)\n"
+        if types == {'maven'}:
+            report += f"- {module['name']} (`{module['path']}`)\n"
+        else:
+            report += f"- {module['name']} (`{module['path']}`, {MODULE_TYPE_LABELS[module['type']]})\n"
     
     # 按模块和文件类型统计变更
     module_changes = defaultdict(lambda: {
@@ -680,12 +2248,682 @@ def analyze_file_changes(commits):
     
     return file_types
 
+class HeavyHitters:
+    """频繁项统计：容量内精确计数，超出容量后按 SpaceSaving 算法保持有界内存"""
+
+    def __init__(self, capacity=None):
+        self.capacity = capacity
+        self.entries = {}       # key -> {'count', 'insertions', 'deletions', 'error', 'meta'}
+        self.approximate = False
+        self._heap = []         # (count, key)，惰性删除的最小堆
+
+    def add(self, key, count=1, insertions=0, deletions=0, meta=None):
+        """累加一个元素的计数与行数变更"""
+        entry = self.entries.get(key)
+        if entry is None:
+            if self.capacity and len(self.entries) >= self.capacity:
+                # 替换当前计数最小的元素，新元素继承其计数作为误差上限
+                min_count = self._evict_min()
+                entry = {'count': min_count, 'insertions': 0, 'deletions': 0, 'error': min_count, 'meta': None}
+                self.approximate = True
+            else:
+                entry = {'count': 0, 'insertions': 0, 'deletions': 0, 'error': 0, 'meta': None}
+            self.entries[key] = entry
+
+        entry['count'] += count
+        entry['insertions'] += insertions
+        entry['deletions'] += deletions
+        if meta is not None:
+            entry['meta'] = meta
+
+        if self.capacity:
+            heapq.heappush(self._heap, (entry['count'], key))
+            if len(self._heap) > 4 * self.capacity:
+                self._heap = [(e['count'], k) for k, e in self.entries.items()]
+                heapq.heapify(self._heap)
+
+    def _evict_min(self):
+        """移除计数最小的元素并返回其计数"""
+        while True:
+            count, key = heapq.heappop(self._heap)
+            entry = self.entries.get(key)
+            if entry is not None and entry['count'] == count:
+                del self.entries[key]
+                return count
+
+    def top(self, n=None):
+        """按计数从高到低返回前 n 个元素"""
+        items = sorted(self.entries.items(), key=lambda x: x[1]['count'], reverse=True)
+        return items[:n] if n else items
+
+    def max_error(self):
+        """当前结果的最大计数误差"""
+        return max((entry['error'] for entry in self.entries.values()), default=0)
+
+class ChurnTracker:
+    """在提交读取过程中增量统计文件、目录和作者的变更排行
+
+    指定容量时只有排行计数器的内存有界；调用方返回的提交列表仍保留每个提交的完整文件列表。
+    """
+
+    def __init__(self, capacity=None):
+        self.files = HeavyHitters(capacity)
+        self.directories = HeavyHitters(capacity)
+        self.authors = HeavyHitters(capacity)
+
+    @property
+    def approximate(self):
+        return self.files.approximate or self.directories.approximate or self.authors.approximate
+
+    def add_commit(self, commit):
+        """累加单个提交的统计"""
+        if commit['stats'] is None:
+            # 仅读取元数据时只统计作者的提交次数
+            self.authors.add(commit['author'], 1, meta=commit['email'])
+            return
+        self.authors.add(commit['author'], 1, commit['stats']['insertions'], commit['stats']['deletions'],
+                         meta=commit['email'])
+        for file_path, stats in commit['files'].items():
+            insertions = stats.get('insertions', 0)
+            deletions = stats.get('deletions', 0)
+            self.files.add(file_path, 1, insertions, deletions)
+            self.directories.add(os.path.dirname(file_path) or '.', 1, insertions, deletions)
+
+    def add_commits(self, commits):
+        """累加一批提交的统计"""
+        for commit in commits:
+            self.add_commit(commit)
+        return self
+
+class PrefixSeries:
+    """稀疏前缀和序列：按日期升序保存累计值，区间查询为两次二分查找"""
+
+    def __init__(self, width):
+        self.days = []
+        self.cumulative = []
+        self.width = width
+
+    def append(self, day, values):
+        """按日期升序追加一天的取值"""
+        previous = self.cumulative[-1] if self.cumulative else [0] * self.width
+        self.days.append(day)
+        self.cumulative.append([a + b for a, b in zip(previous, values)])
+
+    def range_sum(self, start_day, end_day):
+        """返回 [start_day, end_day] 区间内的合计"""
+        end_index = bisect.bisect_right(self.days, end_day)
+        start_index = bisect.bisect_left(self.days, start_day)
+        if end_index <= start_index:
+            return [0] * self.width
+        upper = self.cumulative[end_index - 1]
+        if start_index == 0:
+            return list(upper)
+        lower = self.cumulative[start_index - 1]
+        return [a - b for a, b in zip(upper, lower)]
+
+class RollupCube:
+    """按 天 × 作者 × 文件类型 × 模块 预聚合的统计立方体，持久化在缓存目录中并增量更新"""
+
+    VERSION = 2
+
+    def __init__(self, cache_path, branch, signature=None, identities=None):
+        self.cache_path = cache_path
+        self.branch = branch
+        self.signature = signature or []
+        self.identities = identities
+        self.head = None
+        # 作者（规范名字）→ 规范邮箱 / 提交中出现过的原始 名字 <邮箱>，按作者筛选时与提交筛选使用相同的规则
+        self.emails = {}
+        self.aliases = {}
+        # days[day]['authors'][author] = [提交数, 添加行数, 删除行数]
+        # days[day]['cells']['作者\t文件类型\t模块'] = [提交数, 变更次数, 添加行数, 删除行数]
+        self.days = {}
+        self._author_series = None
+        self._cell_series = None
+
+    @classmethod
+    def load(cls, generator, maven_info=None):
+        """从缓存加载立方体，分支、模块结构、mailmap、合并策略或路径过滤变化时重新构建"""
+        # 模块结构、mailmap、合并提交策略或路径过滤变化都会影响入库的数据，变化时需要重建
+        signature = sorted(f"{m['type']}:{m['path']}:{m['name']}" for m in maven_info['modules']) if maven_info else []
+        signature.append(f"mailmap:{generator.identities.signature}")
+        signature.append(f"merges:{generator.merge_policy}")
+        signature.append(f"paths:{' '.join(generator.pathspecs)}")
+        cache_path = os.path.join(generator.get_cache_dir(),
+                                  cache_file_name('rollup', generator.current_branch, signature))
+        cube = cls(cache_path, generator.current_branch, signature, generator.identities)
+        cube.refresh()
+        return cube
+
+    def refresh(self):
+        """重新读取缓存文件（其他进程可能已经更新）；版本、分支或签名不一致时保持当前内容"""
+        data = load_json_cache(self.cache_path)
+        if (data.get('version') == self.VERSION and data.get('branch') == self.branch
+                and data.get('signature') == self.signature):
+            self.head = data.get('head')
+            self.emails = data.get('emails', {})
+            self.aliases = data.get('aliases', {})
+            self.days = data.get('days', {})
+
+    def save(self):
+        """保存立方体到缓存文件"""
+        save_json_cache(self.cache_path, {
+            'version': self.VERSION,
+            'branch': self.branch,
+            'signature': self.signature,
+            'head': self.head,
+            'emails': self.emails,
+            'aliases': self.aliases,
+            'days': self.days
+        })
+
+    def update(self, generator, maven_info=None):
+        """增量读取上次构建之后的新提交；历史被改写时全量重建
+
+        更新期间持有缓存文件的锁，并发运行时只有一个进程读取新提交，其余进程等待后直接使用更新后的缓存。
+        """
+        with FileLock(self.cache_path):
+            return self._update(generator, maven_info)
+
+    def _update(self, generator, maven_info=None):
+        """在持有锁的情况下增量更新"""
+        repo = generator.repo
+        new_head = repo.head.commit.hexsha
+        if self.head != new_head:
+            self.refresh()
+            self._author_series = None
+            self._cell_series = None
+        if self.head == new_head:
+            print("\n预聚合统计已是最新，无需读取提交")
+            return 0
+
+        rev = new_head
+        if self.head:
+            try:
+                if repo.is_ancestor(self.head, new_head):
+                    rev = f"{self.head}..{new_head}"
+                else:
+                    print("\n检测到历史被改写，重新构建预聚合统计")
+                    self.days = {}
+            except GitCommandError:
+                self.days = {}
+
+        module_cache = {}
+        count = 0
+        for commit in generator.backend.iter_commits(rev, **generator._traversal_options()):
+            self.add_commit(generator._commit_to_info(commit), maven_info, module_cache)
+            count += 1
+
+        self.head = new_head
+        self._author_series = None
+        self._cell_series = None
+        self.save()
+        print(f"\n预聚合统计已更新: 新增 {count} 个提交，覆盖 {len(self.days)} 天")
+        return count
+
+    def add_commit(self, commit, maven_info=None, module_cache=None):
+        """将单个提交累加到对应日期的单元格"""
+        day = commit['date'].strftime('%Y-%m-%d')
+        author = commit['author']
+        self.emails[author] = commit['email']
+        if self.identities is not None and commit.get('author_id') is not None:
+            aliases = self.identities.identities[commit['author_id']]['aliases']
+            known = self.aliases.setdefault(author, [])
+            if not aliases.issubset(known):
+                self.aliases[author] = sorted(aliases.union(known))
+        day_data = self.days.setdefault(day, {'authors': {}, 'cells': {}})
+
+        author_values = day_data['authors'].setdefault(author, [0, 0, 0])
+        author_values[0] += 1
+        author_values[1] += commit['stats']['insertions']
+        author_values[2] += commit['stats']['deletions']
+
+        touched = set()
+        for file_path, stats in commit['files'].items():
+            module_name = ''
+            if maven_info and maven_info.get('modules'):
+                if module_cache is None or file_path not in module_cache:
+                    module = find_module_for_file(file_path, maven_info)
+                    module_name = module['name'] if module else ''
+                    if module_cache is not None:
+                        module_cache[file_path] = module_name
+                else:
+                    module_name = module_cache[file_path]
+            key = f"{author}\t{categorize_file_type(file_path)}\t{module_name}"
+            cell = day_data['cells'].setdefault(key, [0, 0, 0, 0])
+            if key not in touched:
+                cell[0] += 1
+                touched.add(key)
+            cell[1] += 1
+            cell[2] += stats.get('insertions', 0)
+            cell[3] += stats.get('deletions', 0)
+
+    def _build_series(self):
+        """按日期顺序构建各维度组合的前缀和序列"""
+        self._author_series = {}
+        self._cell_series = {}
+        for day in sorted(self.days):
+            day_data = self.days[day]
+            for author, values in day_data['authors'].items():
+                self._author_series.setdefault(author, PrefixSeries(3)).append(day, values)
+            for key, values in day_data['cells'].items():
+                self._cell_series.setdefault(key, PrefixSeries(4)).append(day, values)
+
+    def match_authors(self, patterns):
+        """按身份索引匹配作者（规范身份及其别名，与提交筛选规则一致）"""
+        identities = self.identities if self.identities is not None else IdentityIndex()
+        regex = identities.compile_patterns(patterns)
+        matched = set()
+        for author, email in self.emails.items():
+            identity_id = identities.resolve(author, email)
+            identities.add_aliases(identity_id, self.aliases.get(author, []))
+            if identities.matches(identity_id, regex):
+                matched.add(author)
+        return matched
+
+    @classmethod
+    def from_commits(cls, commits, maven_info=None, identities=None):
+        """由已读取的提交在内存中构建立方体（不持久化）"""
+        cube = cls(None, None, identities=identities)
+        module_cache = {}
+        for commit in commits:
+            cube.add_commit(commit, maven_info, module_cache)
+        return cube
+
+    def totals(self, authors=None):
+        """汇总立方体中的全部数据"""
+        return self.query_days('0000-00-00', '9999-99-99', authors)
+
+    def query(self, start_date=None, end_date=None, authors=None):
+        """查询任意日期范围的汇总统计，不读取任何提交"""
+        if not start_date:
+            start_date = datetime.now(pytz.utc) - timedelta(days=7)
+        if not end_date:
+            end_date = datetime.now(pytz.utc)
+        # 结束日期为零点时（如 --end-date 解析结果）不包含当天，与按时间戳筛选提交保持一致
+        if (end_date.hour, end_date.minute, end_date.second, end_date.microsecond) == (0, 0, 0, 0):
+            end_date = end_date - timedelta(days=1)
+        return self.query_days(start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'), authors)
+
+    def query_days(self, start_day, end_day, authors=None):
+        """按日期字符串（含首尾两天）查询汇总统计"""
+        if self._author_series is None:
+            self._build_series()
+        selected = self.match_authors(authors) if authors else None
+
+        result = {
+            'commits': 0, 'insertions': 0, 'deletions': 0,
+            'authors': {}, 'file_types': defaultdict(lambda: [0, 0, 0, 0]),
+            'modules': defaultdict(lambda: [0, 0, 0, 0])
+        }
+        for author, series in self._author_series.items():
+            if selected is not None and author not in selected:
+                continue
+            commits, insertions, deletions = series.range_sum(start_day, end_day)
+            if not commits:
+                continue
+            result['authors'][author] = {'commits': commits, 'insertions': insertions,
+                                         'deletions': deletions, 'email': self.emails.get(author, '')}
+            result['commits'] += commits
+            result['insertions'] += insertions
+            result['deletions'] += deletions
+
+        for key, series in self._cell_series.items():
+            author, file_type, module_name = key.split('\t')
+            if selected is not None and author not in selected:
+                continue
+            values = series.range_sum(start_day, end_day)
+            if not values[1]:
+                continue
+            for target in [result['file_types'][file_type]] + ([result['modules'][module_name]] if module_name else []):
+                for i, value in enumerate(values):
+                    target[i] += value
+        return result
+
+class MessageIndex:
+    """提交说明的倒排索引（词元、工单号 → 提交），持久化在缓存目录中并增量更新"""
+
+    VERSION = 1
+    # 与 ticket_to_pattern 的边界规则一致：前面不是字母数字，后面不是数字
+    TICKET_PATTERN = re.compile(r'(?<![A-Z0-9])[A-Z][A-Z0-9]*-[0-9]+(?![0-9])')
+    # 英文按单词切分（小写），中文按单字切分
+    TOKEN_PATTERN = re.compile(r'[a-z0-9_]+|[\u4e00-\u9fff]')
+    REGEX_CHARS = set('.^$*+?()[]{}|\\')
+
+    def __init__(self, cache_path, branch, signature=None):
+        self.cache_path = cache_path
+        self.branch = branch
+        self.signature = signature or []
+        self.head = None
+        # 提交 SHA 列表，倒排表中保存其下标
+        self.shas = []
+        self.tokens = {}
+        self.tickets = {}
+
+    @classmethod
+    def load(cls, generator):
+        """从缓存加载索引，分支、合并策略或路径过滤变化时重新构建"""
+        signature = [f"merges:{generator.merge_policy}", f"paths:{' '.join(generator.pathspecs)}"]
+        cache_path = os.path.join(generator.get_cache_dir(),
+                                  cache_file_name('message-index', generator.current_branch, signature))
+        index = cls(cache_path, generator.current_branch, signature)
+        index.refresh()
+        return index
+
+    def refresh(self):
+        """重新读取缓存文件（其他进程可能已经更新）；版本、分支或签名不一致时保持当前内容"""
+        data = load_json_cache(self.cache_path)
+        if (data.get('version') == self.VERSION and data.get('branch') == self.branch
+                and data.get('signature') == self.signature):
+            self.head = data.get('head')
+            self.shas = data.get('shas', [])
+            self.tokens = data.get('tokens', {})
+            self.tickets = data.get('tickets', {})
+
+    def save(self):
+        """保存索引到缓存文件"""
+        save_json_cache(self.cache_path, {
+            'version': self.VERSION,
+            'branch': self.branch,
+            'signature': self.signature,
+            'head': self.head,
+            'shas': self.shas,
+            'tokens': self.tokens,
+            'tickets': self.tickets
+        })
+
+    def update(self, generator):
+        """增量索引上次更新之后的新提交（只读取提交元数据）；历史被改写时全量重建
+
+        更新期间持有缓存文件的锁，并发运行时同一批提交只索引一次。
+        """
+        with FileLock(self.cache_path):
+            return self._update(generator)
+
+    def _update(self, generator):
+        """在持有锁的情况下增量更新"""
+        repo = generator.repo
+        new_head = repo.head.commit.hexsha
+        if self.head != new_head:
+            self.refresh()
+        if self.head == new_head:
+            return 0
+
+        rev = new_head
+        if self.head:
+            try:
+                if repo.is_ancestor(self.head, new_head):
+                    rev = f"{self.head}..{new_head}"
+                else:
+                    print("\n检测到历史被改写，重新构建提交说明索引")
+                    self.shas, self.tokens, self.tickets = [], {}, {}
+            except GitCommandError:
+                self.shas, self.tokens, self.tickets = [], {}, {}
+
+        count = 0
+        for commit in generator.backend.iter_commits(rev, with_stats=False, **generator._traversal_options()):
+            self.add(commit['hash'], commit['message'])
+            count += 1
+
+        self.head = new_head
+        self.save()
+        print(f"\n提交说明索引已更新: 新增 {count} 个提交，共 {len(self.shas)} 个提交、{len(self.tokens)} 个词元")
+        return count
+
+    def add(self, sha, message):
+        """将一个提交的说明加入倒排表"""
+        position = len(self.shas)
+        self.shas.append(sha)
+        for token in set(self.TOKEN_PATTERN.findall(message.lower())):
+            self.tokens.setdefault(token, []).append(position)
+        for ticket in set(self.TICKET_PATTERN.findall(message.upper())):
+            self.tickets.setdefault(ticket, []).append(position)
+
+    def lookup_ticket(self, ticket):
+        """查找提及工单号（或项目前缀下任意工单）的提交"""
+        ticket = ticket.strip().upper()
+        if re.fullmatch(r'[A-Z][A-Z0-9]*', ticket):
+            positions = set()
+            for key, values in self.tickets.items():
+                if key.startswith(f"{ticket}-"):
+                    positions.update(values)
+        else:
+            positions = set(self.tickets.get(ticket, []))
+        return {self.shas[position] for position in positions}
+
+    def lookup_text(self, text):
+        """查找说明中可能包含 text（不区分大小写的子串）的候选提交；text 含正则语法时返回 None
+
+        text 中的每个词元都必须是说明中某个词元的子串，因此结果是真实匹配的超集。
+        """
+        if self.REGEX_CHARS & set(text):
+            return None
+        query_tokens = self.TOKEN_PATTERN.findall(text.lower())
+        if not query_tokens:
+            return None
+        positions = None
+        for query in query_tokens:
+            matched = set()
+            for token, values in self.tokens.items():
+                if query in token:
+                    matched.update(values)
+            positions = matched if positions is None else positions & matched
+        return {self.shas[position] for position in positions}
+
+    def lookup(self, grep=None, tickets=None):
+        """按 --grep/--ticket 查找候选提交（任一条件匹配即可）；存在无法用索引回答的条件时返回 None"""
+        candidates = set()
+        for text in grep or []:
+            matched = self.lookup_text(text)
+            if matched is None:
+                return None
+            candidates |= matched
+        for ticket in tickets or []:
+            candidates |= self.lookup_ticket(ticket)
+        return candidates
+
+def analyze_submodules(generator, revisions, authors=None, grep=None, with_stats=True, jobs=None, since=None,
+                       until=None, prefix=''):
+    """递归分析子模块：由父仓库的指针变更确定各子模块的提交区间，各子模块并行读取
+
+    子模块提交中的文件路径加上子模块路径前缀，便于与父仓库的提交合并统计。时间范围内新增的子模块
+    只统计 since/until 范围内的提交。
+    返回按路径排列的子模块结果列表（嵌套子模块紧随其父子模块之后）。
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    changes = generator.get_submodule_changes(revisions)
+    
+    def analyze(path, ranges):
+        full_path = prefix + path
+        submodule_path = os.path.join(generator.repo_path, path)
+        if not os.path.exists(os.path.join(submodule_path, '.git')):
+            print(f"⚠️ 子模块 {full_path} 未初始化，已跳过（可执行 git submodule update --init --recursive）")
+            return []
+        submodule = GitReportGenerator(submodule_path, use_mailmap=generator.use_mailmap,
+                                       merge_policy=generator.merge_policy, backend=generator.backend_name)
+        commits = submodule.get_commits_in_ranges(ranges, authors, grep, with_stats, since, until)
+        for commit in commits:
+            commit['submodule'] = full_path
+            if commit['files'] is not None:
+                commit['files'] = {f"{full_path}/{file_path}": stats for file_path, stats in commit['files'].items()}
+        print(f"子模块 {full_path}: {len(ranges)} 次指针变更，{len(commits)} 个提交")
+        result = {'path': full_path, 'name': submodule.repo_name, 'ranges': ranges, 'commits': commits}
+        # 嵌套子模块：按本子模块区间内的指针变更继续递归
+        window = [f"--{option}={value.isoformat()}" for option, value in (('since', since), ('until', until)) if value]
+        nested_revisions = [[new, *window] if old is None else [f"{old}..{new}"] for old, new in ranges]
+        return [result] + analyze_submodules(submodule, nested_revisions, authors, grep, with_stats, jobs,
+                                             since, until, full_path + '/')
+    
+    results = []
+    if not changes:
+        return results
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count() or 1) as executor:
+        for result in executor.map(lambda item: analyze(*item), sorted(changes.items())):
+            results += result
+    return results
+
+def draw_sample(commits, size, strategy='month', seed=None):
+    """从提交中抽样：uniform 为简单随机抽样，month 为按月分层、按比例分配的抽样
+
+    分层抽样时每层至少抽 2 个提交（层内不足 2 个时全部抽取），以便估计层内方差；月份数超过 size // 2 时，
+    按时间顺序把相邻月份合并为提交数大致相等的层。样本总数不超过 size。
+    返回 {层: {'size': 层内提交数, 'sample': 样本提交列表}}，简单随机抽样时只有一层。
+    """
+    import random
+    rng = random.Random(seed)
+    groups = defaultdict(list)
+    for commit in commits:
+        key = commit['date'].strftime('%Y-%m') if strategy == 'month' else 'all'
+        groups[key].append(commit)
+    groups = sorted(groups.items())
+
+    total = len(commits)
+    # 层数过多时合并相邻月份，保证每层至少能分到 2 个样本
+    max_strata = max(1, size // 2)
+    if len(groups) > max_strata:
+        # 按累计提交数的位置划分到 max_strata 个桶中
+        buckets = {}
+        cumulative = 0
+        for key, group in groups:
+            bucket = buckets.setdefault(min(max_strata - 1, cumulative * max_strata // total), [key, key, []])
+            bucket[1] = key
+            bucket[2].extend(group)
+            cumulative += len(group)
+        groups = [(first if first == last else f"{first}~{last}", group) for first, last, group in buckets.values()]
+
+    # 每层先分配最低样本数，剩余名额按层大小以最大余数法分配，不超过层内提交数
+    size = min(size, total)
+    allocation = {key: min(len(group), 2) for key, group in groups}
+    remaining = size - sum(allocation.values())
+    while remaining > 0:
+        open_groups = [(key, group) for key, group in groups if allocation[key] < len(group)]
+        if not open_groups:
+            break
+        weight = sum(len(group) for _, group in open_groups)
+        shares = {key: remaining * len(group) / weight for key, group in open_groups}
+        given = 0
+        for key, group in open_groups:
+            extra = min(int(shares[key]), len(group) - allocation[key])
+            allocation[key] += extra
+            given += extra
+        if given == 0:
+            # 名额不足以按比例分配时，按余数从大到小逐个分配
+            for key, _ in sorted(open_groups, key=lambda item: shares[item[0]] - int(shares[item[0]]), reverse=True):
+                if given == remaining:
+                    break
+                allocation[key] += 1
+                given += 1
+        remaining -= given
+
+    strata = {}
+    for key, group in groups:
+        strata[key] = {'size': len(group), 'sample': rng.sample(group, allocation[key])}
+    return strata
+
+def stratified_estimate(strata, metrics):
+    """分层抽样的总量估计及 95% 置信区间半宽
+
+    metrics(commit) 返回该提交各指标的取值（未出现的指标视为 0）。对每层 h：
+    估计量 = Σ N_h·ȳ_h，方差 = Σ N_h²·(1 - n_h/N_h)·s_h²/n_h。只有 1 个样本的层（层内提交多于 1 个）
+    无法估计层内方差，使用其余各层的合并样本方差。返回 {指标: (估计值, 区间半宽)}。
+    """
+    estimates = defaultdict(float)
+    variances = defaultdict(float)
+    # 合并样本方差：Σ(n_h - 1)·s_h² / Σ(n_h - 1)
+    pooled_squares = defaultdict(float)
+    pooled_degrees = 0
+    singletons = []
+    keys = set()
+    for stratum in strata.values():
+        population = stratum['size']
+        sample = [metrics(commit) for commit in stratum['sample']]
+        n = len(sample)
+        if not n:
+            continue
+        sums = defaultdict(float)
+        squares = defaultdict(float)
+        for values in sample:
+            for key, value in values.items():
+                sums[key] += value
+                squares[key] += value * value
+        keys.update(sums)
+        for key in sums:
+            estimates[key] += population * sums[key] / n
+        if n > 1:
+            pooled_degrees += n - 1
+            for key in sums:
+                mean = sums[key] / n
+                sample_variance = max(0.0, (squares[key] - n * mean * mean) / (n - 1))
+                pooled_squares[key] += (n - 1) * sample_variance
+                variances[key] += population * population * (1 - n / population) * sample_variance / n
+        elif population > 1:
+            singletons.append(population)
+    if singletons:
+        for key in keys:
+            pooled_variance = pooled_squares[key] / pooled_degrees if pooled_degrees else float('inf')
+            variances[key] += sum(population * (population - 1) for population in singletons) * pooled_variance
+    return {key: (estimates[key], 1.96 * variances[key] ** 0.5) for key in estimates}
+
+def estimate_sampled_stats(sampling, maven_info=None):
+    """根据抽样结果外推总体的行数统计：总量、作者、文件类型和模块"""
+    use_modules = bool(maven_info and maven_info.get('modules'))
+    module_cache = {}
+
+    def metrics(commit):
+        values = defaultdict(float)
+        values[('total', 'insertions')] = commit['stats']['insertions']
+        values[('total', 'deletions')] = commit['stats']['deletions']
+        values[('author', commit['author'], 'insertions')] = commit['stats']['insertions']
+        values[('author', commit['author'], 'deletions')] = commit['stats']['deletions']
+        for file_path, stats in commit['files'].items():
+            lines = stats.get('insertions', 0) + stats.get('deletions', 0)
+            file_type = categorize_file_type(file_path)
+            values[('file_type', file_type, 'changes')] += 1
+            values[('file_type', file_type, 'lines')] += lines
+            if use_modules:
+                if file_path not in module_cache:
+                    module = find_module_for_file(file_path, maven_info)
+                    module_cache[file_path] = module['name'] if module else None
+                if module_cache[file_path]:
+                    values[('module', module_cache[file_path], 'changes')] += 1
+                    values[('module', module_cache[file_path], 'lines')] += lines
+        return values
+
+    result = {'total': {}, 'author': defaultdict(dict), 'file_type': defaultdict(dict), 'module': defaultdict(dict)}
+    for key, estimate in stratified_estimate(sampling['strata'], metrics).items():
+        if key[0] == 'total':
+            result['total'][key[1]] = estimate
+        else:
+            result[key[0]][key[1]][key[2]] = estimate
+    return result
+
+BUILD_MANIFEST_FILES = {
+    'pom.xml', 'build.gradle', 'build.gradle.kts', 'settings.gradle', 'settings.gradle.kts', 'gradle.properties',
+    'package.json', 'package-lock.json', 'pnpm-workspace.yaml', 'pnpm-lock.yaml', 'yarn.lock',
+    'go.mod', 'go.sum', 'pyproject.toml', 'setup.py', 'setup.cfg', 'poetry.lock'
+}
+
+SOURCE_EXTENSIONS = {
+    '.java', '.kt', '.scala', '.groovy', '.js', '.jsx', '.mjs', '.cjs', '.ts', '.tsx', '.vue',
+    '.go', '.py', '.rs', '.c', '.cc', '.cpp', '.h', '.hpp', '.cs', '.rb', '.php', '.swift'
+}
+
+def is_maven_only(maven_info):
+    """模块是否全部来自 Maven 探测器（此时影响分析保持原有的 POM/Java 分类和报告列）"""
+    return {module['type'] for module in maven_info['modules']} == {'maven'}
+
 def analyze_module_impact(commits, maven_info):
-    """分析模块变更的影响范围"""
+    """分析模块变更的影响范围（模块来自共享的 路径→模块 索引，可包含多种构建系统）"""
+    # 只有 Maven 模块时只把 pom.xml 和 .java 归为构建配置和源码，与原有的 --maven 报告一致
+    if is_maven_only(maven_info):
+        manifest_files, source_extensions = {'pom.xml'}, {'.java'}
+    else:
+        manifest_files, source_extensions = BUILD_MANIFEST_FILES, SOURCE_EXTENSIONS
     module_impacts = defaultdict(lambda: {
-        'pom_changes': set(),          # POM文件变更
+        'type': None,                  # 模块类型（构建系统）
+        'build_changes': set(),        # 构建配置变更（pom.xml、build.gradle、package.json、go.mod 等）
         'sql_changes': set(),          # SQL文件变更
-        'java_changes': set(),         # Java文件变更
+        'source_changes': set(),       # 源码文件变更
         'config_changes': set(),       # 配置文件变更
         'script_changes': set(),       # 脚本文件变更
         'test_changes': set(),         # 测试文件变更
@@ -708,19 +2946,20 @@ def analyze_module_impact(commits, maven_info):
             basename = os.path.basename(file_path).lower()
 
             # 更新统计数据
+            module_impacts[module_name]['type'] = module.get('type', 'maven')
             module_impacts[module_name]['total_insertions'] += stats.get('insertions', 0)
             module_impacts[module_name]['total_deletions'] += stats.get('deletions', 0)
 
             # 分类文件变更
-            if basename == 'pom.xml':
-                module_impacts[module_name]['pom_changes'].add(file_path)
+            if basename in manifest_files:
+                module_impacts[module_name]['build_changes'].add(file_path)
             elif ext == '.sql':
                 module_impacts[module_name]['sql_changes'].add(file_path)
-            elif ext == '.java':
+            elif ext in source_extensions:
                 if 'test' in file_path.lower():
                     module_impacts[module_name]['test_changes'].add(file_path)
                 else:
-                    module_impacts[module_name]['java_changes'].add(file_path)
+                    module_impacts[module_name]['source_changes'].add(file_path)
             elif ext in ['.properties', '.yml', '.yaml', '.xml', '.json', '.conf']:
                 module_impacts[module_name]['config_changes'].add(file_path)
             elif ext in ['.sh', '.bat', '.cmd', '.ps1']:
@@ -730,21 +2969,27 @@ def analyze_module_impact(commits, maven_info):
 
     return module_impacts
 
-def generate_impact_report(module_impacts):
-    """生成模块影响分析报告"""
+def generate_impact_report(module_impacts, maven_only=False):
+    """生成模块影响分析报告（maven_only 时沿用 Maven 报告的 POM/Java 列，不显示模块类型）"""
+    build_label, source_label = ('Maven POM', 'Java 源码') if maven_only else ('构建配置', '源码')
+    build_heading, source_heading = ('Maven POM 变更', 'Java 源码变更') if maven_only else ('构建配置变更', '源码变更')
     report = "# 📊 模块影响分析报告\n\n"
 
     # 添加总览部分
     report += "## 📋 变更总览\n\n"
-    report += "| 模块名称 | POM变更 | SQL变更 | Java变更 | 配置变更 | 脚本变更 | 测试变更 | 资源变更 |\n"
-    report += "|----------|----------|----------|-----------|------------|------------|------------|------------|\n"
+    if maven_only:
+        report += "| 模块名称 | POM变更 | SQL变更 | Java变更 | 配置变更 | 脚本变更 | 测试变更 | 资源变更 |\n"
+        report += "|----------|----------|----------|-----------|------------|------------|------------|------------|\n"
+    else:
+        report += "| 模块名称 | 类型 | 构建配置变更 | SQL变更 | 源码变更 | 配置变更 | 脚本变更 | 测试变更 | 资源变更 |\n"
+        report += "|----------|------|--------------|----------|-----------|------------|------------|------------|------------|\n"
 
     # 按照变更文件总数排序
     sorted_modules = sorted(
         module_impacts.items(),
-        key=lambda x: (len(x[1]['pom_changes']) + 
+        key=lambda x: (len(x[1]['build_changes']) + 
                       len(x[1]['sql_changes']) + 
-                      len(x[1]['java_changes']) + 
+                      len(x[1]['source_changes']) + 
                       len(x[1]['config_changes']) + 
                       len(x[1]['script_changes'])),
         reverse=True
@@ -752,9 +2997,9 @@ def generate_impact_report(module_impacts):
 
     # 生成总览表格
     for module_name, impact in sorted_modules:
-        total_changes = (len(impact['pom_changes']) + 
+        total_changes = (len(impact['build_changes']) + 
                         len(impact['sql_changes']) + 
-                        len(impact['java_changes']) + 
+                        len(impact['source_changes']) + 
                         len(impact['config_changes']) + 
                         len(impact['script_changes']) +
                         len(impact['test_changes']) +
@@ -764,9 +3009,11 @@ def generate_impact_report(module_impacts):
             continue
 
         report += f"| {module_name} | "
-        report += "✓ | " if impact['pom_changes'] else "- | "
+        if not maven_only:
+            report += f"{MODULE_TYPE_LABELS.get(impact['type'], '-')} | "
+        report += "✓ | " if impact['build_changes'] else "- | "
         report += "✓ | " if impact['sql_changes'] else "- | "
-        report += "✓ | " if impact['java_changes'] else "- | "
+        report += "✓ | " if impact['source_changes'] else "- | "
         report += "✓ | " if impact['config_changes'] else "- | "
         report += "✓ | " if impact['script_changes'] else "- | "
         report += "✓ | " if impact['test_changes'] else "- | "
@@ -777,9 +3024,9 @@ def generate_impact_report(module_impacts):
 
     # 生成每个模块的详细报告
     for module_name, impact in sorted_modules:
-        total_changes = (len(impact['pom_changes']) + 
+        total_changes = (len(impact['build_changes']) + 
                         len(impact['sql_changes']) + 
-                        len(impact['java_changes']) + 
+                        len(impact['source_changes']) + 
                         len(impact['config_changes']) + 
                         len(impact['script_changes']) +
                         len(impact['test_changes']) +
@@ -789,6 +3036,8 @@ def generate_impact_report(module_impacts):
             continue
 
         report += f"### {module_name}\n\n"
+        if not maven_only:
+            report += f"- 模块类型: {MODULE_TYPE_LABELS.get(impact['type'], '-')}\n"
         report += f"- 总体变更: +{impact['total_insertions']} 行, -{impact['total_deletions']} 行\n\n"
 
         # 变更类型统计
@@ -796,12 +3045,12 @@ def generate_impact_report(module_impacts):
         report += "| 变更类型 | 文件数 |\n"
         report += "|----------|--------|\n"
         
-        if impact['pom_changes']:
-            report += f"| Maven POM | {len(impact['pom_changes'])} |\n"
+        if impact['build_changes']:
+            report += f"| {build_label} | {len(impact['build_changes'])} |\n"
         if impact['sql_changes']:
             report += f"| SQL 文件 | {len(impact['sql_changes'])} |\n"
-        if impact['java_changes']:
-            report += f"| Java 源码 | {len(impact['java_changes'])} |\n"
+        if impact['source_changes']:
+            report += f"| {source_label} | {len(impact['source_changes'])} |\n"
         if impact['test_changes']:
             report += f"| 测试代码 | {len(impact['test_changes'])} |\n"
         if impact['config_changes']:
@@ -814,10 +3063,10 @@ def generate_impact_report(module_impacts):
         # 详细文件列表
         report += "\n#### 详细变更列表\n\n"
 
-        # POM 变更
-        if impact['pom_changes']:
-            report += "##### Maven POM 变更\n\n"
-            for file_path in sorted(impact['pom_changes']):
+        # 构建配置变更
+        if impact['build_changes']:
+            report += f"##### {build_heading}\n\n"
+            for file_path in sorted(impact['build_changes']):
                 report += f"- `{file_path}`\n"
             report += "\n"
 
@@ -828,10 +3077,10 @@ def generate_impact_report(module_impacts):
                 report += f"- `{file_path}`\n"
             report += "\n"
 
-        # Java 源码变更
-        if impact['java_changes']:
-            report += "##### Java 源码变更\n\n"
-            for file_path in sorted(impact['java_changes']):
+        # 源码变更
+        if impact['source_changes']:
+            report += f"##### {source_heading}\n\n"
+            for file_path in sorted(impact['source_changes']):
                 report += f"- `{file_path}`\n"
             report += "\n"
 
@@ -867,7 +3116,238 @@ def generate_impact_report(module_impacts):
 
     return report
 
-def generate_summary_report(commits, maven_info=None, repo_info=None):
+def generate_ownership_report(ownership, maven_info=None):
+    """生成代码归属分析报告（基于 blame 的当前行归属）"""
+    report = "# 👤 代码归属分析报告\n\n"
+
+    files_owners = ownership['files']
+    overall = defaultdict(int)
+    for owners in files_owners.values():
+        for author, lines in owners.items():
+            overall[author] += lines
+    total_lines = sum(overall.values())
+
+    report += "## 📋 概览\n\n"
+    report += f"- 分析文件数: **{len(files_owners)}** 个（缓存命中 {ownership['cache_hits']} 个，重新分析 {ownership['blamed']} 个）\n"
+    report += f"- 当前总行数: **{total_lines}** 行\n"
+    report += "- 说明: 统计范围为本次提交涉及且在当前版本中仍存在的文件\n"
+
+    def owner_row(owners):
+        lines = sum(owners.values())
+        if not lines:
+            return lines, '-', 0.0
+        top_author, top_lines = max(owners.items(), key=lambda x: x[1])
+        return lines, top_author, top_lines / lines * 100
+
+    report += "\n## 👥 整体归属\n\n"
+    report += "| 作者 | 行数 | 占比 |\n"
+    report += "|------|------|------|\n"
+    for author, lines in sorted(overall.items(), key=lambda x: x[1], reverse=True):
+        percentage = lines / total_lines * 100 if total_lines else 0
+        report += f"| {author} | {lines} | {percentage:.1f}% |\n"
+
+    # 按Maven模块汇总
+    if maven_info and maven_info.get('modules'):
+        module_owners = defaultdict(lambda: defaultdict(int))
+        for file_path, owners in files_owners.items():
+            module = find_module_for_file(file_path, maven_info)
+            if not module:
+                continue
+            for author, lines in owners.items():
+                module_owners[module['name']][author] += lines
+
+        report += "\n## 📦 模块归属\n\n"
+        report += "| 模块 | 行数 | 主要负责人 | 占比 | 参与人数 |\n"
+        report += "|------|------|------------|------|----------|\n"
+        for module_name, owners in sorted(module_owners.items(), key=lambda x: sum(x[1].values()), reverse=True):
+            lines, top_author, percentage = owner_row(owners)
+            report += f"| {module_name} | {lines} | {top_author} | {percentage:.1f}% | {len(owners)} |\n"
+
+    report += "\n## 📁 文件归属\n\n"
+    report += "| 文件 | 行数 | 主要负责人 | 占比 | 参与人数 |\n"
+    report += "|------|------|------------|------|----------|\n"
+    for file_path, owners in sorted(files_owners.items(), key=lambda x: sum(x[1].values()), reverse=True):
+        lines, top_author, percentage = owner_row(owners)
+        report += f"| `{file_path}` | {lines} | {top_author} | {percentage:.1f}% | {len(owners)} |\n"
+
+    return report
+
+def count_co_changes(transactions, min_support=1):
+    """统计每个元素的出现次数和元素两两共同出现的次数（transactions 为每个提交涉及的元素集合）
+
+    有 SciPy 时构建 提交 × 元素 的稀疏关联矩阵 A，由 AᵀA 的上三角得到所有共同出现次数；
+    否则逐个提交用字典计数。返回 (出现次数, [(元素A, 元素B, 共同出现次数)], 计算方式)。
+    """
+    index = {}
+    rows, cols = [], []
+    for row, transaction in enumerate(transactions):
+        for item in transaction:
+            rows.append(row)
+            cols.append(index.setdefault(item, len(index)))
+    names = list(index)
+    counts = defaultdict(int)
+    for col in cols:
+        counts[names[col]] += 1
+
+    try:
+        import numpy as np
+        from scipy import sparse
+    except ImportError:
+        pair_counts = defaultdict(int)
+        for transaction in transactions:
+            items = sorted(index[item] for item in transaction)
+            for i, left in enumerate(items):
+                for right in items[i + 1:]:
+                    pair_counts[(left, right)] += 1
+        pairs = [(names[left], names[right], count) for (left, right), count in pair_counts.items()
+                 if count >= min_support]
+        return dict(counts), pairs, 'dict'
+
+    incidence = sparse.csr_matrix((np.ones(len(rows), dtype=np.int32), (rows, cols)),
+                                  shape=(len(transactions), len(names)))
+    co_changes = sparse.triu(incidence.T @ incidence, k=1).tocoo()
+    mask = co_changes.data >= min_support
+    pairs = [(names[left], names[right], int(count)) for left, right, count in
+             zip(co_changes.row[mask], co_changes.col[mask], co_changes.data[mask])]
+    return dict(counts), pairs, 'scipy'
+
+def rank_co_changes(counts, pairs, min_degree=0.0, top_k=20):
+    """计算耦合度（共同变更次数 / 任一方变更的提交数），按共同变更次数和耦合度取前 top_k 对"""
+    ranked = []
+    for left, right, count in pairs:
+        left, right = sorted((left, right))
+        degree = count / (counts[left] + counts[right] - count)
+        if degree >= min_degree:
+            ranked.append({'a': left, 'b': right, 'count': count, 'a_count': counts[left],
+                           'b_count': counts[right], 'degree': degree})
+    ranked.sort(key=lambda pair: (-pair['count'], -pair['degree'], pair['a'], pair['b']))
+    return ranked[:top_k] if top_k else ranked
+
+def analyze_coupling(commits, maven_info=None, min_support=2, min_degree=0.0, top_k=20, max_files=50):
+    """分析文件和模块的变更耦合：同一提交中一起变更的次数"""
+    file_transactions = []
+    module_transactions = []
+    use_modules = bool(maven_info and maven_info.get('modules'))
+    module_cache = {}
+    skipped = 0
+    for commit in commits:
+        files = set(commit['files'])
+        if not files:
+            continue
+        # 大规模提交（格式化、批量重命名等）会产生大量无意义的组合，直接跳过
+        if max_files and len(files) > max_files:
+            skipped += 1
+            continue
+        file_transactions.append(files)
+        if use_modules:
+            modules = set()
+            for file_path in files:
+                if file_path not in module_cache:
+                    module = find_module_for_file(file_path, maven_info)
+                    module_cache[file_path] = module['name'] if module else None
+                if module_cache[file_path]:
+                    modules.add(module_cache[file_path])
+            module_transactions.append(modules)
+
+    file_counts, file_pairs, engine = count_co_changes(file_transactions, min_support)
+    coupling = {
+        'engine': engine,
+        'commits': len(file_transactions),
+        'skipped': skipped,
+        'min_support': min_support,
+        'min_degree': min_degree,
+        'top_k': top_k,
+        'max_files': max_files,
+        'files': rank_co_changes(file_counts, file_pairs, min_degree, top_k),
+        'modules': None
+    }
+    if use_modules:
+        module_counts, module_pairs, _ = count_co_changes(module_transactions, min_support)
+        coupling['modules'] = rank_co_changes(module_counts, module_pairs, min_degree, top_k)
+    return coupling
+
+def generate_coupling_report(coupling):
+    """生成变更耦合分析报告"""
+    report = "# 🔗 变更耦合分析报告\n\n"
+
+    report += "## 📋 概览\n\n"
+    report += f"- 分析提交数: **{coupling['commits']}** 次"
+    if coupling['skipped']:
+        report += f"（跳过变更超过 {coupling['max_files']} 个文件的提交 {coupling['skipped']} 次）"
+    report += "\n"
+    engine = 'SciPy 稀疏矩阵' if coupling['engine'] == 'scipy' else '字典计数'
+    report += f"- 计算方式: {engine}\n"
+    shown = f"每类显示前 {coupling['top_k']} 对" if coupling['top_k'] else "显示全部组合"
+    report += f"- 阈值: 共同变更 ≥ {coupling['min_support']} 次，耦合度 ≥ {coupling['min_degree']:.2f}，{shown}\n"
+    report += "- 说明: 耦合度 = 共同变更次数 / 任一方发生变更的提交数\n"
+
+    def pair_table(pairs, label, code=False):
+        if not pairs:
+            return "未发现满足阈值的耦合\n"
+        table = f"| {label} A | {label} B | 共同变更 | A 变更 | B 变更 | 耦合度 |\n"
+        table += "|------|------|----------|--------|--------|--------|\n"
+        for pair in pairs:
+            a, b = (f"`{pair['a']}`", f"`{pair['b']}`") if code else (pair['a'], pair['b'])
+            table += (f"| {a} | {b} | {pair['count']} | {pair['a_count']} | {pair['b_count']} "
+                      f"| {pair['degree'] * 100:.1f}% |\n")
+        return table
+
+    if coupling['modules'] is not None:
+        report += "\n## 📦 模块耦合\n\n"
+        report += pair_table(coupling['modules'], '模块')
+
+    report += "\n## 📁 文件耦合\n\n"
+    report += pair_table(coupling['files'], '文件', code=True)
+
+    return report
+
+def format_estimate(estimate):
+    """格式化估计值及 95% 置信区间"""
+    value, margin = estimate
+    return f"≈{value:,.0f} ±{margin:,.0f}"
+
+def generate_sampled_summary_report(sampling, maven_info, summary):
+    """在报告头部之后生成抽样估计的总结内容（提交次数为精确值，行数和文件统计为外推估计）"""
+    estimates = estimate_sampled_stats(sampling, maven_info)
+    strategy = '按月分层抽样' if sampling['strategy'] == 'month' else '简单随机抽样'
+    zero = (0.0, 0.0)
+    
+    summary += "## 📊 变更概览（抽样估计）\n\n"
+    summary += f"- 总提交次数: **{sampling['population']}** 次（精确值）\n"
+    summary += f"- 参与开发人数: **{len(sampling['author_commits'])}** 人（精确值）\n"
+    requested = f"，请求 {sampling['requested']} 个" if sampling.get('requested', len(sampling['sample'])) != len(sampling['sample']) else ""
+    summary += (f"- 抽样方式: {strategy}，实际样本 **{len(sampling['sample'])}** 个提交{requested}"
+                f"（{len(sampling['strata'])} 层，抽样比 {len(sampling['sample']) / max(1, sampling['population']) * 100:.1f}%）\n")
+    summary += (f"- 代码变更（估计）: **+{format_estimate(estimates['total'].get('insertions', zero))}** 行, "
+                f"**-{format_estimate(estimates['total'].get('deletions', zero))}** 行\n")
+    summary += "- 说明: 估计值后的 ± 为 95% 置信区间半宽，按各层样本方差计算（只有 1 个样本的层使用合并样本方差）\n"
+    if maven_info and maven_info['modules']:
+        summary += format_module_count(maven_info)
+    
+    summary += "\n## 👥 开发者贡献\n\n"
+    summary += "| 开发者 | 提交次数 | 添加行数（估计） | 删除行数（估计） |\n"
+    summary += "|--------|----------|------------------|------------------|\n"
+    for author, count in sorted(sampling['author_commits'].items(), key=lambda x: x[1], reverse=True):
+        author_estimates = estimates['author'].get(author, {})
+        summary += (f"| {author} | {count} | {format_estimate(author_estimates.get('insertions', zero))} "
+                    f"| {format_estimate(author_estimates.get('deletions', zero))} |\n")
+    
+    for title, label, key in [('📁 文件类型分布', '文件类型', 'file_type'), ('📦 模块变更', '模块', 'module')]:
+        if not estimates[key]:
+            continue
+        total_changes = sum(values.get('changes', zero)[0] for values in estimates[key].values())
+        summary += f"\n## {title}（抽样估计）\n\n"
+        summary += f"| {label} | 变更次数（估计） | 变更行数（估计） | 占比 |\n"
+        summary += "|----------|------------------|------------------|------|\n"
+        for name, values in sorted(estimates[key].items(), key=lambda x: x[1].get('changes', zero)[0], reverse=True):
+            changes = values.get('changes', zero)
+            percentage = changes[0] / total_changes * 100 if total_changes else 0
+            summary += (f"| {name} | {format_estimate(changes)} | {format_estimate(values.get('lines', zero))} "
+                        f"| {percentage:.1f}% |\n")
+    
+    return summary
+
+def generate_summary_report(commits, maven_info=None, repo_info=None, sampling=None):
     """生成总结报告"""
     summary = "# 📑 Git 提交汇总报告\n\n"
     
@@ -879,6 +3359,14 @@ def generate_summary_report(commits, maven_info=None, repo_info=None):
     summary += f"- **分析时间范围**: {repo_info['date_range']}\n"
     summary += f"- **报告生成时间**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
     
+    # 抽样模式下由样本外推总体统计
+    if sampling:
+        return generate_sampled_summary_report(sampling, maven_info, summary)
+    
+    # 仅读取元数据时只包含提交次数、开发者和提交说明
+    if not has_line_stats(commits):
+        return generate_metadata_summary_report(commits, summary)
+    
     # 基本统计
     total_commits = len(commits)
     total_insertions = sum(commit['stats']['insertions'] for commit in commits)
@@ -905,7 +3393,7 @@ def generate_summary_report(commits, maven_info=None, repo_info=None):
     summary += f"- 代码变更: **+{total_insertions}** 行, **-{total_deletions}** 行\n"
     
     if maven_info and maven_info['modules']:
-        summary += f"- Maven模块数: **{len(maven_info['modules'])}** 个\n"
+        summary += format_module_count(maven_info)
     
     # 作者贡献统计
     authors_stats = defaultdict(lambda: {'commits': 0, 'insertions': 0, 'deletions': 0})
@@ -952,6 +3440,15 @@ def generate_summary_report(commits, maven_info=None, repo_info=None):
                     summary += f"- `{file_path}`\n"
                 summary += "\n"
     
+    # 文件重命名（启用重命名跟踪时）
+    renames = [(commit, rename) for commit in commits for rename in commit.get('renames', [])]
+    if renames:
+        summary += "\n## 🔀 文件重命名\n\n"
+        summary += "| 原路径 | 新路径 | 提交 |\n"
+        summary += "|--------|--------|------|\n"
+        for commit, rename in renames:
+            summary += f"| `{rename['old']}` | `{rename['new']}` | `{commit['hash'][:8]}` |\n"
+    
     # 主要变更内容
     summary += "\n## 💡 主要变更内容\n\n"
     
@@ -972,13 +3469,238 @@ def generate_summary_report(commits, maven_info=None, repo_info=None):
     if maven_info and maven_info['modules']:
         # 生成模块影响分析
         module_impacts = analyze_module_impact(commits, maven_info)
-        impact_report = generate_impact_report(module_impacts)
+        impact_report = generate_impact_report(module_impacts, is_maven_only(maven_info))
         summary += "\n" + impact_report
 
     return summary
 
-def generate_index_filename(repo_name, branch=None, start_date=None, end_date=None):
-    """生成索引文件名"""
+def generate_metadata_summary_report(commits, summary):
+    """在报告头部之后生成仅基于提交元数据的总结内容"""
+    authors_commits = defaultdict(int)
+    for commit in commits:
+        authors_commits[commit['author']] += 1
+    
+    summary += "## 📊 变更概览\n\n"
+    summary += f"- 总提交次数: **{len(commits)}** 次\n"
+    summary += f"- 参与开发人数: **{len(authors_commits)}** 人\n"
+    summary += "- 统计模式: 仅提交元数据（不含行数和文件统计）\n"
+    
+    summary += "\n## 👥 开发者贡献\n\n"
+    summary += "| 开发者 | 提交次数 |\n"
+    summary += "|--------|----------|\n"
+    for author, count in sorted(authors_commits.items(), key=lambda x: x[1], reverse=True):
+        summary += f"| {author} | {count} |\n"
+    
+    summary += "\n## 💡 主要变更内容\n\n"
+    date_commits = defaultdict(list)
+    for commit in commits:
+        date_commits[commit['date'].strftime('%Y-%m-%d')].append(commit['message'].split('\n')[0])
+    for date in sorted(date_commits.keys(), reverse=True):
+        summary += f"### 📅 {date}\n\n"
+        for msg in date_commits[date]:
+            summary += f"- {msg}\n"
+        summary += "\n"
+    
+    return summary
+
+def generate_branch_comparison_report(commits, refs, repo_info=None, branch_files=None):
+    """生成多分支对比报告：各分支统计与各分支独有的提交"""
+    report = "# 🌿 多分支对比报告\n\n"
+    report += "## 📌 仓库信息\n\n"
+    report += f"- **仓库名称**: `{repo_info['name']}`\n"
+    report += f"- **仓库路径**: `{repo_info['path']}`\n"
+    report += f"- **对比分支**: {', '.join(f'`{ref}`' for ref in refs)}\n"
+    report += f"- **分析时间范围**: {repo_info['date_range']}\n"
+    report += f"- **报告生成时间**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
+
+    all_mask = (1 << len(refs)) - 1
+    shared = sum(1 for commit in commits if commit['ref_mask'] == all_mask)
+    report += "## 📊 分支概览\n\n"
+    report += f"- 提交总数（去重）: **{len(commits)}** 次，其中所有分支共有 **{shared}** 次\n\n"
+    report += "| 分支 | 提交次数 | 独有提交 | 开发人数 | 添加行数 | 删除行数 |\n"
+    report += "|------|----------|----------|----------|----------|----------|\n"
+
+    unique_commits = {}
+    for i, ref in enumerate(refs):
+        bit = 1 << i
+        branch_commits = [commit for commit in commits if commit['ref_mask'] & bit]
+        unique_commits[ref] = [commit for commit in branch_commits if commit['ref_mask'] == bit]
+        insertions = sum(commit['stats']['insertions'] for commit in branch_commits)
+        deletions = sum(commit['stats']['deletions'] for commit in branch_commits)
+        authors = {commit['author'] for commit in branch_commits}
+        name = f"[{ref}]({branch_files[ref].replace('.md', '.html')})" if branch_files else f"`{ref}`"
+        report += (f"| {name} | {len(branch_commits)} | {len(unique_commits[ref])} | {len(authors)} "
+                   f"| +{insertions} | -{deletions} |\n")
+
+    report += "\n## 🔎 各分支独有提交\n\n"
+    for ref in refs:
+        report += f"### 🌿 {ref}\n\n"
+        if not unique_commits[ref]:
+            report += "无独有提交\n\n"
+            continue
+        report += "| 提交 | 日期 | 作者 | 变更 | 说明 |\n"
+        report += "|------|------|------|------|------|\n"
+        for commit in unique_commits[ref]:
+            message = commit['message'].split('\n')[0].replace('|', '\\|')
+            report += (f"| `{commit['hash'][:8]}` | {commit['date'].strftime('%Y-%m-%d')} | {commit['author']} "
+                       f"| +{commit['stats']['insertions']} -{commit['stats']['deletions']} | {message} |\n")
+        report += "\n"
+
+    return report
+
+def generate_submodule_report(submodules):
+    """生成子模块章节：各子模块的提交区间、提交统计和开发者贡献（追加在总结报告之后）"""
+    report = "## 🧩 子模块变更\n\n"
+    report += "| 子模块 | 指针变更 | 提交次数 | 开发人数 | 添加行数 | 删除行数 |\n"
+    report += "|--------|----------|----------|----------|----------|----------|\n"
+    for submodule in submodules:
+        commits = submodule['commits']
+        authors = {commit['author'] for commit in commits}
+        if has_line_stats(commits):
+            insertions = f"+{sum(commit['stats']['insertions'] for commit in commits)}"
+            deletions = f"-{sum(commit['stats']['deletions'] for commit in commits)}"
+        else:
+            insertions = deletions = '-'
+        report += (f"| `{submodule['path']}` | {len(submodule['ranges'])} | {len(commits)} | {len(authors)} "
+                   f"| {insertions} | {deletions} |\n")
+    
+    for submodule in submodules:
+        commits = submodule['commits']
+        report += f"\n### 🧩 {submodule['path']}\n\n"
+        report += "提交区间: " + ", ".join(
+            f"`{new[:8]}`（新增）" if old is None else f"`{old[:8]}..{new[:8]}`"
+            for old, new in submodule['ranges']) + "\n\n"
+        if not commits:
+            report += "无匹配的提交\n"
+            continue
+        author_stats = defaultdict(lambda: {'commits': 0, 'insertions': 0, 'deletions': 0})
+        for commit in commits:
+            author_stats[commit['author']]['commits'] += 1
+            if commit['stats'] is not None:
+                author_stats[commit['author']]['insertions'] += commit['stats']['insertions']
+                author_stats[commit['author']]['deletions'] += commit['stats']['deletions']
+        if has_line_stats(commits):
+            report += "| 开发者 | 提交次数 | 添加行数 | 删除行数 |\n"
+            report += "|--------|----------|----------|----------|\n"
+            for author, stats in sorted(author_stats.items(), key=lambda x: x[1]['commits'], reverse=True):
+                report += f"| {author} | {stats['commits']} | +{stats['insertions']} | -{stats['deletions']} |\n"
+        else:
+            report += "| 开发者 | 提交次数 |\n"
+            report += "|--------|----------|\n"
+            for author, stats in sorted(author_stats.items(), key=lambda x: x[1]['commits'], reverse=True):
+                report += f"| {author} | {stats['commits']} |\n"
+        report += "\n**主要变更内容**:\n\n"
+        for commit in commits:
+            message = commit['message'].split('\n')[0]
+            report += f"- {commit['date'].strftime('%Y-%m-%d')} {message}\n"
+    
+    return report
+
+def generate_rollup_summary_report(rollup, maven_info=None, repo_info=None):
+    """根据预聚合统计生成总结报告（不需要原始提交数据）"""
+    summary = "# 📑 Git 提交汇总报告\n\n"
+    
+    # 仓库基本信息
+    summary += "## 📌 仓库信息\n\n"
+    summary += f"- **仓库名称**: `{repo_info['name']}`\n"
+    summary += f"- **仓库路径**: `{repo_info['path']}`\n"
+    summary += f"- **当前分支**: `{repo_info['branch']}`\n"
+    summary += f"- **分析时间范围**: {repo_info['date_range']}\n"
+    summary += f"- **报告生成时间**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
+    summary += "- **数据来源**: 预聚合统计（按天汇总，不含文件清单与提交说明）\n\n"
+    
+    summary += "## 📊 变更概览\n\n"
+    summary += f"- 总提交次数: **{rollup['commits']}** 次\n"
+    summary += f"- 参与开发人数: **{len(rollup['authors'])}** 人\n"
+    summary += f"- 代码变更: **+{rollup['insertions']}** 行, **-{rollup['deletions']}** 行\n"
+    if maven_info and maven_info['modules']:
+        summary += format_module_count(maven_info)
+    
+    summary += "\n## 👥 开发者贡献\n\n"
+    summary += "| 开发者 | 提交次数 | 添加行数 | 删除行数 |\n"
+    summary += "|--------|----------|----------|----------|\n"
+    for author, stats in sorted(rollup['authors'].items(), key=lambda x: x[1]['commits'], reverse=True):
+        summary += f"| {author} | {stats['commits']} | +{stats['insertions']} | -{stats['deletions']} |\n"
+    
+    if rollup['file_types']:
+        total_changes = sum(values[1] for values in rollup['file_types'].values())
+        summary += "\n## 📁 文件类型分布\n\n"
+        summary += "| 文件类型 | 变更次数 | 添加行数 | 删除行数 | 占比 |\n"
+        summary += "|----------|----------|----------|----------|------|\n"
+        for file_type, values in sorted(rollup['file_types'].items(), key=lambda x: x[1][1], reverse=True):
+            percentage = values[1] / total_changes * 100 if total_changes else 0
+            summary += f"| {file_type} | {values[1]} | +{values[2]} | -{values[3]} | {percentage:.1f}% |\n"
+    
+    if rollup['modules']:
+        summary += "\n## 📦 模块变更\n\n"
+        summary += "| 模块 | 变更次数 | 添加行数 | 删除行数 |\n"
+        summary += "|------|----------|----------|----------|\n"
+        for module_name, values in sorted(rollup['modules'].items(), key=lambda x: x[1][1], reverse=True):
+            summary += f"| {module_name} | {values[1]} | +{values[2]} | -{values[3]} |\n"
+    
+    return summary
+
+def format_delta(current, previous):
+    """格式化环比变化：差值及变化百分比"""
+    delta = current - previous
+    if delta == 0:
+        return "0"
+    if previous:
+        return f"{delta:+d} ({delta / previous * 100:+.1f}%)"
+    return f"{delta:+d} (新增)"
+
+def generate_period_comparison_report(current, previous, current_range, previous_range):
+    """生成环比变化章节：对比两个周期的预聚合统计（结构同 RollupCube.query 的结果）"""
+    report = "## 📈 环比变化\n\n"
+    report += f"- **本期**: {current_range}\n"
+    report += f"- **上期**: {previous_range}\n\n"
+    
+    report += "| 指标 | 本期 | 上期 | 变化 |\n"
+    report += "|------|------|------|------|\n"
+    for label, current_value, previous_value in [
+        ('提交次数', current['commits'], previous['commits']),
+        ('参与开发人数', len(current['authors']), len(previous['authors'])),
+        ('添加行数', current['insertions'], previous['insertions']),
+        ('删除行数', current['deletions'], previous['deletions']),
+    ]:
+        report += f"| {label} | {current_value} | {previous_value} | {format_delta(current_value, previous_value)} |\n"
+    
+    empty_author = {'commits': 0, 'insertions': 0, 'deletions': 0}
+    authors = sorted(set(current['authors']) | set(previous['authors']),
+                     key=lambda a: (-current['authors'].get(a, empty_author)['commits'],
+                                    -previous['authors'].get(a, empty_author)['commits'], a))
+    report += "\n### 👥 开发者\n\n"
+    report += "| 开发者 | 本期提交 | 上期提交 | 提交变化 | 本期变更行数 | 上期变更行数 | 行数变化 |\n"
+    report += "|--------|----------|----------|----------|--------------|--------------|----------|\n"
+    for author in authors:
+        now = current['authors'].get(author, empty_author)
+        before = previous['authors'].get(author, empty_author)
+        now_lines = now['insertions'] + now['deletions']
+        before_lines = before['insertions'] + before['deletions']
+        report += (f"| {author} | {now['commits']} | {before['commits']} | {format_delta(now['commits'], before['commits'])} "
+                   f"| {now_lines} | {before_lines} | {format_delta(now_lines, before_lines)} |\n")
+    
+    # 文件类型和模块的值为 [提交数, 变更次数, 添加行数, 删除行数]
+    for title, label, key in [('📁 文件类型', '文件类型', 'file_types'), ('📦 模块', '模块', 'modules')]:
+        names = set(current[key]) | set(previous[key])
+        if not names:
+            continue
+        empty = [0, 0, 0, 0]
+        report += f"\n### {title}\n\n"
+        report += f"| {label} | 本期变更次数 | 上期变更次数 | 变化 | 本期变更行数 | 上期变更行数 | 行数变化 |\n"
+        report += "|------|--------------|--------------|------|--------------|--------------|----------|\n"
+        for name in sorted(names, key=lambda n: (-current[key].get(n, empty)[1], -previous[key].get(n, empty)[1], n)):
+            now = current[key].get(name, empty)
+            before = previous[key].get(name, empty)
+            now_lines = now[2] + now[3]
+            before_lines = before[2] + before[3]
+            report += (f"| {name} | {now[1]} | {before[1]} | {format_delta(now[1], before[1])} "
+                       f"| {now_lines} | {before_lines} | {format_delta(now_lines, before_lines)} |\n")
+    
+    return report
+
+def generate_index_filename(repo_name, branch=None, start_date=None, end_date=None, timestamp=True):
+    """生成索引文件名（timestamp 为 False 时不带生成时间）"""
     current_time = datetime.now().strftime('%Y%m%d_%H%M%S')
     
     # 清理仓库名称
@@ -1003,28 +3725,32 @@ def generate_index_filename(repo_name, branch=None, start_date=None, end_date=No
         parts.append(current_time[:8])  # 只使用日期部分
     
     # 添加时间戳
-    parts.append(current_time[9:])  # 只使用时间部分
+    if timestamp:
+        parts.append(current_time[9:])  # 只使用时间部分
     
     return f"{'-'.join(parts)}"
 
-def generate_index_file(output_dir, summary_file, detail_file, maven_file=None, repo_info=None):
+def generate_index_file(output_dir, summary_file, detail_file, maven_file=None, repo_info=None, detail_pages=None,
+                        ownership_file=None, coupling_file=None, flat_dir=True):
     """生成美观的索引文件"""
     # 将文件扩展名从 .md 改为 .html
     summary_html = summary_file.replace('.md', '.html')
-    detail_html = detail_file.replace('.md', '.html')
+    detail_html = detail_file.replace('.md', '.html') if detail_file else None
     maven_html = maven_file.replace('.md', '.html') if maven_file else None
 
     # 根据不同的格式目录调整相对路径
     def get_relative_path(format_dir, file_path):
-        if args.flat_dir:
+        if flat_dir:
             return file_path
         else:
             return f"{format_dir}/{file_path}"
 
     # HTML 文件中的链接路径
     summary_path = get_relative_path('summary', summary_html)
-    detail_path = get_relative_path('details', detail_html)
+    detail_path = get_relative_path('details', detail_html) if detail_html else None
     maven_path = get_relative_path('maven', maven_html) if maven_html else None
+    ownership_path = get_relative_path('ownership', ownership_file.replace('.md', '.html')) if ownership_file else None
+    coupling_path = get_relative_path('coupling', coupling_file.replace('.md', '.html')) if coupling_file else None
 
     index_content = f"""# 🔍 Git 提交分析报告
 
@@ -1044,7 +3770,10 @@ def generate_index_file(output_dir, summary_file, detail_file, maven_file=None,
 - 开发者贡献分析
 - 文件类型分布
 - 主要变更内容
+"""
 
+    if detail_file:
+        index_content += f"""
 ### 2️⃣ [详细报告]({detail_path})
 
 详细报告包含以下内容：
@@ -1053,6 +3782,10 @@ def generate_index_file(output_dir, summary_file, detail_file, maven_file=None,
 - 代码行变化统计
 """
 
+    # 分页模式下列出所有详细报告分页
+    if detail_file and detail_pages:
+        index_content += "\n" + render_detail_page_table(detail_pages, get_relative_path('details', ''))
+
     if maven_file:
         index_content += f"""
 ### 3️⃣ [Maven 项目分析]({maven_path})
@@ -1062,6 +3795,25 @@ Maven 项目分析包含：
 - 模块影响范围
 - 文件类型分类
 - 详细变更清单
+"""
+
+    if ownership_file:
+        index_content += f"""
+### 👤 [代码归属分析]({ownership_path})
+
+代码归属分析包含：
+- 基于 blame 的当前代码归属
+- 模块负责人
+- 文件负责人
+"""
+
+    if coupling_file:
+        index_content += f"""
+### 🔗 [变更耦合分析]({coupling_path})
+
+变更耦合分析包含：
+- 经常在同一提交中变更的文件对
+- 模块之间的变更耦合
 """
 
     index_content += """
@@ -1077,15 +3829,131 @@ Maven 项目分析包含：
 
     return index_content
 
-def generate_html_template():
-    """生成HTML模板，包含CSS样式"""
-    return '''<!DOCTYPE html>
-<html lang="zh-CN">
-<head>
-<meta charset="UTF-8">
-<meta name="viewport" content="width=device-width,initial-scale=1.0">
-<title>Git 提交分析报告</title>
-<style>
+def split_commits_into_shards(commits, shard_mode='day', shard_size=200):
+    """将提交拆分为详细报告分页：按天（day）或按固定提交数（commits）"""
+    shards = []
+    if shard_mode == 'day':
+        commits_by_date = defaultdict(list)
+        for commit in commits:
+            commits_by_date[commit['date'].strftime('%Y-%m-%d')].append(commit)
+        for date_str, day_commits in sorted(commits_by_date.items(), reverse=True):
+            shards.append({'key': date_str, 'date': date_str, 'title': f"📅 {date_str}", 'commits': day_commits})
+    else:
+        shard_size = max(1, shard_size)
+        for start in range(0, len(commits), shard_size):
+            chunk = commits[start:start + shard_size]
+            shards.append({
+                'key': f"{start + 1}-{start + len(chunk)}",
+                'title': f"提交 {start + 1}-{start + len(chunk)}",
+                'commits': chunk
+            })
+    return shards
+
+def build_detail_page_tasks(shards, output_dir, detail_file, index_file, output_format='md', flat_dir=True, repo_info=None,
+                            compact=False, static=None):
+    """为每个分页生成渲染任务（包含上一页/下一页/索引导航）
+
+    按天分页的文件名和页眉只包含日期（不含页码），新增日期时其他日期的分页内容保持不变。
+    """
+    base_name = os.path.splitext(detail_file)[0]
+    page_files = [f"{base_name}-{shard['date']}.md" if 'date' in shard else f"{base_name}-p{i + 1:03d}.md"
+                  for i, shard in enumerate(shards)]
+    # 分页与概览页位于同一目录，索引页在非单一目录模式下位于上一级
+    index_link = os.path.splitext(index_file)[0] + '.html'
+    if not flat_dir:
+        index_link = f"../{index_link}"
+
+    tasks = []
+    for i, shard in enumerate(shards):
+        nav = [f"[🏠 索引]({index_link})", f"[📈 统计概览]({base_name}.html)"]
+        if i > 0:
+            nav.insert(0, f"[⬅️ 上一页]({os.path.splitext(page_files[i - 1])[0]}.html)")
+        if i < len(shards) - 1:
+            nav.append(f"[下一页 ➡️]({os.path.splitext(page_files[i + 1])[0]}.html)")
+        tasks.append({
+            'key': shard['key'],
+            'title': shard['title'],
+            'date': shard.get('date'),
+            'page': i + 1,
+            'pages': len(shards),
+            'commits': shard['commits'],
+            'file': page_files[i],
+            'nav': " | ".join(nav),
+            'output_dir': output_dir,
+            'format': output_format,
+            'flat_dir': flat_dir,
+            'compact': compact,
+            'static': static,
+            'repo_info': repo_info or {}
+        })
+    return tasks
+
+def render_detail_page_table(detail_pages, path_prefix=''):
+    """生成详细报告分页导航表格"""
+    table = "#### 📄 详细报告分页\n\n"
+    table += "| 分页 | 提交数 |\n"
+    table += "|------|--------|\n"
+    for page in detail_pages:
+        page_path = path_prefix + page['file'].replace('.md', '.html')
+        table += f"| [{page['title']}]({page_path}) | {page['commits']} |\n"
+    return table
+
+def render_detail_page(task):
+    """渲染并保存单个详细报告分页（可在子进程中独立执行）"""
+    repo_info = task['repo_info']
+    report = f"# 📊 Git 提交报告 · {task['title']}\n\n"
+    if repo_info:
+        report += f"- **仓库名称**: `{repo_info.get('name', '')}`\n"
+        report += f"- **当前分支**: `{repo_info.get('branch', '')}`\n"
+        report += f"- **分析时间范围**: {repo_info.get('date_range', '')}\n"
+    if task['date']:
+        report += f"- **日期**: {task['date']}，共 {len(task['commits'])} 次提交\n\n"
+    else:
+        report += f"- **分页**: 第 {task['page']} / {task['pages']} 页，共 {len(task['commits'])} 次提交\n\n"
+    report += f"{task['nav']}\n"
+    report += render_commit_records(task['commits'], task['compact'])
+    report += f"{task['nav']}\n"
+
+    static = task['static']
+    generated_files = []
+    if task['format'] in ['md', 'both']:
+        md_path = resolve_report_path(task['output_dir'], task['file'], 'md', task['flat_dir'])
+        write_output_file(md_path, report, None if static is None else [])
+        generated_files.append(md_path)
+    if task['format'] in ['html', 'both']:
+        html_path = resolve_report_path(task['output_dir'], task['file'], 'html', task['flat_dir'])
+        stylesheet = shared_stylesheet_link(task['output_dir'], html_path) if static is not None else None
+        html_content = convert_to_html(report, task['compact'], stylesheet)
+        if html_content:
+            write_output_file(html_path, html_content, static)
+            generated_files.append(html_path)
+    return generated_files
+
+def render_detail_pages(tasks, jobs=None):
+    """并行渲染所有详细报告分页，进程池不可用时退回顺序执行
+
+    流水线模式下本函数在线程中运行，此时从多线程进程 fork 子进程可能继承其他线程持有的锁，
+    因此有其他线程存活时进程池改用 spawn 方式启动。
+    """
+    print(f"\n开始渲染详细报告分页: 共 {len(tasks)} 页")
+    jobs = jobs or os.cpu_count() or 1
+    if jobs > 1 and len(tasks) > 1:
+        try:
+            import multiprocessing
+            import threading
+            from concurrent.futures import ProcessPoolExecutor
+            context = multiprocessing.get_context('spawn') if threading.active_count() > 1 else None
+            with ProcessPoolExecutor(max_workers=min(jobs, len(tasks)), mp_context=context) as executor:
+                results = list(executor.map(render_detail_page, tasks))
+            return [path for paths in results for path in paths]
+        except Exception as e:
+            print(f"并行渲染分页失败，改为顺序渲染: {str(e)}")
+    generated_files = []
+    for task in tasks:
+        generated_files.extend(render_detail_page(task))
+    return generated_files
+
+REPORT_STYLE = '''
 body{font-family:-apple-system,BlinkMacSystemFont,"Segoe UI",Roboto,"Helvetica Neue",Arial,sans-serif;line-height:1.6;color:#333;max-width:1200px;margin:0 auto;padding:20px;background-color:#f5f5f5}
 .container{background-color:white;padding:30px;border-radius:8px;box-shadow:0 2px 4px rgba(0,0,0,0.1)}
 h1,h2,h3,h4,h5,h6{color:#2c3e50;margin-top:24px;margin-bottom:16px}
@@ -1110,18 +3978,153 @@ a:hover{text-decoration:underline}
 ul{list-style-type:disc;padding-left:2em}
 li{margin:0.5em 0}
 code{word-wrap:break-word;max-width:100%}
-</style>
+'''
+
+STYLESHEET_FILE = 'report.css'
+
+def generate_html_template(stylesheet=None):
+    """生成HTML模板，包含CSS样式（指定 stylesheet 时改为引用共享样式表）"""
+    style = f'<link rel="stylesheet" href="{stylesheet}">' if stylesheet else f'<style>{REPORT_STYLE}</style>'
+    return '''<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+<meta charset="UTF-8">
+<meta name="viewport" content="width=device-width,initial-scale=1.0">
+<title>Git 提交分析报告</title>
+<!-- STYLE -->
 </head>
 <body>
 <div class="container"><!-- CONTENT --></div>
 </body>
-</html>'''
+</html>'''.replace('<!-- STYLE -->', style)
+
+COMPACT_MIN_ROWS = 50
+
+COMPACT_TABLE_STYLE = '''
+.vtable-bar{display:flex;gap:8px;align-items:center;margin:16px 0 0}
+.vtable-bar input{flex:1;padding:6px 8px;border:1px solid #dfe2e5;border-radius:4px}
+.vtable-bar button{padding:5px 10px;border:1px solid #dfe2e5;border-radius:4px;background:#f6f8fa;cursor:pointer}
+.vtable-info{color:#666;font-size:13px;white-space:nowrap}
+.vtable th{cursor:pointer;user-select:none}
+.vtable th.asc:after{content:" ▲"}
+.vtable th.desc:after{content:" ▼"}
+'''
+
+COMPACT_TABLE_SCRIPT = '''
+(function(){
+var blob=document.getElementById('report-data');if(!blob)return;
+var boxes=document.querySelectorAll('.vtable');
+if(!window.DecompressionStream){boxes.forEach(function(b){b.textContent='当前浏览器不支持 DecompressionStream，请使用新版浏览器或查看 Markdown 报告';});return;}
+var bytes=Uint8Array.from(atob(blob.textContent.trim()),function(c){return c.charCodeAt(0);});
+new Response(new Blob([bytes]).stream().pipeThrough(new DecompressionStream('deflate'))).text().then(function(text){
+var tables=JSON.parse(text).tables;boxes.forEach(function(box){render(box,tables[+box.getAttribute('data-table')]);});
+});
+function plain(html){return html.replace(/<[^>]+>/g,'').replace(/&lt;/g,'<').replace(/&gt;/g,'>').replace(/&quot;/g,'"').replace(/&#x27;/g,"'").replace(/&amp;/g,'&');}
+function key(html){var t=plain(html).trim(),m=/^[+-]?[\\d,]+(\\.\\d+)?%?$/.test(t);return m?parseFloat(t.replace(/[,%+]/g,'')):t.toLowerCase();}
+function render(box,table){
+var rows=table.rows.map(function(r){return {cells:r,keys:r.map(key),text:r.map(plain).join(' ').toLowerCase()};});
+var view=rows.slice(),page=0,size=100,column=-1,asc=true;
+box.innerHTML='<div class="vtable-bar"><input type="search" placeholder="筛选（输入任意内容）"><span class="vtable-info"></span><button data-step="-1">上一页</button><button data-step="1">下一页</button></div><table><thead><tr>'+table.columns.map(function(c,i){return '<th data-column="'+i+'">'+c+'</th>';}).join('')+'</tr></thead><tbody></tbody></table>';
+var input=box.querySelector('input'),info=box.querySelector('.vtable-info'),body=box.querySelector('tbody'),heads=box.querySelectorAll('th');
+function sort(){if(column<0)return;view.sort(function(a,b){var x=a.keys[column],y=b.keys[column];var r=typeof x===typeof y?(x<y?-1:x>y?1:0):(typeof x==='number'?-1:1);return asc?r:-r;});}
+function draw(){var pages=Math.max(1,Math.ceil(view.length/size));page=Math.min(Math.max(page,0),pages-1);
+var html='';view.slice(page*size,(page+1)*size).forEach(function(r){html+='<tr><td>'+r.cells.join('</td><td>')+'</td></tr>';});
+body.innerHTML=html;info.textContent=view.length+' / '+rows.length+' 行，第 '+(page+1)+' / '+pages+' 页';}
+input.addEventListener('input',function(){var q=input.value.trim().toLowerCase();view=q?rows.filter(function(r){return r.text.indexOf(q)>=0;}):rows.slice();sort();page=0;draw();});
+box.querySelectorAll('button').forEach(function(b){b.addEventListener('click',function(){page+=+b.getAttribute('data-step');draw();});});
+heads.forEach(function(th){th.addEventListener('click',function(){var c=+th.getAttribute('data-column');asc=column===c?!asc:true;column=c;
+heads.forEach(function(h){h.className='';});th.className=asc?'asc':'desc';sort();page=0;draw();});});
+draw();}
+})();
+'''
+
+def render_inline_markdown(text):
+    """把表格单元格中的行内 Markdown（代码、粗体、链接）转换为 HTML"""
+    import html
+    parts = re.split(r'(`[^`]*`)', text.replace('\\|', '|'))
+    rendered = []
+    for part in parts:
+        if part.startswith('`') and part.endswith('`') and len(part) > 1:
+            rendered.append(f"<code>{html.escape(part[1:-1])}</code>")
+            continue
+        part = html.escape(part)
+        part = re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', part)
+        part = re.sub(r'\[([^\]]+)\]\(([^)\s]+)\)', r'<a href="\2">\1</a>', part)
+        rendered.append(part)
+    return ''.join(rendered)
+
+def split_table_row(line):
+    """拆分 Markdown 表格行的单元格（忽略转义的 |）"""
+    line = line.strip()
+    if line.startswith('|'):
+        line = line[1:]
+    if line.endswith('|') and not line.endswith('\\|'):
+        line = line[:-1]
+    return [cell.strip() for cell in re.split(r'(?<!\\)\|', line)]
+
+def extract_compact_tables(markdown_content, min_rows=COMPACT_MIN_ROWS):
+    """紧凑 HTML：把行数较多的表格和列表抽出为数据，原位置替换为由脚本渲染的占位元素
+
+    返回 (替换后的 Markdown, 表格数据列表)，每个表格为 {'columns': 表头 HTML, 'rows': 单元格 HTML 的二维列表}。
+    """
+    lines = markdown_content.split('\n')
+    output = []
+    tables = []
+    
+    def placeholder(columns, rows):
+        tables.append({'columns': columns, 'rows': rows})
+        output.extend(['', f'<div class="vtable" data-table="{len(tables) - 1}"></div>', ''])
+    
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        # 表格：表头行 + 分隔行 + 数据行
+        if line.startswith('|') and i + 1 < len(lines) and re.match(r'^\|[\s:|-]+\|\s*$', lines[i + 1]):
+            end = i + 2
+            while end < len(lines) and lines[end].startswith('|'):
+                end += 1
+            if end - i - 2 >= min_rows:
+                placeholder([render_inline_markdown(cell) for cell in split_table_row(line)],
+                            [[render_inline_markdown(cell) for cell in split_table_row(row)] for row in lines[i + 2:end]])
+            else:
+                output.extend(lines[i:end])
+            i = end
+            continue
+        # 列表：连续的一级列表项转换为单列表格
+        if line.startswith('- '):
+            end = i
+            while end < len(lines) and lines[end].startswith('- '):
+                end += 1
+            if end - i >= min_rows:
+                placeholder(['条目'], [[render_inline_markdown(item[2:])] for item in lines[i:end]])
+            else:
+                output.extend(lines[i:end])
+            i = end
+            continue
+        output.append(line)
+        i += 1
+    return '\n'.join(output), tables
 
-def convert_to_html(markdown_content):
-    """将Markdown内容转换为HTML"""
+def encode_report_data(data):
+    """把报告数据编码为嵌入页面的数据块：紧凑 JSON → zlib 压缩 → base64"""
+    import base64
+    import json
+    import zlib
+    payload = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return base64.b64encode(zlib.compress(payload, 9)).decode('ascii')
+
+def convert_to_html(markdown_content, compact=False, stylesheet=None):
+    """将Markdown内容转换为HTML（stylesheet 为共享样式表的相对路径时不内联 CSS）
+
+    compact 时行数较多的表格和列表不生成 DOM，而是以压缩数据块嵌入页面一次，由内联脚本分页渲染，
+    支持点击表头排序和筛选，页面体积和渲染时间基本不随行数增长。
+    """
     try:
         print("开始转换Markdown到HTML...")
         import markdown2
+        tables = []
+        if compact:
+            markdown_content, tables = extract_compact_tables(markdown_content)
         html_content = markdown2.markdown(
             markdown_content,
             extras=[
@@ -1135,8 +4138,14 @@ def convert_to_html(markdown_content):
         print("Markdown转换成功，开始应用模板...")
         
         # 获取HTML模板并使用字符串换
-        template = generate_html_template()
+        template = generate_html_template(stylesheet)
         final_html = template.replace('<!-- CONTENT -->', html_content)
+        if tables:
+            if not stylesheet:
+                final_html = final_html.replace('</style>', COMPACT_TABLE_STYLE + '</style>')
+            final_html = final_html.replace('</body>', (
+                f'<script type="application/octet-stream" id="report-data">{encode_report_data({"tables": tables})}</script>\n'
+                f'<script>{COMPACT_TABLE_SCRIPT}</script>\n</body>'))
         
         print(f"HTML生成成功，内容长度: {len(final_html)}")
         return final_html
@@ -1153,6 +4162,66 @@ def convert_to_html(markdown_content):
         traceback.print_exc()
         return None
 
+def compress_output(data, encoding):
+    """生成预压缩内容：gz 固定 mtime 保证相同内容得到相同字节，br 需要安装 brotli"""
+    if encoding == 'gz':
+        import gzip
+        return gzip.compress(data, 9, mtime=0)
+    import brotli
+    return brotli.compress(data, quality=11)
+
+GENERATED_AT_PATTERN = re.compile(r'生成时间(\*\*|</strong>)?: \d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}')
+
+def content_digest(data):
+    """输出内容的哈希，忽略报告中的生成时间，重复生成时只有生成时间不同的文件视为未变化"""
+    import hashlib
+    return hashlib.sha256(GENERATED_AT_PATTERN.sub(r'生成时间\1:', data.decode('utf-8'))
+                          .encode('utf-8')).digest()
+
+def write_output_file(path, content, precompress=None):
+    """原子写入输出文件，返回是否实际写入
+
+    precompress 为 None 时直接写入；否则文件内容哈希未变化且预压缩文件齐全时跳过写入，
+    写入时为 precompress 中的每种格式生成同名的 .gz/.br 文件。
+    """
+    if precompress is None:
+        atomic_write(path, content)
+        return True
+    
+    data = content.encode('utf-8')
+    if os.path.exists(path) and os.path.getsize(path) == len(data) and \
+            all(os.path.exists(f"{path}.{encoding}") for encoding in precompress):
+        with open(path, 'rb') as f:
+            if content_digest(f.read()) == content_digest(data):
+                return False
+    # 先写预压缩文件再替换原文件，中断时下次运行会因内容不一致而重写
+    for encoding in precompress:
+        atomic_write(f"{path}.{encoding}", compress_output(data, encoding))
+    atomic_write(path, data)
+    return True
+
+def write_shared_stylesheet(output_dir, precompress=None):
+    """写入报告目录共享的样式表（内容未变化时跳过），返回样式表路径"""
+    stylesheet_path = os.path.join(output_dir, 'html', STYLESHEET_FILE)
+    write_output_file(stylesheet_path, REPORT_STYLE.lstrip() + COMPACT_TABLE_STYLE.lstrip(), precompress or [])
+    return stylesheet_path
+
+def shared_stylesheet_link(output_dir, html_path):
+    """HTML 文件引用共享样式表的相对路径"""
+    stylesheet_path = os.path.join(output_dir, 'html', STYLESHEET_FILE)
+    return os.path.relpath(stylesheet_path, os.path.dirname(html_path)).replace(os.sep, '/')
+
+def resolve_precompress(brotli=False):
+    """静态发布模式的预压缩格式：总是生成 .gz，brotli 已安装且启用时同时生成 .br"""
+    encodings = ['gz']
+    if brotli:
+        try:
+            import brotli as _
+            encodings.append('br')
+        except ImportError:
+            print("警告: 未安装 brotli，只生成 .gz 预压缩文件。可以使用 pip install brotli 安装")
+    return encodings
+
 def create_zip_archive(output_dir, zip_name=None):
     """创建报告的ZIP压缩包"""
     # 使用目录名作为默认的zip名称
@@ -1169,18 +4238,29 @@ def create_zip_archive(output_dir, zip_name=None):
         import zipfile
         print(f"\n开始创建ZIP压缩包: {zip_path}")
         
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            # 分别压缩 html 和 md 目录
-            for format_dir in ['html', 'md']:
-                format_path = os.path.join(output_dir, format_dir)
-                if os.path.exists(format_path):
-                    for root, _, files in os.walk(format_path):
-                        for file in files:
-                            file_path = os.path.join(root, file)
-                            # 使用相对路径作为zip内的路径
-                            arcname = os.path.relpath(file_path, output_dir)
-                            print(f"添加文件: {arcname}")
-                            zipf.write(file_path, arcname)
+        # 多个任务可能向同一目录写压缩包：加锁串行化，先写临时文件再重命名
+        with FileLock(zip_path):
+            temp_path = temp_output_path(zip_path)
+            try:
+                with zipfile.ZipFile(temp_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+                    # 分别压缩 html、md 和导出的 data 目录
+                    for format_dir in ['html', 'md', 'data']:
+                        format_path = os.path.join(output_dir, format_dir)
+                        if os.path.exists(format_path):
+                            for root, _, files in os.walk(format_path):
+                                for file in files:
+                                    # 预压缩文件只用于静态发布，不放入压缩包；跳过其他任务写入中的临时文件和锁文件
+                                    if file.endswith(('.gz', '.br', '.tmp', '.lock')):
+                                        continue
+                                    file_path = os.path.join(root, file)
+                                    # 使用相对路径作为zip内的路径
+                                    arcname = os.path.relpath(file_path, output_dir)
+                                    print(f"添加文件: {arcname}")
+                                    zipf.write(file_path, arcname)
+                os.replace(temp_path, zip_path)
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
         
         print(f"ZIP压缩包创建成功: {zip_path}")
         return zip_path
@@ -1188,7 +4268,378 @@ def create_zip_archive(output_dir, zip_name=None):
         print(f"创建ZIP压缩包时出错: {str(e)}")
         return None
 
-def main():
+# 导出数据表的列定义（保证 NDJSON 与列式文件字段顺序一致）
+EXPORT_TABLES = {
+    'commits': ['hash', 'author', 'email', 'date', 'message', 'insertions', 'deletions', 'files'],
+    'file_changes': ['hash', 'date', 'author', 'file', 'file_type', 'module', 'insertions', 'deletions'],
+    'authors': ['author', 'email', 'commits', 'insertions', 'deletions'],
+    'files': ['file', 'file_type', 'module', 'changes', 'insertions', 'deletions'],
+    'file_types': ['file_type', 'files', 'changes', 'insertions', 'deletions'],
+    'modules': ['module', 'path', 'files', 'changes', 'insertions', 'deletions'],
+}
+
+class ExportTableWriter:
+    """单张数据表的流式写入器：逐行写 NDJSON，同时写列式文件（Parquet 或 CSV）
+
+    各文件先写入临时文件，close() 时再重命名为正式文件名。
+    """
+
+    PARQUET_BATCH_SIZE = 10000
+
+    def __init__(self, data_dir, table_name, columnar='csv'):
+        self.table_name = table_name
+        self.columns = EXPORT_TABLES[table_name]
+        self.columnar = columnar
+        self.paths = []
+
+        ndjson_path = os.path.join(data_dir, f"{table_name}.ndjson")
+        self.ndjson = open(temp_output_path(ndjson_path), 'w', encoding='utf-8')
+        self.paths.append(ndjson_path)
+
+        if columnar == 'parquet':
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            self._pa = pa
+            self._batch = []
+            self._parquet_path = temp_output_path(os.path.join(data_dir, f"{table_name}.parquet"))
+            self._parquet_writer = None
+            self._pq = pq
+            self.paths.append(os.path.join(data_dir, f"{table_name}.parquet"))
+        else:
+            import csv
+            csv_path = os.path.join(data_dir, f"{table_name}.csv")
+            self._csv_file = open(temp_output_path(csv_path), 'w', encoding='utf-8', newline='')
+            self._csv_writer = csv.DictWriter(self._csv_file, fieldnames=self.columns)
+            self._csv_writer.writeheader()
+            self.paths.append(csv_path)
+
+    def write(self, row):
+        """写入一行数据"""
+        import json
+        self.ndjson.write(json.dumps(row, ensure_ascii=False) + '\n')
+        if self.columnar == 'parquet':
+            self._batch.append(row)
+            if len(self._batch) >= self.PARQUET_BATCH_SIZE:
+                self._flush_parquet()
+        else:
+            self._csv_writer.writerow(row)
+
+    def _flush_parquet(self):
+        """将缓冲的行作为一个 RecordBatch 写入 Parquet 文件"""
+        if not self._batch:
+            return
+        table = self._pa.Table.from_pylist(self._batch)
+        if self._parquet_writer is None:
+            self._parquet_writer = self._pq.ParquetWriter(self._parquet_path, table.schema)
+        self._parquet_writer.write_table(table.cast(self._parquet_writer.schema))
+        self._batch = []
+
+    def close(self, discard=False):
+        """关闭所有文件句柄，并将临时文件重命名为正式文件（discard 时删除临时文件）"""
+        self.ndjson.close()
+        if self.columnar == 'parquet':
+            self._flush_parquet()
+            if self._parquet_writer is not None:
+                self._parquet_writer.close()
+            else:
+                # 空表也生成带表头的文件，方便下游统一读取
+                schema = self._pa.schema([(name, self._pa.string()) for name in self.columns])
+                self._pq.write_table(schema.empty_table(), self._parquet_path)
+        else:
+            self._csv_file.close()
+        for path in self.paths:
+            temp_path = temp_output_path(path)
+            if discard:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+            else:
+                os.replace(temp_path, path)
+
+def resolve_export_format(export_format):
+    """确定列式文件格式：auto 时优先 Parquet（需要 pyarrow），否则退回 CSV"""
+    if export_format == 'csv':
+        return 'csv'
+    try:
+        import pyarrow  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+        return 'parquet'
+    except ImportError:
+        if export_format == 'parquet':
+            print("警告: pyarrow 库未安装，无法生成Parquet文件，改为输出CSV")
+            print("请运行: pip install pyarrow")
+        return 'csv'
+
+def export_report_data(commits, output_dir, maven_info=None, export_format='auto'):
+    """导出机器可读的明细与汇总数据（NDJSON + Parquet/CSV）"""
+    data_dir = os.path.join(output_dir, 'data')
+    columnar = resolve_export_format(export_format)
+    print(f"\n开始导出数据: {data_dir}（列式格式: {columnar}）")
+
+    use_modules = bool(maven_info and maven_info.get('modules'))
+    authors_stats = defaultdict(lambda: {'commits': 0, 'insertions': 0, 'deletions': 0, 'email': ''})
+    files_stats = defaultdict(lambda: {'changes': 0, 'insertions': 0, 'deletions': 0})
+    types_stats = defaultdict(lambda: {'files': set(), 'changes': 0, 'insertions': 0, 'deletions': 0})
+    modules_stats = defaultdict(lambda: {'path': '', 'files': set(), 'changes': 0, 'insertions': 0, 'deletions': 0})
+    module_cache = {}
+
+    writers = {}
+    try:
+        os.makedirs(data_dir, exist_ok=True)
+        for table_name in EXPORT_TABLES:
+            if table_name == 'modules' and not use_modules:
+                continue
+            writers[table_name] = ExportTableWriter(data_dir, table_name, columnar)
+
+        # 单次遍历：明细行流式写出，同时累加各维度汇总
+        for commit in commits:
+            date_str = commit['date'].isoformat()
+            # 仅读取元数据的提交没有行数统计，对应字段导出为空值
+            metadata_only = commit['stats'] is None
+            writers['commits'].write({
+                'hash': commit['hash'],
+                'author': commit['author'],
+                'email': commit['email'],
+                'date': date_str,
+                'message': commit['message'],
+                'insertions': None if metadata_only else commit['stats']['insertions'],
+                'deletions': None if metadata_only else commit['stats']['deletions'],
+                'files': None if metadata_only else len(commit['files']),
+            })
+
+            author = authors_stats[commit['author']]
+            author['commits'] += 1
+            author['email'] = commit['email']
+            if metadata_only:
+                author['insertions'] = author['deletions'] = None
+                continue
+            author['insertions'] += commit['stats']['insertions']
+            author['deletions'] += commit['stats']['deletions']
+
+            for file_path, stats in commit['files'].items():
+                insertions = stats.get('insertions', 0)
+                deletions = stats.get('deletions', 0)
+                file_type = categorize_file_type(file_path)
+
+                module_name = ''
+                if use_modules:
+                    if file_path not in module_cache:
+                        module_cache[file_path] = find_module_for_file(file_path, maven_info)
+                    module = module_cache[file_path]
+                    if module:
+                        module_name = module['name']
+                        module_stats = modules_stats[module_name]
+                        module_stats['path'] = module['path']
+                        module_stats['files'].add(file_path)
+                        module_stats['changes'] += 1
+                        module_stats['insertions'] += insertions
+                        module_stats['deletions'] += deletions
+
+                writers['file_changes'].write({
+                    'hash': commit['hash'],
+                    'date': date_str,
+                    'author': commit['author'],
+                    'file': file_path,
+                    'file_type': file_type,
+                    'module': module_name,
+                    'insertions': insertions,
+                    'deletions': deletions,
+                })
+
+                files_stats[file_path]['changes'] += 1
+                files_stats[file_path]['insertions'] += insertions
+                files_stats[file_path]['deletions'] += deletions
+
+                type_stats = types_stats[file_type]
+                type_stats['files'].add(file_path)
+                type_stats['changes'] += 1
+                type_stats['insertions'] += insertions
+                type_stats['deletions'] += deletions
+
+        # 汇总表
+        for author, stats in sorted(authors_stats.items(), key=lambda x: x[1]['commits'], reverse=True):
+            writers['authors'].write({
+                'author': author,
+                'email': stats['email'],
+                'commits': stats['commits'],
+                'insertions': stats['insertions'],
+                'deletions': stats['deletions'],
+            })
+
+        for file_path, stats in sorted(files_stats.items(), key=lambda x: x[1]['changes'], reverse=True):
+            module = module_cache.get(file_path)
+            writers['files'].write({
+                'file': file_path,
+                'file_type': categorize_file_type(file_path),
+                'module': module['name'] if module else '',
+                'changes': stats['changes'],
+                'insertions': stats['insertions'],
+                'deletions': stats['deletions'],
+            })
+
+        for file_type, stats in sorted(types_stats.items(), key=lambda x: len(x[1]['files']), reverse=True):
+            writers['file_types'].write({
+                'file_type': file_type,
+                'files': len(stats['files']),
+                'changes': stats['changes'],
+                'insertions': stats['insertions'],
+                'deletions': stats['deletions'],
+            })
+
+        if use_modules:
+            for module_name, stats in sorted(modules_stats.items()):
+                writers['modules'].write({
+                    'module': module_name,
+                    'path': stats['path'],
+                    'files': len(stats['files']),
+                    'changes': stats['changes'],
+                    'insertions': stats['insertions'],
+                    'deletions': stats['deletions'],
+                })
+    except Exception as e:
+        print(f"导出数据时出错: {str(e)}")
+        # 流水线模式下不再消费提交流，通知生产端停止写入
+        if isinstance(commits, PipelineQueue):
+            commits.cancel()
+        for writer in writers.values():
+            writer.close(discard=True)
+        return []
+
+    for writer in writers.values():
+        writer.close()
+
+    generated_files = []
+    for writer in writers.values():
+        generated_files.extend(writer.paths)
+    print(f"数据导出成功，共 {len(generated_files)} 个文件")
+    return generated_files
+
+def inspect_commit_graph(objects_dir):
+    """检查仓库的 commit-graph 状态：是否存在、是否为分层（split）结构、是否包含变更路径 Bloom 过滤器"""
+    info_dir = os.path.join(objects_dir, 'info')
+    single = os.path.join(info_dir, 'commit-graph')
+    chain = os.path.join(info_dir, 'commit-graphs', 'commit-graph-chain')
+
+    graph_files = []
+    split = False
+    if os.path.exists(chain):
+        split = True
+        with open(chain, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    graph_files.append(os.path.join(info_dir, 'commit-graphs', f"graph-{line.strip()}.graph"))
+    elif os.path.exists(single):
+        graph_files.append(single)
+
+    def has_bloom(graph_path):
+        # 文件头：'CGPH' + 版本 + 哈希版本 + chunk 数 + base graph 数，随后是 12 字节的 chunk 目录项
+        try:
+            with open(graph_path, 'rb') as f:
+                header = f.read(8)
+                if len(header) < 8 or header[:4] != b'CGPH':
+                    return False
+                chunk_ids = {f.read(12)[:4] for _ in range(header[6])}
+            return b'BIDX' in chunk_ids and b'BDAT' in chunk_ids
+        except OSError:
+            return False
+
+    return {
+        'exists': bool(graph_files),
+        'split': split,
+        'layers': len(graph_files),
+        'bloom': bool(graph_files) and all(has_bloom(path) for path in graph_files)
+    }
+
+def benchmark_history_walk(repo, sample_path=None, rounds=3):
+    """测量完整历史遍历和按路径遍历的耗时（取多次中的最小值，单位：秒）"""
+    import time
+    timings = {}
+    walks = {'full': ['--count', 'HEAD']}
+    if sample_path:
+        walks['path'] = ['--count', 'HEAD', '--', sample_path]
+    for name, walk_args in walks.items():
+        best = None
+        for _ in range(rounds):
+            started = time.perf_counter()
+            repo.git.rev_list(*walk_args)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        timings[name] = best
+    return timings
+
+def prepare_repository(repo_path, force=False, fetch_commit_graph=False):
+    """为仓库生成或增量更新 commit-graph 与变更路径 Bloom 过滤器，并报告遍历加速效果
+
+    fetch_commit_graph 为真时同时在仓库配置中设置 fetch.writeCommitGraph，之后每次 fetch 都会更新 commit-graph。
+    """
+    try:
+        repo = Repo(repo_path)
+    except (InvalidGitRepositoryError, OSError):
+        print(f"错误: '{repo_path}' 不是一个有效的 Git 仓库")
+        return None
+
+    objects_dir = os.path.join(repo.common_dir, 'objects')
+    before = inspect_commit_graph(objects_dir)
+    print(f"\n📦 仓库: {os.path.abspath(repo_path)}")
+    print(f"- commit-graph: {'已存在' if before['exists'] else '不存在'}"
+          f"{'（分层，' + str(before['layers']) + ' 层）' if before['split'] else ''}")
+    print(f"- 变更路径 Bloom 过滤器: {'已包含' if before['bloom'] else '未包含'}")
+
+    # 取最近一次提交修改的文件作为按路径遍历的样本
+    sample_path = None
+    try:
+        changed = repo.git.log('-1', '--format=', '--name-only').splitlines()
+        sample_path = changed[0] if changed else None
+    except GitCommandError:
+        pass
+
+    timings_before = benchmark_history_walk(repo, sample_path)
+
+    # 默认增量写入新的分层；强制时用单个新分层替换整个链
+    write_args = ['write', '--reachable', '--changed-paths', '--split=replace' if force else '--split']
+    try:
+        print("- 正在写入 commit-graph ...")
+        repo.git.commit_graph(*write_args)
+        repo.git.config('core.commitGraph', 'true')
+        if fetch_commit_graph:
+            repo.git.config('fetch.writeCommitGraph', 'true')
+            print("- 已在仓库配置中设置 fetch.writeCommitGraph=true（之后每次 fetch 都会更新 commit-graph）")
+    except GitCommandError as e:
+        print(f"写入 commit-graph 时出错: {str(e)}")
+        return None
+
+    after = inspect_commit_graph(objects_dir)
+    timings_after = benchmark_history_walk(repo, sample_path)
+
+    print(f"- 写入完成: {after['layers']} 层，Bloom 过滤器: {'已包含' if after['bloom'] else '未包含'}")
+    print("\n| 遍历方式 | 写入前 | 写入后 | 加速比 |")
+    print("|----------|--------|--------|--------|")
+    labels = {'full': '完整历史', 'path': f"按路径 ({sample_path})"}
+    for name, elapsed_before in timings_before.items():
+        elapsed_after = timings_after[name]
+        speedup = elapsed_before / elapsed_after if elapsed_after else 0
+        print(f"| {labels[name]} | {elapsed_before * 1000:.1f} ms | {elapsed_after * 1000:.1f} ms | {speedup:.2f}x |")
+
+    return {'before': before, 'after': after, 'timings_before': timings_before, 'timings_after': timings_after}
+
+def prepare_main(argv):
+    """prepare 子命令：为一个或多个仓库准备 commit-graph 和变更路径 Bloom 过滤器"""
+    parser = argparse.ArgumentParser(prog='git_report.py prepare',
+                                     description='为仓库生成或更新 commit-graph 与变更路径 Bloom 过滤器，加速按时间/路径的历史遍历')
+    parser.add_argument('repo_paths', nargs='+', help='Git仓库的本地路径（支持多个）')
+    parser.add_argument('--force', action='store_true', help='用单个新分层替换整个 commit-graph 链')
+    parser.add_argument('--fetch-commit-graph', action='store_true',
+                        help='在仓库配置中设置 fetch.writeCommitGraph=true，之后每次 fetch 自动更新 commit-graph')
+    prepare_args = parser.parse_args(argv)
+
+    failed = 0
+    for repo_path in prepare_args.repo_paths:
+        if prepare_repository(repo_path, prepare_args.force, prepare_args.fetch_commit_graph) is None:
+            failed += 1
+    print("\n✨ 完成！" if not failed else f"\n⚠️ {failed} 个仓库处理失败")
+    sys.exit(1 if failed else 0)
+
+def build_parser():
+    """报告生成的命令行参数（ReportConfig 的默认值也取自这里）"""
     parser = argparse.ArgumentParser(description='生成Git仓库的提交报告')
     parser.add_argument('repo_path', help='Git仓库的本地路径')
     parser.add_argument('--start-date', help='开始日期 (YYYY-MM-DD格式)')
@@ -1199,170 +4650,942 @@ def main():
     parser.add_argument('--output-dir', '-d', help='输出目录（可选，默认为 ./git_reports/库名）')
     parser.add_argument('--branch', '-b', help='指定要分析的分支（可选，默认为当前分支）')
     parser.add_argument('--authors', '-a', nargs='+', help='指定要分析的作者列表（可选，支持多个作者）')
+    parser.add_argument('--grep', nargs='+', metavar='PATTERN',
+                      help='只统计提交说明匹配的提交（扩展正则，不区分大小写，多个条件任一匹配即可），交给 git log --grep 过滤')
+    parser.add_argument('--ticket', nargs='+', metavar='KEY',
+                      help='只统计提及指定工单的提交（如 PROJ-123，只写项目前缀 PROJ 时匹配该项目的所有工单）')
+    parser.add_argument('--no-message-index', action='store_true',
+                      help='按提交说明筛选时不使用持久化的提交说明索引，直接由 git log --grep 遍历历史')
+    parser.add_argument('--merges', choices=list(MERGE_POLICY_OPTIONS), default='include',
+                      help='合并提交策略：include (包含，默认)，skip (跳过)，first-parent (只沿主线)，only (只统计合并提交)')
+    parser.add_argument('--include', nargs='+', metavar='GLOB',
+                      help='只统计匹配的路径（gitignore 风格，如 src/ "*.java"），作为 git pathspec 传给 log/diff')
+    parser.add_argument('--exclude', nargs='+', metavar='GLOB',
+                      help='排除匹配的路径（转换为 :(exclude) pathspec，被排除的文件不会做 diff）')
+    parser.add_argument('--default-excludes', action='store_true',
+                      help=f"启用默认排除规则：{', '.join(DEFAULT_EXCLUDES)}")
+    parser.add_argument('--no-mailmap', action='store_true', help='不使用 .mailmap 归并作者身份')
+    parser.add_argument('--backend', choices=list(GIT_BACKENDS), default='gitpython',
+                      help='Git 访问后端：gitpython (默认)，batch (批量 git 子进程流)，pygit2 (需安装 pygit2)')
+    parser.add_argument('--check-backends', nargs='*', choices=list(GIT_BACKENDS), metavar='BACKEND',
+                      help='用多个后端（默认全部）读取同一时间范围的提交并比对结果是否一致，然后退出')
     parser.add_argument('--list-branches', '-l', action='store_true', help='列出所有可用的分支')
     parser.add_argument('--list-authors', '-la', action='store_true', help='列出所有提交过的作者')
     parser.add_argument('--maven', '-m', action='store_true', help='生成Maven项目详细分析报告')
+    parser.add_argument('--modules', nargs='*', choices=list(MODULE_DETECTORS), metavar='DETECTOR',
+                      help=f"按构建系统识别模块并生成模块分析（可选 {', '.join(MODULE_DETECTORS)}，不指定则全部启用）")
     parser.add_argument('--format', '-f', choices=['md', 'html', 'both'], default='md',
                       help='输出格式：md (仅Markdown)，html (仅HTML)，both (同时生成两种格式)')
     parser.add_argument('--flat-dir', action='store_true', default=True,
                       help='使用单一目录存储所有报告文件（默认：是）')
+    parser.add_argument('--compact-html', action='store_true',
+                      help=f'紧凑 HTML：超过 {COMPACT_MIN_ROWS} 行的表格和列表以压缩数据块嵌入，由脚本分页渲染，支持排序和筛选（详细提交记录改为表格形式）')
+    parser.add_argument('--static-output', action='store_true',
+                      help='静态发布模式：HTML 引用报告目录共享的样式表，内容未变化的文件不重写，并生成预压缩的 .gz 文件')
+    parser.add_argument('--brotli', action='store_true',
+                      help='静态发布模式下同时生成 .br 预压缩文件（需要安装 brotli）')
+    parser.add_argument('--watch', action='store_true',
+                      help='监视模式：生成报告后持续监视分支引用，有新提交时增量更新报告（详细报告按天分页）')
+    parser.add_argument('--watch-interval', type=float, default=2.0, metavar='SECONDS',
+                      help='监视模式检查引用文件的间隔秒数（默认 2）')
     parser.add_argument('--zip', '-z', nargs='?', const='', metavar='ZIP_NAME',
                       help='创建ZIP压缩包（可选指定压缩包名称）')
+    parser.add_argument('--export', '-e', nargs='?', const='auto', choices=['auto', 'parquet', 'csv'],
+                      help='同时导出机器可读数据：NDJSON + 列式文件（auto 优先 Parquet，未安装 pyarrow 时为 CSV）')
+    parser.add_argument('--shard', choices=['day', 'commits'],
+                      help='详细报告分页模式：day (每天一页)，commits (每 --shard-size 个提交一页)')
+    parser.add_argument('--shard-size', type=int, default=200,
+                      help='按提交数分页时每页的提交数（默认：200）')
+    parser.add_argument('--ownership', action='store_true',
+                      help='生成基于 git blame 的代码归属分析报告（结果按文件版本缓存）')
+    parser.add_argument('--coupling', action='store_true',
+                      help='生成变更耦合分析报告：经常在同一提交中一起变更的文件和模块')
+    parser.add_argument('--coupling-min-support', type=int, default=2, metavar='N',
+                      help='变更耦合：共同变更次数下限（默认：2）')
+    parser.add_argument('--coupling-min-degree', type=float, default=0.0, metavar='RATIO',
+                      help='变更耦合：耦合度下限，0~1（默认：0）')
+    parser.add_argument('--coupling-top', type=int, default=20, metavar='K',
+                      help='变更耦合：每类显示的组合数（默认：20）')
+    parser.add_argument('--coupling-max-files', type=int, default=50, metavar='N',
+                      help='变更耦合：跳过变更文件数超过 N 的提交（默认：50）')
+    parser.add_argument('--cache-dir', help='缓存目录（可选，默认为仓库 .git/git-report-cache）')
+    parser.add_argument('--follow-renames', action='store_true',
+                      help='跟踪文件重命名，将同一文件在不同历史路径下的变更合并统计')
+    parser.add_argument('--submodules', action='store_true',
+                      help='递归分析子模块：按父仓库中的指针变更确定各子模块的提交区间并行读取，合并到总结报告并附各子模块章节')
+    parser.add_argument('--compare-branches', nargs='*', metavar='REF',
+                      help='多分支对比：一次遍历指定分支（不指定则为所有本地分支）的历史，生成各分支报告和独有提交对比')
+    parser.add_argument('--rollup', action='store_true',
+                      help='使用持久化的预聚合统计（按天×作者×文件类型×模块）生成总结报告，增量更新')
+    parser.add_argument('--summary-only', action='store_true',
+                      help='只生成总结报告和索引（配合 --rollup 时完全不读取原始提交）')
+    parser.add_argument('--metadata-only', action='store_true',
+                      help='只读取提交元数据（哈希、作者、时间、说明），不计算行数和文件统计，适合快速生成提交摘要')
+    parser.add_argument('--compare-previous', action='store_true',
+                      help='环比：在总结报告中加入与上一周期（如 thisweek 对比 lastweek）的作者、文件类型和模块变化')
+    parser.add_argument('--sample', type=int, default=None, metavar='N',
+                      help='抽样模式：只为至多 N 个（至少 2 个）抽样提交计算行数统计，外推总体并给出 95%% 置信区间（适合全量历史）')
+    parser.add_argument('--sample-by', choices=['month', 'uniform'], default='month',
+                      help='抽样方式：month (按月分层，默认)，uniform (简单随机抽样)')
+    parser.add_argument('--sample-seed', type=int, default=None, metavar='SEED',
+                      help='抽样随机种子（指定后结果可复现）')
+    parser.add_argument('--top-k-capacity', type=int, default=None, metavar='N',
+                      help='文件/目录/作者变更排行的计数器容量上限，超出后以 SpaceSaving 近似统计（默认：不限，精确统计）；'
+                           '只限制排行表的内存，提交列表和其余报告仍使用完整的文件列表')
+    parser.add_argument('--jobs', '-j', type=int, default=None,
+                      help='并行任务数（默认：CPU核心数）')
+    parser.add_argument('--pipeline', nargs='?', type=int, const=256, default=None, metavar='QUEUE_SIZE',
+                      help='流水线模式：git 读取、提交聚合和数据导出通过有界队列重叠执行，读取完成后各报告的输出并行执行（默认队列长度：256）')
+    return parser
+
+class ReportConfig:
+    """报告配置：属性与命令行参数一一对应（如 date、authors、output_dir、format），未指定的选项取命令行的默认值"""
+
+    def __init__(self, repo_path, **options):
+        values = vars(build_parser().parse_args([repo_path]))
+        unknown = set(options) - set(values)
+        if unknown:
+            raise TypeError(f"未知的配置项: {', '.join(sorted(unknown))}")
+        values.update(options)
+        self.__dict__.update(values)
+
+    def copy(self, **changes):
+        """复制配置（列表类选项一并复制），可同时修改部分选项"""
+        values = {key: list(value) if isinstance(value, list) else value for key, value in vars(self).items()}
+        values.update(changes)
+        return ReportConfig(**values)
+
+    def date_range(self):
+        """解析日期快捷方式或起止日期，返回 (开始时间, 结束时间)，未指定时为 None"""
+        if self.date:
+            if self.date not in DATE_SHORTCUT_PERIODS:
+                raise ReportError(f"未知的日期快捷方式: {self.date}（可选 {', '.join(DATE_SHORTCUT_PERIODS)}）")
+            return get_date_range(self.date)
+        start_date = parse_date(self.start_date) if self.start_date else None
+        end_date = parse_date(self.end_date) if self.end_date else None
+        return start_date, end_date
+
+def print_analysis_info(generator, config, start_date=None, end_date=None):
+    """显示分析信息"""
+    print(f"\n正在分析仓库: {config.repo_path}")
+    print(f"当前分支: {generator.current_branch}")
+    print(f"查找条件: {format_search_conditions(config.branch, config.authors, start_date, end_date, config.date, config.merges, config.grep, config.ticket)}")
+
+class ReportRunner:
+    """库接口：按 ReportConfig 生成报告并返回结构化结果
+
+    同一个实例可以连续生成多份报告，相同仓库和遍历配置的 GitReportGenerator（仓库句柄、作者身份索引、
+    常驻的 git 后端进程）会被复用；用完后调用 close() 结束后端进程。
+    """
+
+    def __init__(self):
+        self.generators = {}
+
+    def get_generator(self, config):
+        """获取（或创建）与配置对应的报告生成实例，复用时按需切换回配置的分支"""
+        excludes = (DEFAULT_EXCLUDES if config.default_excludes else []) + (config.exclude or [])
+        pathspecs = build_pathspecs(config.include, excludes)
+        key = (os.path.abspath(config.repo_path), config.branch, config.cache_dir, not config.no_mailmap,
+               config.merges, tuple(pathspecs), config.backend)
+        generator = self.generators.get(key)
+        if generator is None:
+            # 创建报告生成实例（带有指定的分支）
+            generator = GitReportGenerator(config.repo_path, config.branch, config.cache_dir, not config.no_mailmap,
+                                           config.merges, pathspecs, config.backend)
+            self.generators[key] = generator
+        elif config.branch and (generator.repo.head.is_detached or generator.repo.active_branch.name != config.branch):
+            generator.repo.git.checkout(config.branch)
+            generator.current_branch = config.branch
+        return generator
+
+    def run(self, config):
+        """生成报告，返回结构化结果
+
+        结果为字典：mode（report/branches/sample）、output_dir（没有匹配的提交时为 None）、
+        files（报告类型 → 生成的文件路径列表，如 index、summary、detail、maven、ownership、coupling、data、branches）、
+        zip（压缩包路径）、commits（读取的提交列表，仅使用预聚合统计时为 None）。
+        """
+        # 配置在运行过程中会按选项之间的约束调整，复制一份以免影响调用方
+        config = config.copy()
+        start_date, end_date = config.date_range()
+        result = {'mode': 'report', 'output_dir': None, 'files': {}, 'zip': None, 'commits': None}
+        
+        # --modules 使用多种构建系统的模块探测器，其余流程与 --maven 相同
+        if config.modules is not None:
+            config.maven = True
+            config.modules = config.modules or list(MODULE_DETECTORS)
+        
+        # 仅读取元数据时没有行数和文件统计，依赖这些数据的功能不可用
+        if config.metadata_only:
+            ignored = [flag for flag, enabled in [
+                ('--maven', config.maven), ('--ownership', config.ownership), ('--coupling', config.coupling),
+                ('--follow-renames', config.follow_renames),
+                ('--rollup', config.rollup), ('--compare-previous', config.compare_previous),
+                ('--compare-branches', config.compare_branches is not None), ('--sample', config.sample)] if enabled]
+            if ignored:
+                print(f"提示: 仅读取提交元数据时没有行数和文件统计，已忽略 {'/'.join(ignored)}")
+            config.maven = config.ownership = config.coupling = config.follow_renames = config.rollup = False
+            config.compare_previous = False
+            config.compare_branches = None
+            config.sample = None
+        
+        if config.sample is not None and config.sample < 2:
+            raise ValueError("sample 的样本数至少为 2（估计置信区间需要样本方差）")
+        
+        # 静态发布模式：共享样式表、跳过未变化的文件、生成预压缩文件
+        static = resolve_precompress(config.brotli) if config.static_output else None
+        if config.brotli and not config.static_output:
+            print("提示: 预压缩文件只在静态发布模式下生成，已忽略 --brotli")
+        
+        # 抽样模式只生成总结报告，依赖完整提交统计的功能不可用
+        if config.sample:
+            ignored = [flag for flag, enabled in [
+                ('--ownership', config.ownership), ('--coupling', config.coupling), ('--export', config.export),
+                ('--shard', config.shard), ('--follow-renames', config.follow_renames), ('--rollup', config.rollup),
+                ('--compare-previous', config.compare_previous),
+                ('--compare-branches', config.compare_branches is not None)] if enabled]
+            if ignored:
+                print(f"提示: 抽样模式只生成总结报告，已忽略 {'/'.join(ignored)}")
+            config.ownership = config.coupling = config.follow_renames = config.rollup = config.compare_previous = False
+            config.export = config.shard = config.compare_branches = None
+        
+        generator = self.get_generator(config)
+        print_analysis_info(generator, config, start_date, end_date)
+        
+        # 按提交说明筛选：工单号转换为正则，与 --grep 一起交给 git log --grep
+        grep_patterns = (config.grep or []) + [ticket_to_pattern(ticket) for ticket in config.ticket or []]
+        if grep_patterns and config.rollup:
+            print("提示: 预聚合统计不包含提交说明，按提交说明筛选时已忽略 --rollup")
+            config.rollup = False
+        
+        # 子模块分析需要读取原始提交，只用于单分支的常规报告
+        if config.submodules and (config.rollup or config.sample or config.compare_branches is not None):
+            print("提示: 子模块分析只用于常规报告，与 --rollup/--sample/--compare-branches 同时使用时已忽略 --submodules")
+            config.submodules = False
+        
+        # 获取Maven项目信息（如果需要）
+        maven_info = None
+        maven_report = None
+        if config.maven:
+            maven_info = build_module_index(config.repo_path, config.modules or ['maven'])
+        
+        # 多分支对比模式：一次遍历所有分支的历史并集，生成各分支总结报告和对比报告
+        if config.compare_branches is not None:
+            refs = config.compare_branches or [branch['name'] for branch in generator.get_branches()]
+            commits = generator.get_commits_by_refs(refs, start_date, end_date, config.authors, grep_patterns)
+            result.update(mode='branches', commits=commits)
+            if not commits:
+                print("警告: 在指定时间范围内没有找到任何提交记录")
+                return result
+            
+            output_dir = config.output_dir or generate_report_directory(
+                generator.repo_name, 'branches', config.date, start_date, end_date, maven_info,
+                flat_dir=config.flat_dir)
+            if static and config.format != 'md':
+                write_shared_stylesheet(output_dir, static)
+            output_file = config.output if config.output else generate_output_filename(
+                generator.repo_name, None, config.authors, start_date, end_date, config.date, not static)
+            repo_info = {
+                'name': generator.repo_name,
+                'path': generator.repo_path,
+                'branch': ', '.join(refs),
+                'date_range': generator._format_date_range(start_date, end_date)
+            }
+            
+            branch_paths = []
+            branch_links = {}
+            for i, ref in enumerate(refs):
+                clean_ref = ''.join(c if c.isalnum() or c in '-_' else '_' for c in ref)
+                branch_file = f"summary-{clean_ref}-{output_file}"
+                branch_links[ref] = branch_file if config.flat_dir else f"summary/{branch_file}"
+                branch_commits = [commit for commit in commits if commit['ref_mask'] >> i & 1]
+                branch_report = generate_summary_report(branch_commits, maven_info, dict(repo_info, branch=ref))
+                branch_paths += generator.save_report(branch_report, output_dir, branch_file, config.format,
+                                                      config.flat_dir, config.compact_html, static)
+            
+            comparison_report = generate_branch_comparison_report(commits, refs, repo_info, branch_links)
+            comparison_paths = generator.save_report(comparison_report, output_dir, f"branches-{output_file}",
+                                                     config.format, config.flat_dir, config.compact_html, static)
+            
+            result.update(output_dir=output_dir, files={'branches': comparison_paths, 'summary': branch_paths})
+            if config.zip is not None:
+                result['zip'] = create_zip_archive(output_dir, config.zip)
+            return result
+        
+        # 提交说明索引：增量更新后直接查出候选提交，无需遍历整个时间范围的历史
+        candidates = None
+        if grep_patterns and not config.no_message_index:
+            message_index = MessageIndex.load(generator)
+            message_index.update(generator)
+            candidates = message_index.lookup(config.grep, config.ticket)
+            if candidates is None:
+                print("提示: --grep 条件包含正则语法，无法使用提交说明索引，改为由 git log --grep 过滤")
+            else:
+                print(f"提交说明索引命中候选提交: {len(candidates)} 个")
+        
+        # 抽样模式：读取全部提交的元数据，只为样本计算行数统计，外推总体并给出置信区间
+        if config.sample:
+            sampling = generator.sample_commits(start_date, end_date, config.authors, config.sample, config.sample_by,
+                                                config.sample_seed, grep_patterns, candidates)
+            result.update(mode='sample', commits=sampling['sample'])
+            if not sampling['population']:
+                print("警告: 在指定时间范围内没有找到任何提交记录")
+                return result
+            
+            output_dir = config.output_dir or generate_report_directory(
+                generator.repo_name, config.branch, config.date, start_date, end_date, maven_info,
+                flat_dir=config.flat_dir)
+            if static and config.format != 'md':
+                write_shared_stylesheet(output_dir, static)
+            output_file = config.output if config.output else generate_output_filename(
+                generator.repo_name, config.branch, config.authors, start_date, end_date, config.date, not static)
+            repo_info = {
+                'name': generator.repo_name,
+                'path': generator.repo_path,
+                'branch': generator.current_branch,
+                'date_range': generator._format_date_range(start_date, end_date)
+            }
+            
+            summary_file = f"summary-{output_file}"
+            summary_report = generate_summary_report(sampling['sample'], maven_info, repo_info, sampling)
+            summary_paths = generator.save_report(summary_report, output_dir, summary_file, config.format,
+                                                  config.flat_dir, config.compact_html, static)
+            index_base = generate_index_filename(generator.repo_name, config.branch, start_date, end_date, not static)
+            index_content = generate_index_file(output_dir, summary_file, None, None, repo_info,
+                                                flat_dir=config.flat_dir)
+            index_paths = generator.save_report(index_content, output_dir, index_base, config.format,
+                                                config.flat_dir, config.compact_html, static)
+            
+            result.update(output_dir=output_dir, files={'index': index_paths, 'summary': summary_paths})
+            if config.zip is not None:
+                result['zip'] = create_zip_archive(output_dir, config.zip)
+            return result
+        
+        # 流水线模式：各输出阶段提交到线程池并行执行，否则按顺序立即执行
+        pipeline_executor = None
+        if config.pipeline:
+            from concurrent.futures import ThreadPoolExecutor
+            pipeline_executor = ThreadPoolExecutor(max_workers=config.jobs or os.cpu_count() or 1)
+
+        # 任一阶段出错时也要关闭线程池
+        try:
+            def stage(function, *arguments):
+                from concurrent.futures import Future
+                if pipeline_executor is not None:
+                    return pipeline_executor.submit(function, *arguments)
+                future = Future()
+                future.set_result(function(*arguments))
+                return future
+        
+            def resolve_output_dir():
+                if config.output_dir:
+                    return config.output_dir
+                return generate_report_directory(
+                    generator.repo_name,
+                    config.branch,
+                    config.date,
+                    start_date,
+                    end_date,
+                    maven_info,
+                    config.ownership and not (rollup and config.summary_only),
+                    config.coupling and not (rollup and config.summary_only),
+                    config.flat_dir
+                )
+        
+            # 环比：确定上一周期的时间范围
+            period_comparison = None
+            if config.compare_previous:
+                current_start = start_date or datetime.now(pytz.utc) - timedelta(days=7)
+                current_end = end_date or datetime.now(pytz.utc)
+                previous_start, previous_end = get_previous_date_range(config.date, current_start, current_end)
+                print(f"环比上一周期: {generator._format_date_range(previous_start, previous_end)}")
+        
+            # 预聚合统计：增量更新后直接查询时间范围内的汇总数据
+            rollup = None
+            if config.rollup:
+                cube = RollupCube.load(generator, maven_info)
+                cube.update(generator, maven_info)
+                rollup = cube.query(start_date, end_date, config.authors)
+                if config.compare_previous:
+                    period_comparison = (rollup, cube.query(previous_start, previous_end, config.authors))
+        
+            # 子模块：按父仓库在时间范围内的指针变更递归分析（流水线模式下与父仓库的读取并行进行）
+            submodule_future = None
+            if config.submodules:
+                window_start = start_date or datetime.now(pytz.utc) - timedelta(days=7)
+                window_end = end_date or datetime.now(pytz.utc)
+                window = [f"--since={window_start.isoformat()}", f"--until={window_end.isoformat()}", '--', *generator.pathspecs]
+                submodule_future = stage(analyze_submodules, generator, [window], config.authors, grep_patterns,
+                                         not config.metadata_only, config.jobs, window_start, window_end)
+        
+            # 获取提交记录（仅生成总结报告且使用预聚合统计时无需读取原始提交）
+            commits = None
+            output_dir = None
+            export_future = None
+            churn = ChurnTracker(config.top_k_capacity)
+            if config.top_k_capacity and not (rollup and config.summary_only):
+                print("提示: --top-k-capacity 只限制变更排行表的内存，提交列表和其余报告仍按完整的文件列表统计")
+            if not (rollup and config.summary_only):
+                if config.compare_previous and not rollup:
+                    # 一次读取两个周期的并集，再按时间拆分为本期和上期
+                    path_aliases = PathAliasTable() if config.follow_renames else None
+                    commits = generator.get_commits_in_range(previous_start, current_end, config.authors,
+                                                             path_aliases=path_aliases, grep=grep_patterns,
+                                                             candidates=candidates)
+                    previous_commits = [commit for commit in commits if commit['date'] <= previous_end]
+                    commits = [commit for commit in commits if commit['date'] >= current_start]
+                    churn.add_commits(commits)
+                    print(f"本期提交数: {len(commits)}，上期提交数: {len(previous_commits)}")
+                    period_comparison = (RollupCube.from_commits(commits, maven_info).totals(),
+                                         RollupCube.from_commits(previous_commits, maven_info).totals())
+                else:
+                    path_aliases = PathAliasTable() if config.follow_renames else None
+                    # 流水线模式下导出与读取同时进行，提交逐个经有界队列流入导出线程
+                    sinks = []
+                    if pipeline_executor is not None and config.export:
+                        output_dir = resolve_output_dir()
+                        export_queue = PipelineQueue(config.pipeline)
+                        sinks.append(export_queue)
+                        export_future = pipeline_executor.submit(export_report_data, export_queue, output_dir,
+                                                                 maven_info, config.export)
+                    commits = generator.get_commits_in_range(start_date, end_date, config.authors, churn_tracker=churn,
+                                                             path_aliases=path_aliases, pipeline=config.pipeline,
+                                                             sinks=sinks, with_stats=not config.metadata_only,
+                                                             grep=grep_patterns, candidates=candidates)
+            elif config.shard or config.ownership or config.coupling or config.export:
+                print("提示: 仅生成预聚合总结报告时不读取原始提交，已忽略 --shard/--ownership/--coupling/--export")
+        
+            submodules = submodule_future.result() if submodule_future else []
+            submodule_commits = [commit for submodule in submodules for commit in submodule['commits']]
+        
+            if (commits is not None and not commits and not submodule_commits) or (commits is None and not rollup['commits']):
+                print("警告: 在指定时间范围内没有找到任何提交记录")
+                result['commits'] = commits
+                return result
+        
+            if commits and maven_info and maven_info['modules']:
+                maven_report = generate_maven_report(maven_info, commits)
+        
+            # 确定输出目录
+            if output_dir is None:
+                output_dir = resolve_output_dir()
+            if static and config.format != 'md':
+                write_shared_stylesheet(output_dir, static)
+        
+            # 准备仓库信息
+            repo_info = {
+                'name': generator.repo_name,
+                'path': generator.repo_path,
+                'branch': generator.current_branch,
+                'date_range': generator._format_date_range(start_date, end_date)
+            }
+        
+            # 生成总结报告
+            if rollup:
+                summary_report = generate_rollup_summary_report(rollup, maven_info, repo_info)
+            else:
+                # 父仓库与各子模块的提交合并统计，再附上各子模块的章节
+                merged_commits = sorted(commits + submodule_commits, key=lambda c: c['date'], reverse=True)
+                summary_report = generate_summary_report(merged_commits, maven_info, repo_info)
+            if submodules:
+                summary_report += "\n" + generate_submodule_report(submodules)
+            if period_comparison:
+                summary_report += "\n" + generate_period_comparison_report(
+                    period_comparison[0], period_comparison[1], repo_info['date_range'],
+                    generator._format_date_range(previous_start, previous_end))
+        
+            # 生成详细报告（分页模式下仅包含统计概览，提交记录写入各分页）
+            detail_report = None
+            if not config.summary_only:
+                detail_report = generator.generate_markdown_report(commits, start_date, end_date,
+                                                                   include_records=not config.shard, churn=churn,
+                                                                   compact=config.compact_html)
+        
+            # 确定输出文件名
+            output_file = config.output if config.output else generate_output_filename(
+                generator.repo_name,
+                config.branch,
+                config.authors,
+                start_date,
+                end_date,
+                config.date,
+                not static
+            )
+        
+            # 生成报告文件名
+            summary_file = f"summary-{output_file}"
+            detail_file = f"detail-{output_file}" if detail_report else None
+            maven_file = f"maven-{output_file}" if maven_report else None
+            ownership_file = f"ownership-{output_file}" if config.ownership and commits else None
+            coupling_file = f"coupling-{output_file}" if config.coupling and commits else None
+        
+            # 确定输出格式
+            output_format = 'both' if config.format == 'both' else config.format
+        
+            # 生成索引文件名
+            index_base = generate_index_filename(
+                generator.repo_name,
+                config.branch,
+                start_date,
+                end_date,
+                not static
+            )
+        
+            # 分页模式：拆分提交并在概览页中加入分页导航
+            page_tasks = []
+            detail_pages = None
+            if config.shard and detail_report:
+                shards = split_commits_into_shards(commits, config.shard, config.shard_size)
+                page_tasks = build_detail_page_tasks(shards, output_dir, detail_file, index_base,
+                                                     output_format, config.flat_dir, repo_info, config.compact_html,
+                                                     static)
+                detail_pages = [{'file': task['file'], 'title': task['title'], 'commits': len(task['commits'])}
+                                for task in page_tasks]
+                detail_report += "\n" + render_detail_page_table(detail_pages)
+        
+            if maven_report and detail_report:
+                detail_report += "\n---\n\n" + maven_report
+        
+            # 保存报告（流水线模式下各报告的 HTML 转换与写入、分页渲染、代码归属分析并行执行）
+            summary_future = stage(generator.save_report, summary_report, output_dir, summary_file, output_format,
+                                   config.flat_dir, config.compact_html, static)
+            detail_future = stage(generator.save_report, detail_report, output_dir, detail_file,
+                                  output_format, config.flat_dir, config.compact_html, static) if detail_report else None
+            pages_future = stage(render_detail_pages, page_tasks, config.jobs) if page_tasks else None
+        
+            if maven_report:
+                maven_future = stage(generator.save_report, maven_report, output_dir, maven_file, output_format,
+                                     config.flat_dir, config.compact_html, static)
+        
+            # 代码归属分析
+            def save_ownership():
+                ownership = generator.analyze_ownership(commits, config.jobs)
+                ownership_report = generate_ownership_report(ownership, maven_info)
+                return generator.save_report(ownership_report, output_dir, ownership_file, output_format, config.flat_dir,
+                                             config.compact_html, static)
+        
+            if ownership_file:
+                ownership_future = stage(save_ownership)
+        
+            # 变更耦合分析
+            def save_coupling():
+                coupling = analyze_coupling(commits, maven_info, config.coupling_min_support, config.coupling_min_degree,
+                                            config.coupling_top, config.coupling_max_files)
+                coupling_report = generate_coupling_report(coupling)
+                return generator.save_report(coupling_report, output_dir, coupling_file, output_format, config.flat_dir,
+                                             config.compact_html, static)
+        
+            if coupling_file:
+                coupling_future = stage(save_coupling)
+        
+            # 生成索引文件
+            index_content = generate_index_file(
+                output_dir,
+                summary_file,
+                detail_file,
+                maven_file,
+                repo_info,
+                detail_pages,
+                ownership_file,
+                coupling_file,
+                config.flat_dir
+            )
+        
+            index_future = stage(generator.save_report, index_content, output_dir, index_base, output_format,
+                                 config.flat_dir, config.compact_html, static)
+        
+            # 导出机器可读数据（与报告使用同一批提交数据）
+            if config.export and commits and export_future is None:
+                export_future = stage(export_report_data, commits, output_dir, maven_info, config.export)
+        
+            # 等待所有输出阶段完成
+            summary_paths = summary_future.result()
+            detail_paths = detail_future.result() if detail_future else []
+            if pages_future:
+                detail_paths += pages_future.result()
+            if maven_report:
+                maven_paths = maven_future.result()
+            if ownership_file:
+                ownership_paths = ownership_future.result()
+            if coupling_file:
+                coupling_paths = coupling_future.result()
+            index_paths = index_future.result()
+            data_paths = export_future.result() if export_future else []
+        finally:
+            if pipeline_executor is not None:
+                pipeline_executor.shutdown()
+        
+        files = {'index': index_paths, 'summary': summary_paths}
+        if detail_paths:
+            files['detail'] = detail_paths
+        if maven_report:
+            files['maven'] = maven_paths
+        if ownership_file:
+            files['ownership'] = ownership_paths
+        if coupling_file:
+            files['coupling'] = coupling_paths
+        if data_paths:
+            files['data'] = data_paths
+        result.update(output_dir=output_dir, files=files, commits=commits)
+        
+        # 如果需要创建ZIP压缩包
+        if config.zip is not None:
+            result['zip'] = create_zip_archive(output_dir, config.zip)
+        
+        return result
+
+    def close(self):
+        """结束所有报告生成实例的后端进程"""
+        for generator in self.generators.values():
+            generator.backend.close()
+        self.generators.clear()
+
+class ReportWatcher:
+    """监视模式：分支引用（refs/heads 下的文件或 packed-refs）变化时增量读取新提交，只重新渲染受影响的报告
+
+    报告目录、文件名和索引在第一次生成时确定，之后的更新写入同一目录；详细报告按天分页（文件以日期命名），
+    只重新渲染提交发生变化的日期，以及导航链接因日期增减而变化的相邻日期，移出时间范围的日期分页会被删除。
+    """
+
+    def __init__(self, config, runner=None):
+        config = config.copy()
+        if config.modules is not None:
+            config.maven = True
+            config.modules = config.modules or list(MODULE_DETECTORS)
+        
+        # 监视模式按提交增量更新内存中的统计，需要整体重新计算的功能不可用
+        ignored = [flag for flag, enabled in [
+            ('--rollup', config.rollup), ('--sample', config.sample), ('--compare-previous', config.compare_previous),
+            ('--compare-branches', config.compare_branches is not None), ('--submodules', config.submodules),
+            ('--ownership', config.ownership), ('--coupling', config.coupling), ('--export', config.export),
+            ('--follow-renames', config.follow_renames), ('--metadata-only', config.metadata_only),
+            ('--zip', config.zip is not None), ('--shard commits', config.shard == 'commits')] if enabled]
+        if ignored:
+            print(f"提示: 监视模式只增量更新总结、详细（按天分页）、模块和索引报告，已忽略 {'/'.join(ignored)}")
+        config.rollup = config.compare_previous = config.submodules = False
+        config.ownership = config.coupling = config.follow_renames = config.metadata_only = False
+        config.sample = config.compare_branches = config.export = config.zip = None
+        config.shard = None if config.summary_only else 'day'
+        
+        self.config = config
+        self.runner = runner or ReportRunner()
+        self.generator = self.runner.get_generator(config)
+        if self.generator.current_branch == 'HEAD':
+            raise ReportError("监视模式需要分析一个分支，当前仓库处于分离 HEAD 状态，请使用 --branch 指定分支")
+        self.branch = self.generator.current_branch
+        self.grep_patterns = (config.grep or []) + [ticket_to_pattern(ticket) for ticket in config.ticket or []]
+        self.static = resolve_precompress(config.brotli) if config.static_output else None
+        
+        # 引用文件位于公共 git 目录（工作树共享同一份 refs）
+        common_dir = self.generator.repo.common_dir
+        self.ref_files = [os.path.join(common_dir, 'refs', 'heads', *self.branch.split('/')),
+                          os.path.join(common_dir, 'packed-refs')]
+        
+        self.head = None
+        self.commits = []
+        self.maven_info = None
+        self.output_dir = None
+        self.output_file = None
+        self.index_base = None
+        # 上次渲染时各日期分页的（提交列表, 导航, 文件名）和页眉信息，用于判断哪些分页需要重新渲染
+        self.day_signatures = {}
+        self.page_repo_info = None
+
+    def ref_state(self):
+        """引用文件的状态（修改时间、大小），用于低成本地判断引用是否可能移动"""
+        state = []
+        for path in self.ref_files:
+            try:
+                stat = os.stat(path)
+                state.append((stat.st_mtime_ns, stat.st_size, stat.st_ino))
+            except OSError:
+                state.append(None)
+        return tuple(state)
+
+    def resolve_head(self):
+        """读取分析分支当前指向的提交"""
+        return self.generator.repo.git.rev_parse(f"refs/heads/{self.branch}")
+
+    def refresh(self):
+        """读取分支的新提交并重新渲染受影响的报告，返回新增的提交数（分支未移动时为 0）"""
+        new_head = self.resolve_head()
+        if new_head == self.head:
+            return 0
+        
+        start_date, end_date = self.config.date_range()
+        window_start = start_date or datetime.now(pytz.utc) - timedelta(days=7)
+        window_end = end_date or datetime.now(pytz.utc)
+        
+        incremental = False
+        if self.head:
+            try:
+                incremental = self.generator.repo.is_ancestor(self.head, new_head)
+            except GitCommandError:
+                incremental = False
+            if not incremental:
+                print("\n检测到历史被改写，重新读取全部提交")
+        
+        if incremental:
+            new_commits = self.generator.get_commits_in_ranges([(self.head, new_head)], self.config.authors,
+                                                               self.grep_patterns)
+        else:
+            new_commits = self.generator.get_commits_in_range(start_date, end_date, self.config.authors,
+                                                              grep=self.grep_patterns)
+            self.commits = []
+        
+        # 合并新提交并按当前时间窗口裁剪（未指定开始日期时窗口随时间向后移动）
+        known = {commit['hash'] for commit in self.commits}
+        added = [commit for commit in new_commits if commit['hash'] not in known]
+        self.commits = sorted((commit for commit in self.commits + added
+                               if window_start <= commit['date'] <= window_end),
+                              key=lambda c: c['date'], reverse=True)
+        
+        # 构建清单变化时模块结构可能改变，按新版本重新识别模块
+        if self.config.maven and (self.maven_info is None or not incremental or any(
+                os.path.basename(path) in BUILD_MANIFEST_FILES for commit in added for path in commit['files'])):
+            self.maven_info = build_module_index(self.config.repo_path, self.config.modules or ['maven'], new_head)
+        
+        self.head = new_head
+        if not self.commits:
+            print("警告: 在指定时间范围内没有找到任何提交记录")
+            return len(added)
+        
+        self.render(start_date, end_date)
+        return len(added)
+
+    def render(self, start_date, end_date):
+        """重新渲染总结、详细概览、模块和索引报告，以及提交发生变化的日期分页"""
+        config = self.config
+        generator = self.generator
+        if self.output_dir is None:
+            self.output_dir = config.output_dir or generate_report_directory(
+                generator.repo_name, config.branch, config.date, start_date, end_date, self.maven_info,
+                flat_dir=config.flat_dir)
+            self.output_file = config.output if config.output else generate_output_filename(
+                generator.repo_name, config.branch, config.authors, start_date, end_date, config.date,
+                not self.static)
+            self.index_base = generate_index_filename(generator.repo_name, config.branch, start_date, end_date,
+                                                      not self.static)
+            if self.static and config.format != 'md':
+                write_shared_stylesheet(self.output_dir, self.static)
+        
+        repo_info = {
+            'name': generator.repo_name,
+            'path': generator.repo_path,
+            'branch': generator.current_branch,
+            'date_range': generator._format_date_range(start_date, end_date)
+        }
+        output_format = config.format
+        summary_file = f"summary-{self.output_file}"
+        detail_file = None if config.summary_only else f"detail-{self.output_file}"
+        maven_report = None
+        if self.maven_info and self.maven_info['modules']:
+            maven_report = generate_maven_report(self.maven_info, self.commits)
+        maven_file = f"maven-{self.output_file}" if maven_report else None
+        
+        summary_report = generate_summary_report(self.commits, self.maven_info, repo_info)
+        generator.save_report(summary_report, self.output_dir, summary_file, output_format, config.flat_dir,
+                              config.compact_html, self.static)
+        
+        detail_pages = None
+        if detail_file:
+            shards = split_commits_into_shards(self.commits, 'day')
+            page_tasks = build_detail_page_tasks(shards, self.output_dir, detail_file, self.index_base, output_format,
+                                                 config.flat_dir, repo_info, config.compact_html, self.static)
+            detail_pages = [{'file': task['file'], 'title': task['title'], 'commits': len(task['commits'])}
+                            for task in page_tasks]
+            # 分页以日期命名，页眉不变时只重新渲染提交或导航（相邻日期）发生变化的分页
+            signatures = {task['key']: ([commit['hash'] for commit in task['commits']], task['nav'], task['file'])
+                          for task in page_tasks}
+            if repo_info == self.page_repo_info:
+                page_tasks = [task for task in page_tasks
+                              if signatures[task['key']] != self.day_signatures.get(task['key'])]
+            for key, (_, _, page_file) in self.day_signatures.items():
+                if key not in signatures:
+                    self.remove_page(page_file, output_format)
+            self.day_signatures = signatures
+            self.page_repo_info = repo_info
+            
+            churn = ChurnTracker(config.top_k_capacity)
+            churn.add_commits(self.commits)
+            detail_report = generator.generate_markdown_report(self.commits, start_date, end_date,
+                                                               include_records=False, churn=churn,
+                                                               compact=config.compact_html)
+            detail_report += "\n" + render_detail_page_table(detail_pages)
+            if maven_report:
+                detail_report += "\n---\n\n" + maven_report
+            generator.save_report(detail_report, self.output_dir, detail_file, output_format, config.flat_dir,
+                                  config.compact_html, self.static)
+            if page_tasks:
+                render_detail_pages(page_tasks, config.jobs)
+        
+        if maven_report:
+            generator.save_report(maven_report, self.output_dir, maven_file, output_format, config.flat_dir,
+                                  config.compact_html, self.static)
+        
+        index_content = generate_index_file(self.output_dir, summary_file, detail_file, maven_file, repo_info,
+                                            detail_pages, flat_dir=config.flat_dir)
+        generator.save_report(index_content, self.output_dir, self.index_base, output_format, config.flat_dir,
+                              config.compact_html, self.static)
+
+    def remove_page(self, page_file, output_format):
+        """删除移出时间范围的日期分页（连同预压缩文件）"""
+        formats = [fmt for fmt in ['md', 'html'] if output_format in [fmt, 'both']]
+        for fmt in formats:
+            path = resolve_report_path(self.output_dir, page_file, fmt, self.config.flat_dir)
+            for target in [path] + [f"{path}.{encoding}" for encoding in self.static or []]:
+                if os.path.exists(target):
+                    os.remove(target)
+
+    def watch(self, interval=2.0, max_updates=None):
+        """生成报告后持续监视分支引用，引用移动时增量更新；max_updates 为更新次数上限（默认一直运行）
+
+        更新失败（如引用正在写入、仓库被其他 git 命令锁定）时输出警告并继续监视，下次检查时重试。
+        """
+        import time
+        self.refresh()
+        if self.output_dir:
+            print(f"\n📂 报告目录: {self.output_dir}")
+        print(f"\n👀 开始监视分支 {self.branch}（{', '.join(self.ref_files)}），按 Ctrl+C 退出")
+        state = self.ref_state()
+        updates = 0
+        last_error = None
+        while max_updates is None or updates < max_updates:
+            time.sleep(interval)
+            current = self.ref_state()
+            if current == state:
+                continue
+            state = current
+            previous_head, previous_commits = self.head, self.commits
+            try:
+                added = self.refresh()
+            except (GitCommandError, OSError, ReportError) as e:
+                # 同样的错误只提示一次；清空状态使下次检查时重试
+                if str(e) != last_error:
+                    print(f"\n⚠️ [{datetime.now().strftime('%H:%M:%S')}] 更新报告失败，将在下次检查时重试: {str(e)}")
+                    last_error = str(e)
+                # 回到上次成功的状态，重试时重新读取并渲染
+                self.head, self.commits = previous_head, previous_commits
+                state = None
+                continue
+            last_error = None
+            if self.head != previous_head:
+                updates += 1
+                print(f"\n🔄 [{datetime.now().strftime('%H:%M:%S')}] 分支 {self.branch} 更新到 {self.head[:8]}，"
+                      f"新增 {added} 个提交，报告目录: {self.output_dir}")
+
+def generate_report(repo_path, **options):
+    """便捷接口：按选项生成一份报告并返回结构化结果（选项同 ReportConfig）"""
+    runner = ReportRunner()
+    try:
+        return runner.run(ReportConfig(repo_path, **options))
+    finally:
+        runner.close()
+
+def print_report_result(result):
+    """在命令行输出生成结果"""
+    if result['mode'] == 'report':
+        print("\n📊 报告生成完成！")
+        print(f"\n📂 报告目录: {result['output_dir']}")
+        print("\n📑 生成的文件:")
+        
+        def print_paths(label, paths):
+            if len(paths) == 1:
+                print(f"- {label}: {paths[0]}")
+            else:
+                print(f"- {label}:")
+                for path in paths:
+                    print(f"  - {path}")
+        
+        labels = [('index', '索引文件'), ('summary', '总结报告'), ('detail', '详细报告'), ('maven', 'Maven分析'),
+                  ('ownership', '代码归属'), ('coupling', '变更耦合'), ('data', '导出数据')]
+        for key, label in labels:
+            if result['files'].get(key):
+                print_paths(label, result['files'][key])
+    else:
+        title = "多分支对比报告" if result['mode'] == 'branches' else "抽样估计报告"
+        print(f"\n📊 {title}生成完成！")
+        print(f"\n📂 报告目录: {result['output_dir']}")
+        for paths in result['files'].values():
+            for path in paths:
+                print(f"- {path}")
     
-    global args
-    args = parser.parse_args()
+    if result['zip']:
+        print(f"\n📦 ZIP压缩包: {result['zip']}")
     
+    print("\n✨ 完成！")
+
+def main():
+    # 子命令：prepare（其余参数仍按原有方式解析为报告生成）
+    if len(sys.argv) > 1 and sys.argv[1] == 'prepare':
+        prepare_main(sys.argv[2:])
+        return
+    
+    args = build_parser().parse_args()
+    try:
+        run_command(args)
+    except ReportError as e:
+        print(f"错误: {str(e)}")
+        sys.exit(1)
+
+def run_command(args):
+    """按命令行参数执行：列出信息、监视或生成报告（库代码抛出的 ReportError 由 main 处理）"""
     # 检查路径是否存在
     if not os.path.exists(args.repo_path):
         print(f"错误: 路径 '{args.repo_path}' 不存在")
         sys.exit(1)
     
-    # 处理日期范围
-    if args.date:
-        start_date, end_date = get_date_range(args.date)
-    else:
-        start_date = parse_date(args.start_date) if args.start_date else None
-        end_date = parse_date(args.end_date) if args.end_date else None
-    
-    # 创建报告生成实例（带有指定的分支）
-    generator = GitReportGenerator(args.repo_path, args.branch)
+    if args.sample is not None and args.sample < 2:
+        print("错误: --sample 的样本数至少为 2（估计置信区间需要样本方差）")
+        sys.exit(1)
     
-    # 显示分析信息
-    print(f"\n正在分析仓库: {args.repo_path}")
-    print(f"当前分支: {generator.current_branch}")
-    print(f"查找条件: {format_search_conditions(args.branch, args.authors, start_date, end_date, args.date)}")
-    
-    # 如果是列出分支，则显示分支列表后退出
-    if args.list_branches:
-        print("\n可用的分支:")
-        branches = generator.get_branches()
-        for branch in branches:
-            current_marker = "* " if branch['is_current'] else "  "
-            print(f"{current_marker}{branch['name']}")
-        sys.exit(0)
+    config = ReportConfig(**vars(args))
+    runner = ReportRunner()
     
-    # 如果只是列出作者，则显示作者列表后退出
-    if args.list_authors:
-        print("\n仓库的所有提交作者:")
-        authors = generator.get_authors()
-        for author in authors:
-            print(f"  {author}")
-        sys.exit(0)
+    # 列出分支、列出作者和后端一致性检查只需要仓库信息，完成后直接退出
+    if args.list_branches or args.list_authors or args.check_backends is not None:
+        generator = runner.get_generator(config)
+        start_date, end_date = config.date_range()
+        print_analysis_info(generator, config, start_date, end_date)
+        
+        # 如果是列出分支，则显示分支列表后退出
+        if args.list_branches:
+            print("\n可用的分支:")
+            branches = generator.get_branches()
+            for branch in branches:
+                current_marker = "* " if branch['is_current'] else "  "
+                print(f"{current_marker}{branch['name']}")
+            sys.exit(0)
+        
+        # 如果只是列出作者，则显示作者列表后退出
+        if args.list_authors:
+            print("\n仓库的所有提交作者:")
+            authors = generator.get_authors()
+            for author in authors:
+                print(f"  {author}")
+            sys.exit(0)
+        
+        # 后端一致性检查：各后端的提交列表和统计必须完全相同
+        names = args.check_backends or list(GIT_BACKENDS)
+        sys.exit(0 if check_backends(generator, names, start_date, end_date, args.authors) else 1)
     
-    # 获取提交记录
-    commits = generator.get_commits_in_range(start_date, end_date, args.authors)
+    # 监视模式：持续运行直到 Ctrl+C
+    if args.watch:
+        try:
+            ReportWatcher(config, runner).watch(args.watch_interval)
+        except KeyboardInterrupt:
+            print("\n已停止监视")
+        finally:
+            runner.close()
+        return
     
-    if not commits:
-        print("警告: 在指定时间范围内没有找到任何提交记录")
+    try:
+        result = runner.run(config)
+    finally:
+        runner.close()
+    if result['output_dir'] is None:
         sys.exit(0)
-    
-    # 获取Maven项目信息（如果需要）
-    maven_info = None
-    maven_report = None
-    if args.maven:
-        maven_info = analyze_maven_project(args.repo_path)
-        if maven_info['modules']:
-            maven_report = generate_maven_report(maven_info, commits)
-    
-    # 确定输出目录
-    if args.output_dir:
-        output_dir = args.output_dir
-    else:
-        output_dir = generate_report_directory(
-            generator.repo_name,
-            args.branch,
-            args.date,
-            start_date,
-            end_date,
-            maven_info
-        )
-    
-    # 准备仓库信息
-    repo_info = {
-        'name': generator.repo_name,
-        'path': generator.repo_path,
-        'branch': generator.current_branch,
-        'date_range': generator._format_date_range(start_date, end_date)
-    }
-    
-    # 生成总结报告
-    summary_report = generate_summary_report(commits, maven_info, repo_info)
-    
-    # 生成详细报告
-    detail_report = generator.generate_markdown_report(commits, start_date, end_date)
-    if maven_report:
-        detail_report += "\n---\n\n" + maven_report
-    
-    # 确定输出文件名
-    output_file = args.output if args.output else generate_output_filename(
-        generator.repo_name,
-        args.branch,
-        args.authors,
-        start_date,
-        end_date,
-        args.date
-    )
-    
-    # 生成报告文件名
-    summary_file = f"summary-{output_file}"
-    detail_file = f"detail-{output_file}"
-    maven_file = f"maven-{output_file}" if maven_report else None
-    
-    # 确定输出格式
-    output_format = 'both' if args.format == 'both' else args.format
-    
-    # 保存报告
-    summary_paths = generator.save_report(summary_report, output_dir, summary_file, format=output_format)
-    detail_paths = generator.save_report(detail_report, output_dir, detail_file, format=output_format)
-    
-    if maven_report:
-        maven_paths = generator.save_report(maven_report, output_dir, maven_file, format=output_format)
-    
-    # 生成索引文件名
-    index_base = generate_index_filename(
-        generator.repo_name,
-        args.branch,
-        start_date,
-        end_date
-    )
-    
-    # 生成索引文件
-    index_content = generate_index_file(
-        output_dir,
-        summary_file,
-        detail_file,
-        maven_file,
-        repo_info
-    )
-    
-    index_paths = generator.save_report(index_content, output_dir, index_base, format=output_format)
-    
-    # 输出结果
-    print("\n📊 报告生成完成！")
-    print(f"\n📂 报告目录: {output_dir}")
-    print("\n📑 生成的文件:")
-    
-    def print_paths(label, paths):
-        if len(paths) == 1:
-            print(f"- {label}: {paths[0]}")
-        else:
-            print(f"- {label}:")
-            for path in paths:
-                print(f"  - {path}")
-    
-    print_paths("索引文件", index_paths)
-    print_paths("总结报告", summary_paths)
-    print_paths("详细报告", detail_paths)
-    if maven_report:
-        print_paths("Maven分析", maven_paths)
-    
-    # 如果需要创建ZIP压缩包
-    if args.zip is not None:
-        zip_path = create_zip_archive(output_dir, args.zip)
-        if zip_path:
-            print(f"\n📦 ZIP压缩包: {zip_path}")
-    
-    print("\n✨ 完成！")
+    print_report_result(result)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file